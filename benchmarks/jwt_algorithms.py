@@ -0,0 +1,97 @@
+"""Sign/verify throughput of the JWT algorithms the keyring supports.
+
+    python -m benchmarks.jwt_algorithms [--seconds 1.0]
+
+RS256 is also measured with PEM text, which is what encode_jwt and
+decode_jwt used to pass, so PyJWT re-parsed the key on every call.
+"""
+
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Tuple
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+PAYLOAD = {
+    "type": "access",
+    "sub": "42",
+    "email": "bench@example.com",
+    "username": "bench",
+}
+
+
+def ops_per_second(func: Callable[[], object], seconds: float) -> float:
+    func()  # warm up
+    count, start = 0, time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        func()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def pem_pair(private_key) -> Tuple[bytes, bytes]:
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return private_pem, public_pem
+
+
+def cases() -> List[Tuple[str, str, object, object]]:
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    ed_key = ed25519.Ed25519PrivateKey.generate()
+    rsa_private_pem, rsa_public_pem = pem_pair(rsa_key)
+    return [
+        ("RS256 (PEM text)", "RS256", rsa_private_pem, rsa_public_pem),
+        ("RS256", "RS256", rsa_key, rsa_key.public_key()),
+        ("ES256", "ES256", ec_key, ec_key.public_key()),
+        ("EdDSA", "EdDSA", ed_key, ed_key.public_key()),
+    ]
+
+
+def run(seconds: float) -> Dict[str, Tuple[float, float]]:
+    results = {}
+    now = datetime.now(timezone.utc)
+    payload = {
+        **PAYLOAD,
+        "iat": now,
+        "exp": now + timedelta(minutes=15),
+        "jti": str(uuid.uuid4()),
+    }
+    for name, algorithm, signing_key, verification_key in cases():
+        token = jwt.encode(payload, signing_key, algorithm)
+        sign = ops_per_second(
+            lambda: jwt.encode(payload, signing_key, algorithm), seconds
+        )
+        verify = ops_per_second(
+            lambda: jwt.decode(token, verification_key, algorithms=[algorithm]),
+            seconds,
+        )
+        results[name] = (sign, verify)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--seconds", type=float, default=1.0, help="time spent on each measurement"
+    )
+    args = parser.parse_args()
+
+    print(f"{'algorithm':<18}{'sign/s':>12}{'verify/s':>12}")
+    for name, (sign, verify) in run(args.seconds).items():
+        print(f"{name:<18}{sign:>12,.0f}{verify:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
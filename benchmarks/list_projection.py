@@ -0,0 +1,132 @@
+"""Rows per second read as ORM objects versus the column projection.
+
+    python -m benchmarks.list_projection [--rows 100000] [--url sqlite+aiosqlite:///...]
+
+Fills a scratch database (a temporary SQLite file by default) with tasks,
+then reads them back the way list endpoints used to, select(Task) plus
+model_validate per object, and the way Service.project does, plain rows of
+task_service.columns validated by one TypeAdapter call.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from core.setup import Base
+from models.task_model import Task
+from models.user_model import User
+from schemas.task_schemas import TaskSchema
+from services.task_services import task_service
+
+BATCH = 10000
+
+
+async def fill(session: AsyncSession, rows: int) -> None:
+    now = datetime.now(timezone.utc)
+    await session.execute(
+        insert(User),
+        [
+            {
+                "id": i,
+                "email": f"user{i}@example.com",
+                "username": f"user{i}",
+                "password": "x",
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(1, 101)
+        ],
+    )
+    for start in range(0, rows, BATCH):
+        await session.execute(
+            insert(Task),
+            [
+                {
+                    "title": f"Task {i}",
+                    "description": f"Description for task {i}",
+                    "time": "07:30",
+                    "priority": i % 4,
+                    "is_completed": i % 2 == 0,
+                    "created_at": now,
+                    "updated_at": now,
+                    "user_id": i % 100 + 1,
+                }
+                for i in range(start, min(start + BATCH, rows))
+            ],
+        )
+    await session.commit()
+
+
+async def orm_objects(session: AsyncSession) -> int:
+    objs = (await session.scalars(select(Task))).all()
+    items = [TaskSchema.model_validate(obj) for obj in objs]
+    session.expunge_all()
+    return len(items)
+
+
+async def projection(session: AsyncSession) -> int:
+    rows = (await session.execute(select(*task_service.columns))).mappings().all()
+    return len(task_service.list_adapter.validate_python(rows))
+
+
+async def rows_per_second(
+    sessions: async_sessionmaker,
+    read: Callable[[AsyncSession], Awaitable[int]],
+    rounds: int,
+) -> float:
+    total, elapsed = 0, 0.0
+    for _ in range(rounds):
+        async with sessions() as session:
+            start = time.perf_counter()
+            total += await read(session)
+            elapsed += time.perf_counter() - start
+    return total / elapsed
+
+
+async def run(url: str, rows: int, rounds: int) -> Dict[str, float]:
+    engine = create_async_engine(url)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as session:
+            await fill(session, rows)
+
+        results = {}
+        for name, read in (("ORM objects", orm_objects), ("projection", projection)):
+            await rows_per_second(sessions, read, 1)  # warm up
+            results[name] = await rows_per_second(sessions, read, rounds)
+        return results
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--url", help="scratch database, its tables are dropped")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}"
+        results = asyncio.run(run(url, args.rows, args.rounds))
+
+    print(f"{'path':<14}{'rows/s':>12}")
+    for name, speed in results.items():
+        print(f"{name:<14}{speed:>12,.0f}")
+    print(f"speedup {results['projection'] / results['ORM objects']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
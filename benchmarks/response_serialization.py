@@ -0,0 +1,97 @@
+"""Time to answer a task list through response_model versus model_response.
+
+    python -m benchmarks.response_serialization [--sizes 1000 10000] [--rounds 20]
+
+Both routes return the same validated Page[TaskSchema]; the first lets
+FastAPI validate and encode it again for `response_model`, the second sends
+it as ModelResponse, rendered once by pydantic-core.
+"""
+
+import argparse
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from schemas.page_schemas import Page
+from schemas.task_schemas import TaskSchema
+from utils.responses import model_response
+
+
+def make_page(size: int) -> Page[TaskSchema]:
+    now = datetime.now(timezone.utc)
+    items = [
+        TaskSchema(
+            id=i,
+            title=f"Task {i}",
+            description=f"Description for task {i}",
+            time="07:30",
+            priority=i % 4,
+            is_completed=i % 2 == 0,
+            created_at=now,
+            updated_at=now,
+            user_id=i % 100 + 1,
+        )
+        for i in range(size)
+    ]
+    return Page[TaskSchema](
+        items=items, next_cursor="bmV4dA", prev_cursor=None, limit=size
+    )
+
+
+def make_app(page: Page[TaskSchema]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/response-model", response_model=Page[TaskSchema])
+    async def with_response_model():
+        return page
+
+    @app.get("/model-response", response_model=Page[TaskSchema])
+    async def with_model_response():
+        return model_response(page)
+
+    return app
+
+
+def ms_per_call(func: Callable[[], object], rounds: int) -> float:
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def run(sizes: List[int], rounds: int) -> Dict[int, Dict[str, float]]:
+    results = {}
+    for size in sizes:
+        with TestClient(make_app(make_page(size))) as client:
+            bodies = [
+                client.get(path).json()
+                for path in ("/response-model", "/model-response")
+            ]
+            assert bodies[0] == bodies[1], "both paths must send the same body"
+            results[size] = {
+                path: ms_per_call(lambda: client.get(path), rounds)
+                for path in ("/response-model", "/model-response")
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f"{'items':>8}{'response_model ms':>20}{'model_response ms':>20}{'speedup':>10}"
+    )
+    for size, timings in run(args.sizes, args.rounds).items():
+        slow, fast = timings["/response-model"], timings["/model-response"]
+        print(f"{size:>8}{slow:>20.2f}{fast:>20.2f}{slow / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
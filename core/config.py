@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -17,16 +17,59 @@ class Settings(BaseSettings):
     rate_limit_api: int = 1000
     redis_window: int = 60
     redis_user_window: int = 3600
+    rate_limit_algorithm: Literal[
+        "sliding_log", "sliding_window", "gcra", "token_bucket"
+    ] = "sliding_log"
+    rate_limit_redis_timeout: float = 0.25
+    rate_limit_fail_open: bool = True
+    # Local leases: share of a limit one worker reserves per Redis call,
+    # capped by rate_limit_lease_max_tokens (0 fraction disables leases)
+    rate_limit_lease_fraction: float = 0.1
+    rate_limit_lease_max_tokens: int = 100
+    rate_limit_lease_sync_interval: float = 5.0
+    rate_limit_lease_max_keys: int = 10000
+    token_blacklist_backend: str = "redis"  # "redis" or "memory"
 
     # JWT Configuration
     private_key_path: Path = BASE_DIR / "certs" / "jwt-private.pem"
-    public_key_path: Path = BASE_DIR / "certs" / "jwt-public.pem"
+    # every *.pem here verifies tokens; private_key_path signs them
+    jwt_keys_dir: Path = BASE_DIR / "certs"
 
-    algorithm: str = "RS256"
+    algorithm: str = "RS256"  # for RSA keys; EC P-256 keys sign ES256, Ed25519 EdDSA
     access_token_expire: int = 15
     refresh_token_expire_web: int = 7
     refresh_token_expire_trusted: int = 30
     refresh_token_expire_mobile: int = 90
+    # Verified access tokens, so repeat requests skip the RSA check
+    jwt_cache_enabled: bool = True
+    jwt_cache_size: int = 10000
+    user_cache_size: int = 10000  # 0 disables the authenticated user cache
+    user_cache_ttl: int = 60  # backstop for evictions lost while Redis was away
+    # Read-through Redis cache for GET /tasks/{id} and /users/{id}
+    entity_cache_enabled: bool = True
+    entity_cache_ttl: int = 300
+    entity_cache_lock_timeout: float = 2.0  # how long others wait on a loader
+
+    # Password hashing
+    hash_pool_workers: int = 2  # 0 hashes on the event loop's thread pool
+    hash_max_in_flight: int = 4
+    hash_max_queue: int = 64
+
+    # Pagination
+    default_page_size: int = 5
+    max_page_size: int = 100
+    embedded_tasks_limit: int = 20  # tasks embedded in a user by default
+
+    # Export
+    export_batch_size: int = 1000  # rows fetched per round trip
+    export_chunk_size: int = 16384  # bytes per response chunk
+
+    # Bulk endpoints
+    bulk_max_items: int = 10000
+    bulk_chunk_size: int = 1000  # rows per UPDATE ... FROM (VALUES ...)
+
+    # Seed loading
+    seed_batch_size: int = 10000  # rows per COPY / executemany
 
     # Postgres
     DB_HOST: str
@@ -35,6 +78,14 @@ class Settings(BaseSettings):
     DB_PASSWORD: str
     DB_NAME: str
 
+    # Connection pool
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0  # seconds to wait for a free connection
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100  # asyncpg prepared statements per connection
+
     # SQLite
     DATABASE_URL: Optional[str] = None
     TESTING: bool = False
@@ -44,6 +95,18 @@ class Settings(BaseSettings):
     SMTP_PORT: int = 587
     APP_PASSWORD_SECRET: str
     MAIL_FROM: str
+    SMTP_STARTTLS: bool = True
+    SMTP_TIMEOUT: float = 10.0
+
+    # Email outbox (Redis stream) and its delivery worker
+    email_worker_enabled: bool = True
+    email_batch_size: int = 50
+    email_max_attempts: int = 5
+    email_retry_base: float = 2.0  # seconds before the first retry, doubled after
+    email_retry_max: float = 300.0
+    email_claim_idle: float = 60.0  # take over entries a dead worker left pending
+    email_poll_interval: float = 5.0
+    email_outbox_maxlen: int = 100000
 
     @property
     def POSTGRES_url_psycopg(self):
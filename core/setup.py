@@ -1,12 +1,51 @@
-from typing import List
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, List, Optional
 
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import DeclarativeBase, declared_attr
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .config import settings
+from .metrics import metrics
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each connection checkout waits."""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            metrics.incr("db_pool_timeouts")
+            raise
+        finally:
+            metrics.observe("db_pool_checkout_wait", time.perf_counter() - start)
+
+
+connect_args = {}
+if settings.POSTGRES_url_asyncpg.startswith("postgresql+asyncpg"):
+    connect_args["prepared_statement_cache_size"] = settings.db_statement_cache_size
 
 # sync_engine = create_engine(url=settings.DATABASE_url_psycopg, echo=False)
-async_engine = create_async_engine(url=settings.POSTGRES_url_asyncpg, echo=False)
+async_engine = create_async_engine(
+    url=settings.POSTGRES_url_asyncpg,
+    echo=False,
+    poolclass=TimedQueuePool,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping,
+    connect_args=connect_args,
+)
 
 
 # sync_session_factory = sessionmaker(
@@ -17,12 +56,72 @@ async_session_factory = async_sessionmaker(
 )
 
 
-async def get_db():
-    async with async_session_factory() as session:
-        try:
+class UnitOfWork:
+    """One session shared by everything that runs within a request.
+
+    The session, and with it a pooled connection, is only opened on first use.
+    """
+
+    def __init__(self):
+        self.session: Optional[AsyncSession] = None
+
+    def get_session(self) -> AsyncSession:
+        if self.session is None:
+            self.session = async_session_factory()
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+current_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar(
+    "current_unit_of_work", default=None
+)
+
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """Yields the request's session, or a fresh one outside of a request."""
+    unit_of_work = current_unit_of_work.get()
+    if unit_of_work is None:
+        async with async_session_factory() as session:
             yield session
+        return
+
+    session = unit_of_work.get_session()
+    try:
+        yield session
+    except Exception:
+        # leave the shared session usable for whatever handles the error
+        await session.rollback()
+        raise
+
+
+class UnitOfWorkMiddleware:
+    """Opens a unit of work per HTTP request and closes it once the response is sent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        unit_of_work = UnitOfWork()
+        token = current_unit_of_work.set(unit_of_work)
+        try:
+            await self.app(scope, receive, send)
         finally:
-            await session.close()
+            current_unit_of_work.reset(token)
+            await unit_of_work.close()
+
+
+async def get_db():
+    async with session_scope() as session:
+        yield session
 
 
 class Base(DeclarativeBase):
@@ -1,432 +1,258 @@
+"""Writes a reproducible synthetic seed file of users and their tasks.
+
+    python data_hash.py [--users 10] [--tasks-per-user 4] [--seed 0]
+                        [--output test_data.json]
+
+The format follows the output's suffix: .json (the test_data.json layout),
+.jsonl (one row per line tagged by "table") or .csv (seed_users.csv and
+seed_tasks.csv next to each other), gzipped when it ends in .gz. Rows are
+written as they are generated, and the same arguments always give the same
+bytes, so benchmark data can be rebuilt at any size.
+
+The first user is admin@example.com with password "admin", user n > 1 has
+password PASSWORDS[n % len(PASSWORDS)]. Each distinct password is hashed
+once, on a process pool, with a salt derived from the seed.
+"""
+
+import argparse
+import csv
+import gzip
+import hashlib
+import io
 import json
+import os
+import random
+from bisect import bisect
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import IO, Any, Dict, Iterator, List, Tuple
+
+from utils.auth_utils import pwd_context
 
-from utils.auth_utils import hash_pwd
-
-users = [
-    {
-        "email": "alex.johnson@example.com",
-        "username": "alexj",
-        "password": "welcome1",
-        "created_at": "2023-05-12T08:30:15",
-    },
-    {
-        "email": "sarah.miller@mailservice.com",
-        "username": "sarahm",
-        "password": "testpass",
-        "created_at": "2024-02-28T14:22:47",
-    },
-    {
-        "email": "mike.carter@webapp.io",
-        "username": "mikecarter89",
-        "password": "qwerty123",
-        "created_at": "2022-11-03T09:45:30",
-    },
-    {
-        "email": "lisa.wong@domain.org",
-        "username": "lisawong",
-        "password": "abc12345",
-        "created_at": "2024-07-19T16:10:22",
-    },
-    {
-        "email": "david_smith@emailprovider.net",
-        "username": "davids",
-        "password": "pass1234",
-        "created_at": "2023-09-01T11:05:18",
-    },
-    {
-        "email": "emily.rose@fastmail.com",
-        "username": "emilyr",
-        "password": "hello123",
-        "created_at": "2024-04-15T13:40:55",
-    },
-    {
-        "email": "ryan.patel@service.co",
-        "username": "ryanp92",
-        "password": "userpass",
-        "created_at": "2023-12-10T10:20:33",
-    },
-    {
-        "email": "olivia.garcia@webmail.com",
-        "username": "oliviag",
-        "password": "demo1234",
-        "created_at": "2024-01-22T15:15:10",
-    },
-    {
-        "email": "kevin.brown@mailhost.org",
-        "username": "kevinb",
-        "password": "temp123",
-        "created_at": "2022-08-07T12:25:41",
-    },
-    {
-        "email": "jessica.taylor@example.net",
-        "username": "jessicat",
-        "password": "access1",
-        "created_at": "2024-03-30T17:55:29",
-    },
-    {
-        "email": "admin@example.com",
-        "username": "admin",
-        "password": "admin",
-        "created_at": "2024-03-30T17:55:29",
-    },
+PASSWORDS = [
+    "welcome1",
+    "testpass",
+    "qwerty123",
+    "abc12345",
+    "pass1234",
+    "hello123",
+    "userpass",
+    "demo1234",
+    "temp123",
+    "access1",
 ]
+ADMIN = {"email": "admin@example.com", "username": "admin", "password": "admin"}
 
+FIRST_NAMES = ["alex", "sarah", "mike", "lisa", "david", "emily", "ryan", "olivia"]
+LAST_NAMES = ["johnson", "miller", "carter", "wong", "smith", "rose", "patel", "brown"]
+DOMAINS = ["example.com", "mailservice.com", "webapp.io", "domain.org", "fastmail.com"]
 
-tasks = [
-    {
-        "title": "Morning jog",
-        "description": "Run 3 miles in the park",
-        "time": "07:30",
-        "priority": 2,
-        "is_completed": True,
-        "created_at": "2024-01-10T08:00:00",
-        "updated_at": "2024-01-10T09:15:00",
-        "user_id": 1,
-    },
-    {
-        "title": "Team meeting",
-        "description": "Weekly project sync with engineering team",
-        "time": "10:00",
-        "priority": 3,
-        "is_completed": False,
-        "created_at": "2024-01-12T09:30:00",
-        "updated_at": "2024-01-12T09:30:00",
-        "user_id": 1,
-    },
-    {
-        "title": "Grocery shopping",
-        "description": "Buy vegetables, milk, and eggs",
-        "time": "17:00",
-        "priority": 1,
-        "is_completed": False,
-        "created_at": "2024-01-14T14:20:00",
-        "updated_at": "2024-01-14T14:20:00",
-        "user_id": 1,
-    },
-    {
-        "title": "Client presentation",
-        "description": "Prepare slides for quarterly review",
-        "time": "14:00",
-        "priority": 3,
-        "is_completed": True,
-        "created_at": "2024-01-08T10:00:00",
-        "updated_at": "2024-01-09T16:30:00",
-        "user_id": 2,
-    },
-    {
-        "title": "Dentist appointment",
-        "description": "Routine checkup and cleaning",
-        "time": "15:30",
-        "priority": 2,
-        "is_completed": False,
-        "created_at": "2024-01-05T11:45:00",
-        "updated_at": "2024-01-12T11:45:00",
-        "user_id": 2,
-    },
-    {
-        "title": "Code review",
-        "description": "Review PR #457 from junior developer",
-        "time": "11:00",
-        "priority": 2,
-        "is_completed": True,
-        "created_at": "2024-01-13T09:00:00",
-        "updated_at": "2024-01-13T12:30:00",
-        "user_id": 3,
-    },
-    {
-        "title": "Gym workout",
-        "description": "Leg day with trainer",
-        "time": "18:00",
-        "is_completed": False,
-        "created_at": "2024-01-10T15:00:00",
-        "updated_at": "2024-01-10T15:00:00",
-        "user_id": 3,
-    },
-    {
-        "title": "Submit report",
-        "description": "Monthly sales report to management",
-        "time": "16:00",
-        "priority": 3,
-        "is_completed": False,
-        "created_at": "2024-01-11T13:00:00",
-        "updated_at": "2024-01-14T10:00:00",
-        "user_id": 3,
-    },
-    {
-        "title": "Movie night",
-        "description": "Watch new sci-fi film with friends",
-        "time": "20:00",
-        "is_completed": False,
-        "created_at": "2024-01-13T18:30:00",
-        "updated_at": "2024-01-13T18:30:00",
-        "user_id": 4,
-    },
-    {
-        "title": "Clean apartment",
-        "description": "Vacuum and mop all rooms",
-        "time": "13:00",
-        "priority": 1,
-        "is_completed": True,
-        "created_at": "2024-01-07T09:00:00",
-        "updated_at": "2024-01-07T14:00:00",
-        "user_id": 4,
-    },
-    {
-        "title": "Parent-teacher conference",
-        "description": "Discuss child's progress with teacher",
-        "time": "16:30",
-        "priority": 2,
-        "is_completed": False,
-        "created_at": "2024-01-09T12:00:00",
-        "updated_at": "2024-01-12T12:00:00",
-        "user_id": 5,
-    },
-    {
-        "title": "Pay bills",
-        "description": "Electricity, internet, and credit card payments",
-        "time": "19:00",
-        "priority": 2,
-        "is_completed": True,
-        "created_at": "2024-01-05T08:00:00",
-        "updated_at": "2024-01-05T20:30:00",
-        "user_id": 5,
-    },
-    {
-        "title": "Book club meeting",
-        "description": "Discuss 'The Midnight Library' with group",
-        "time": "18:30",
-        "priority": 1,
-        "is_completed": False,
-        "created_at": "2024-01-08T14:00:00",
-        "updated_at": "2024-01-08T14:00:00",
-        "user_id": 5,
-    },
-    {
-        "title": "Update portfolio",
-        "description": "Add recent projects to online portfolio",
-        "time": "11:00",
-        "priority": 2,
-        "is_completed": True,
-        "created_at": "2024-01-06T10:00:00",
-        "updated_at": "2024-01-06T15:45:00",
-        "user_id": 5,
-    },
-    {
-        "title": "Car maintenance",
-        "description": "Oil change and tire rotation",
-        "time": "09:00",
-        "priority": 2,
-        "is_completed": False,
-        "created_at": "2024-01-04T16:00:00",
-        "updated_at": "2024-01-12T16:00:00",
-        "user_id": 5,
-    },
-    {
-        "title": "Lunch with colleague",
-        "description": "Catch up with former coworker",
-        "time": "12:30",
-        "priority": 1,
-        "is_completed": True,
-        "created_at": "2024-01-10T09:00:00",
-        "updated_at": "2024-01-11T13:45:00",
-        "user_id": 6,
-    },
-    {
-        "title": "Research competitors",
-        "description": "Analyze new features in competitor apps",
-        "time": "10:30",
-        "priority": 2,
-        "is_completed": False,
-        "created_at": "2024-01-11T14:00:00",
-        "updated_at": "2024-01-14T14:00:00",
-        "user_id": 6,
-    },
-    {
-        "title": "Yoga class",
-        "description": "Evening vinyasa flow",
-        "time": "19:30",
-        "priority": 1,
-        "is_completed": False,
-        "created_at": "2024-01-09T18:00:00",
-        "updated_at": "2024-01-09T18:00:00",
-        "user_id": 7,
-    },
-    {
-        "title": "Budget planning",
-        "description": "Create monthly expense spreadsheet",
-        "time": "20:00",
-        "priority": 2,
-        "is_completed": True,
-        "created_at": "2024-01-03T19:00:00",
-        "updated_at": "2024-01-04T21:30:00",
-        "user_id": 7,
-    },
-    {
-        "title": "Fix leaky faucet",
-        "description": "Replace washer in bathroom faucet",
-        "time": "15:00",
-        "priority": 1,
-        "is_completed": False,
-        "created_at": "2024-01-13T10:00:00",
-        "updated_at": "2024-01-13T10:00:00",
-        "user_id": 7,
-    },
-    {
-        "title": "Learn new framework",
-        "description": "Complete tutorial for React Native",
-        "time": "14:00",
-        "priority": 2,
-        "is_completed": False,
-        "created_at": "2024-01-02T13:00:00",
-        "updated_at": "2024-01-14T13:00:00",
-        "user_id": 7,
-    },
-    {
-        "title": "Plan birthday party",
-        "description": "Organize decorations and food for party",
-        "time": "16:00",
-        "priority": 2,
-        "is_completed": True,
-        "created_at": "2024-01-01T11:00:00",
-        "updated_at": "2024-01-08T17:00:00",
-        "user_id": 7,
-    },
-    {
-        "title": "Write blog post",
-        "description": "Article about productivity tips",
-        "time": "09:30",
-        "priority": 1,
-        "is_completed": False,
-        "created_at": "2024-01-12T08:00:00",
-        "updated_at": "2024-01-12T08:00:00",
-        "user_id": 8,
-    },
-    {
-        "title": "Doctor's appointment",
-        "description": "Annual physical examination",
-        "time": "11:30",
-        "priority": 2,
-        "is_completed": True,
-        "created_at": "2023-12-28T14:00:00",
-        "updated_at": "2024-01-10T12:00:00",
-        "user_id": 8,
-    },
-    {
-        "title": "Update software",
-        "description": "Install latest OS and app updates",
-        "time": "21:00",
-        "priority": 1,
-        "is_completed": True,
-        "created_at": "2024-01-07T20:00:00",
-        "updated_at": "2024-01-07T22:30:00",
-        "user_id": 8,
-    },
-    {
-        "title": "Networking event",
-        "description": "Tech industry meetup downtown",
-        "time": "18:00",
-        "priority": 2,
-        "is_completed": False,
-        "created_at": "2024-01-11T15:00:00",
-        "updated_at": "2024-01-11T15:00:00",
-        "user_id": 9,
-    },
-    {
-        "title": "Return library books",
-        "description": "Books due today, avoid late fees",
-        "time": "17:30",
-        "priority": 1,
-        "is_completed": False,
-        "created_at": "2024-01-08T12:00:00",
-        "updated_at": "2024-01-14T12:00:00",
-        "user_id": 9,
-    },
-    {
-        "title": "Prepare tax documents",
-        "description": "Gather W-2s and receipts for accountant",
-        "time": "13:00",
-        "priority": 3,
-        "is_completed": False,
-        "created_at": "2024-01-03T10:00:00",
-        "updated_at": "2024-01-13T10:00:00",
-        "user_id": 9,
-    },
-    {
-        "title": "Cook dinner for family",
-        "description": "Make lasagna for family gathering",
-        "time": "18:30",
-        "priority": 1,
-        "is_completed": False,
-        "created_at": "2024-01-13T16:00:00",
-        "updated_at": "2024-01-13T16:00:00",
-        "user_id": 10,
-    },
-    {
-        "title": "Backup photos",
-        "description": "Upload vacation photos to cloud storage",
-        "time": "22:00",
-        "priority": 1,
-        "is_completed": True,
-        "created_at": "2024-01-06T20:00:00",
-        "updated_at": "2024-01-07T23:15:00",
-        "user_id": 10,
-    },
-    {
-        "title": "Call insurance company",
-        "description": "Check coverage for upcoming procedure",
-        "time": "14:30",
-        "priority": 2,
-        "is_completed": False,
-        "created_at": "2024-01-09T13:00:00",
-        "updated_at": "2024-01-14T13:00:00",
-        "user_id": 10,
-    },
-    {
-        "title": "Organize closet",
-        "description": "Sort clothes by season, donate unused items",
-        "time": "10:00",
-        "priority": 0,
-        "is_completed": False,
-        "created_at": "2024-01-14T09:00:00",
-        "updated_at": "2024-01-14T09:00:00",
-        "user_id": 10,
-    },
-    {
-        "title": "Practice guitar",
-        "description": "Work on new song for 30 minutes",
-        "time": "20:30",
-        "priority": 1,
-        "is_completed": True,
-        "created_at": "2024-01-04T19:00:00",
-        "updated_at": "2024-01-04T21:00:00",
-        "user_id": 10,
-    },
-    {
-        "title": "Review contracts",
-        "description": "Go over new client service agreement",
-        "time": "15:00",
-        "priority": 3,
-        "is_completed": False,
-        "created_at": "2024-01-05T14:00:00",
-        "updated_at": "2024-01-12T14:00:00",
-        "user_id": 10,
-    },
-    {
-        "title": "Schedule social media posts",
-        "description": "Plan content for next week",
-        "time": "11:30",
-        "priority": 1,
-        "is_completed": False,
-        "created_at": "2024-01-08T10:30:00",
-        "updated_at": "2024-01-08T10:30:00",
-        "user_id": 1,
-    },
+# (title, description, usual hour)
+TEMPLATES = [
+    ("Morning jog", "Run 3 miles in the park", 7),
+    ("Team meeting", "Weekly project sync with engineering team", 10),
+    ("Grocery shopping", "Buy vegetables, milk, and eggs", 17),
+    ("Client presentation", "Prepare slides for quarterly review", 14),
+    ("Dentist appointment", "Routine checkup and cleaning", 15),
+    ("Code review", "Review PR #457 from junior developer", 11),
+    ("Gym workout", "Leg day with trainer", 18),
+    ("Submit report", "Monthly sales report to management", 16),
+    ("Movie night", "Watch new sci-fi film with friends", 20),
+    ("Clean apartment", "Vacuum and mop all rooms", 13),
+    ("Pay bills", "Electricity, internet, and credit card payments", 19),
+    ("Book club meeting", "Discuss 'The Midnight Library' with group", 18),
+    ("Car maintenance", "Oil change and tire rotation", 9),
+    ("Research competitors", "Analyze new features in competitor apps", 10),
+    ("Budget planning", "Create monthly expense spreadsheet", 20),
+    ("Fix leaky faucet", "Replace washer in bathroom faucet", 15),
+    ("Write blog post", "Article about productivity tips", 9),
+    ("Prepare tax documents", "Gather W-2s and receipts for accountant", 13),
+    ("Backup photos", "Upload vacation photos to cloud storage", 22),
+    ("Practice guitar", "Work on new song for 30 minutes", 20),
 ]
 
+# DEFAULT, LOW, MEDIUM, HIGH: most tasks sit in the middle
+PRIORITY_WEIGHTS = list(accumulate([15, 35, 35, 15]))
+TIMED_SHARE = 0.8  # tasks with a time of day
+EDITED_SHARE = 0.3  # open tasks touched again after creation
+
+START = datetime(2022, 1, 1)
+END = datetime(2025, 1, 1)
+SPAN = int((END - START).total_seconds())
+
+USER_COLUMNS = ["id", "email", "username", "password", "created_at", "updated_at"]
+TASK_COLUMNS = [
+    "title",
+    "description",
+    "time",
+    "priority",
+    "is_completed",
+    "created_at",
+    "updated_at",
+    "user_id",
+]
+
+
+def hash_password(password: str, seed: int) -> str:
+    """Argon2 with the app's parameters and a salt fixed by the seed."""
+    salt = hashlib.sha256(f"{seed}:{password}".encode()).digest()[:16]
+    return pwd_context.handler("argon2").using(salt=salt).hash(password)
+
+
+def hash_passwords(passwords: List[str], seed: int) -> Dict[str, str]:
+    workers = min(len(passwords), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        hashes = pool.map(hash_password, passwords, [seed] * len(passwords))
+        return dict(zip(passwords, hashes))
+
+
+def user_rng(seed: int, n: int) -> random.Random:
+    """Each user draws from its own stream, the same in both passes."""
+    return random.Random(f"{seed}:{n}")
+
+
+def iso(seconds: float) -> str:
+    return (START + timedelta(seconds=int(seconds))).isoformat()
+
+
+def joined_at(rng: random.Random) -> float:
+    """Seconds after START, leaving every account some time to add tasks."""
+    return rng.random() * SPAN * 0.8
+
+
+def make_user(n: int, rng: random.Random, hashes: Dict[str, str]) -> Dict[str, Any]:
+    joined = joined_at(rng)
+    if n == 1:
+        user = dict(ADMIN)
+    else:
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        user = {
+            "email": f"{first}.{last}{n}@{rng.choice(DOMAINS)}",
+            "username": f"{first}{last[0]}{n}",
+            "password": PASSWORDS[n % len(PASSWORDS)],
+        }
+    user["password"] = hashes[user["password"]]
+    return {"id": n, **user, "created_at": iso(joined), "updated_at": iso(joined)}
+
+
+def make_tasks(
+    n: int, rng: random.Random, count: int, joined: float
+) -> Iterator[Dict[str, Any]]:
+    lifetime = SPAN - joined
+    for _ in range(count):
+        # activity grows over an account's life, older tasks are more often done
+        age = 1 - rng.random() ** 0.5
+        created = SPAN - age * lifetime
+        is_completed = rng.random() < 0.15 + 0.75 * age
+
+        if is_completed or rng.random() < EDITED_SHARE:
+            updated = min(created + rng.expovariate(1 / 86400), SPAN)
+        else:
+            updated = created
+
+        title, description, hour = rng.choice(TEMPLATES)
+        time = None
+        if rng.random() < TIMED_SHARE:
+            hour = min(max(round(rng.gauss(hour, 1)), 0), 23)
+            time = f"{hour:02d}:{rng.choice((0, 15, 30, 45)):02d}"
+
+        yield {
+            "title": title,
+            "description": description,
+            "time": time,
+            "priority": bisect(PRIORITY_WEIGHTS, rng.random() * PRIORITY_WEIGHTS[-1]),
+            "is_completed": is_completed,
+            "created_at": iso(created),
+            "updated_at": iso(updated),
+            "user_id": n,
+        }
+
+
+def generate(
+    users: int, tasks_per_user: int, seed: int
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """All users first, then the tasks, so loaders can remap owners as they go."""
+    used = {PASSWORDS[n % len(PASSWORDS)] for n in range(2, users + 1)}
+    hashes = hash_passwords([ADMIN["password"], *sorted(used)], seed)
+
+    for n in range(1, users + 1):
+        yield "users", make_user(n, user_rng(seed, n), hashes)
+    for n in range(1, users + 1):
+        rng = user_rng(seed, n)
+        for task in make_tasks(n, rng, tasks_per_user, joined_at(rng)):
+            yield "tasks", task
+
+
+def open_output(path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        # mtime=0 and no file name keep the gzip header, and so the bytes, the
+        # same every run and under any output name
+        f = open(path, "wb")
+        raw = gzip.GzipFile(filename="", mode="wb", fileobj=f, mtime=0)
+        raw.myfileobj = f  # closed along with the GzipFile
+        return io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="")
+
+
+def write_json(rows: Iterator[Tuple[str, Dict[str, Any]]], path: str) -> None:
+    with open_output(path) as f:
+        table = None
+        for name, row in rows:
+            if name != table:
+                f.write("{" if table is None else "],")
+                f.write(f"{json.dumps(name)}:[")
+                table = name
+            else:
+                f.write(",")
+            f.write(json.dumps(row))
+        f.write("]}" if table else "{}")
+
+
+def write_jsonl(rows: Iterator[Tuple[str, Dict[str, Any]]], path: str) -> None:
+    with open_output(path) as f:
+        for name, row in rows:
+            f.write(json.dumps({"table": name, **row}) + "\n")
+
+
+def write_csv(rows: Iterator[Tuple[str, Dict[str, Any]]], path: str) -> None:
+    stem, suffix = path.split(".csv", 1)
+    columns = {"users": USER_COLUMNS, "tasks": TASK_COLUMNS}
+    files, writers = {}, {}
+    try:
+        for name, row in rows:
+            if name not in writers:
+                files[name] = open_output(f"{stem}_{name}.csv{suffix}")
+                writers[name] = csv.DictWriter(files[name], columns[name])
+                writers[name].writeheader()
+            writers[name].writerow(row)
+    finally:
+        for f in files.values():
+            f.close()
+
+
+WRITERS = {".json": write_json, ".jsonl": write_jsonl, ".csv": write_csv}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--tasks-per-user", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="test_data.json")
+    args = parser.parse_args()
+
+    suffix = os.path.splitext(args.output.removesuffix(".gz"))[1]
+    if suffix not in WRITERS:
+        parser.error(f"--output must end in one of {list(WRITERS)}, optionally .gz")
+
+    rows = generate(args.users, args.tasks_per_user, args.seed)
+    WRITERS[suffix](rows, args.output)
+    print(
+        f"✅ Wrote {args.users} users and {args.users * args.tasks_per_user} tasks"
+        f" to {args.output}"
+    )
 
-data = {"users": users, "tasks": tasks}
-for user in data["users"]:
-    user["password"] = hash_pwd(user["password"])
 
-with open("test_data.json", "w") as f:
-    f.write(json.dumps(data))
+if __name__ == "__main__":
+    main()
@@ -4,35 +4,53 @@ from typing import Dict, List
 from fastapi import Depends, FastAPI, Request, status
 from pydantic import EmailStr
 
-from core.setup import get_db, settings
+from core.setup import UnitOfWorkMiddleware, get_db, settings
 from routes.auth_routes import router as auth_router
 from routes.task_routes import router as task_router
 from routes.user_routers import router as user_router
 from schemas.user_schemas import UserSchema
-from services.auth_validation import get_current_auth_user
+from services.auth_validation import get_current_principal
 from services.user_services import create_user
 from utils.rate_limit import (
+    RateLimitHeadersMiddleware,
     get_auth_rate_limit,
     get_global_rate_limit,
     get_user_rate_limit,
 )
+from utils.responses import model_response
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     import asyncio
+    import signal
 
     from core.redis import redis_manager
-    from utils.auth_helper import TokenBlackList
+    from utils.auth_helper import TokenBlackList, create_blacklist
+    from utils.auth_utils import reload_keys
+    from utils.cache_events import EvictionListener
+    from utils.email_outbox import EmailWorker
+    from utils.hashing import password_hasher
+    from utils.keyring import keyring
 
     print("Starting up...")
 
-    blacklist = TokenBlackList()
+    keyring.reload()
+    try:
+        # `kill -HUP` picks up rotated keys from certs/ without a restart
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, reload_keys)
+    except (NotImplementedError, RuntimeError, ValueError, AttributeError):
+        print("⚠️ Can't reload JWT keys on SIGHUP here, restart to rotate keys")
+
+    blacklist = create_blacklist()
     app.state.blacklist = blacklist
 
-    cleanup_task = asyncio.create_task(
-        blacklist.start_periodic_cleanup(interval_minutes=15)
-    )
+    # Redis-backed blacklists expire on their own
+    cleanup_task = None
+    if isinstance(blacklist, TokenBlackList):
+        cleanup_task = asyncio.create_task(
+            blacklist.start_periodic_cleanup(interval_minutes=15)
+        )
     app.state.cleanup_task = cleanup_task
     try:
         await redis_manager.connect()
@@ -41,9 +59,33 @@ async def lifespan(app: FastAPI):
         print(f"❌ Redis connection failed: {e}")
         raise
 
+    eviction_listener = EvictionListener()
+    eviction_task = asyncio.create_task(eviction_listener.run())
+
+    email_worker = email_task = None
+    if settings.email_worker_enabled:
+        email_worker = EmailWorker()
+        email_task = asyncio.create_task(email_worker.run())
+
     yield
     print("Shutting down...")
 
+    if email_task is not None:
+        email_worker.stop()
+        email_task.cancel()
+        try:
+            await email_task
+        except asyncio.CancelledError:
+            pass
+        await email_worker.close()
+
+    eviction_listener.stop()
+    eviction_task.cancel()
+    try:
+        await eviction_task
+    except asyncio.CancelledError:
+        pass
+
     print("🔧 Closing Redis connection...")
     try:
         await redis_manager.disconnect()
@@ -51,14 +93,22 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️ Error during Redis disconnect: {e}")
 
-    cleanup_task.cancel()
-    try:
-        await cleanup_task
-    except asyncio.CancelledError:
-        pass
+    if cleanup_task is not None:
+        cleanup_task.cancel()
+        try:
+            await cleanup_task
+        except asyncio.CancelledError:
+            pass
+
+    password_hasher.shutdown()
+
 
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(RateLimitHeadersMiddleware)
+app.add_middleware(UnitOfWorkMiddleware)
 
-app = FastAPI(lifespan=lifespan, dependencies=[Depends(get_global_rate_limit)])
+# Each route declares one policy holding all of its limits, so the global
+# limit is checked in the same round trip as the router's own limit.
 
 app.include_router(user_router, dependencies=[Depends(get_user_rate_limit)])
 app.include_router(task_router, dependencies=[Depends(get_user_rate_limit)])
@@ -70,50 +120,46 @@ app.include_router(auth_router, dependencies=[Depends(get_auth_rate_limit)])
     tags=["users"],
     response_model=UserSchema,
     status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(get_global_rate_limit)],
 )
 async def create_user_handle(user: UserSchema = Depends(create_user)):
-    return user
+    return model_response(user, status_code=status.HTTP_201_CREATED)
 
 
-@app.get("/jwt/forgot-password/", tags=["jwt"])
+@app.get(
+    "/jwt/forgot-password/",
+    tags=["jwt"],
+    dependencies=[Depends(get_global_rate_limit)],
+)
 async def forgot_password(email: EmailStr, session=Depends(get_db)):
-    import smtplib
-    from email.mime.multipart import MIMEMultipart
-    from email.mime.text import MIMEText
-
     from services.user_services import get_user_by_email
     from utils.auth_helper import create_access_token
+    from utils.email_outbox import enqueue_email
 
-    server = smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT)
-    server.starttls()
-    server.login(settings.MAIL_FROM, settings.APP_PASSWORD_SECRET)
-
-    msg = MIMEMultipart()
-    msg["From"] = settings.MAIL_FROM
-    msg["To"] = email
-    msg["Subject"] = "Token for account reset"
-
-    user = await get_user_by_email(email, session)
+    user = await get_user_by_email(email, embed="none", session=session)
     token = create_access_token(user)
 
-    msg.attach(
-        MIMEText(
-            f"""Here is token for deleting your account: 
+    # delivered by the email worker, a slow SMTP server doesn't hold the request
+    await enqueue_email(
+        to=email,
+        subject="Token for account reset",
+        body=f"""Here is token for deleting your account: 
             "
             {token}
             "
             thanks for using our service!""",
-            "plain",
-        )
     )
 
-    server.send_message(msg)
-
     return {"detail": f"Token has been sent to {email} if it exists in our system."}
 
 
-@app.get("/", response_model=Dict[str, str], summary="User greeter")
-async def root_func(rate_limiter=Depends(get_global_rate_limit)):
+@app.get(
+    "/",
+    response_model=Dict[str, str],
+    summary="User greeter",
+    dependencies=[Depends(get_global_rate_limit)],
+)
+async def root_func():
     return {"message": "hello world"}
 
 
@@ -122,10 +168,9 @@ async def root_func(rate_limiter=Depends(get_global_rate_limit)):
     response_model=Dict[str, str],
     summary="Data resetter to default",
     description="resets data to default data (test_data.json)",
+    dependencies=[Depends(get_global_rate_limit)],
 )
-async def refresh_data(
-    session=Depends(get_db), rate_limiter=Depends(get_global_rate_limit)
-):
+async def refresh_data(session=Depends(get_db)):
     from utils.data_helper import add_data_into_db, recreate_tables
 
     await recreate_tables()
@@ -138,20 +183,32 @@ async def refresh_data(
     response_model=List | Dict,
     summary="Token Blacklist only for admin",
     description="If you are admin, shows which tokens have been blacklisted",
+    dependencies=[Depends(get_global_rate_limit)],
 )
 async def see_the_blacklist(
     request: Request,
-    user=Depends(get_current_auth_user),
-    rate_limiter=Depends(get_global_rate_limit),
+    user=Depends(get_current_principal),
 ):
     admin_email = "admin@example.com"
 
     if user.email == admin_email:
-        return request.app.state.blacklist.jti_to_expiry_blacklist
+        return await request.app.state.blacklist.entries()
     else:
         return {"Message": f"{user.username} you are not admin"}
 
 
+@app.get(
+    "/metrics",
+    response_model=Dict,
+    summary="In-process counters and timers",
+    dependencies=[Depends(get_global_rate_limit)],
+)
+async def get_metrics():
+    from core.metrics import metrics
+
+    return metrics.snapshot()
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -159,4 +216,3 @@ if __name__ == "__main__":
 
 
 # TODO: Database Token Storage
-# TODO: add forgot-password and reset-password endpoints with email sending, using kafka
@@ -8,10 +8,10 @@ Create Date: 2026-01-20 17:00:25.996023
 
 from typing import Sequence, Union
 
+import sqlalchemy as sa
 from alembic import op
-from sqlalchemy.orm import Session
 
-from utils.data_helper import add_data_into_db_sync, get_data_sync
+from utils.data_helper import get_data_sync
 
 # revision identifiers, used by Alembic.
 revision: str = "31aa18593d73"
@@ -19,15 +19,49 @@ down_revision: Union[str, Sequence[str], None] = "9153a281a14e"
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
+# Tables as they are at this revision; the current models may have columns
+# that later migrations add.
+users_table = sa.table(
+    "users",
+    sa.column("id", sa.Integer),
+    sa.column("email", sa.String),
+    sa.column("username", sa.String),
+    sa.column("password", sa.String),
+    sa.column("created_at", sa.String),
+)
+tasks_table = sa.table(
+    "tasks",
+    sa.column("title", sa.String),
+    sa.column("description", sa.String),
+    sa.column("time", sa.String),
+    sa.column("priority", sa.Integer),
+    sa.column("is_completed", sa.Boolean),
+    sa.column("created_at", sa.String),
+    sa.column("updated_at", sa.String),
+    sa.column("user_id", sa.Integer),
+)
+
 
 def upgrade() -> None:
     """Upgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
     data = get_data_sync()
     bind = op.get_bind()
-    session = Session(bind=bind)
 
-    add_data_into_db_sync(data, session)
+    if users := data.get("users"):
+        op.bulk_insert(users_table, users)
+    user_ids = bind.scalars(sa.select(users_table.c.id).order_by(users_table.c.id))
+    user_id_mapping = {i + 1: user_id for i, user_id in enumerate(user_ids)}
+
+    tasks = []
+    for task in data.get("tasks", []):
+        actual_user_id = user_id_mapping.get(task["user_id"])
+        if actual_user_id is None:
+            print(f"WARNING: No user found for ID {task['user_id']}")
+            continue
+        tasks.append({**task, "user_id": actual_user_id})
+    if tasks:
+        op.bulk_insert(tasks_table, tasks)
     # ### end Alembic commands ###
 
 
@@ -0,0 +1,48 @@
+"""add keyset pagination indexes
+
+Revision ID: c7b6fa4c01fa
+Revises: 31aa18593d73
+Create Date: 2026-10-18 09:00:12.418205
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c7b6fa4c01fa"
+down_revision: Union[str, Sequence[str], None] = "31aa18593d73"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # built concurrently so large tables stay writable
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tasks_created_at_id",
+            "tasks",
+            ["created_at", "id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_tasks_priority_id",
+            "tasks",
+            ["priority", "id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_users_created_at_id",
+            "users",
+            ["created_at", "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_created_at_id", table_name="users")
+    op.drop_index("ix_tasks_priority_id", table_name="tasks")
+    op.drop_index("ix_tasks_created_at_id", table_name="tasks")
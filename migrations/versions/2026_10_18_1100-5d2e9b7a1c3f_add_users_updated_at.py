@@ -0,0 +1,31 @@
+"""add users.updated_at
+
+Revision ID: 5d2e9b7a1c3f
+Revises: c7b6fa4c01fa
+Create Date: 2026-10-18 11:00:41.120573
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2e9b7a1c3f"
+down_revision: Union[str, Sequence[str], None] = "c7b6fa4c01fa"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("users", sa.Column("updated_at", sa.String(), nullable=True))
+    # existing users haven't changed since they were created, as far as we know
+    op.execute("UPDATE users SET updated_at = created_at")
+    op.alter_column("users", "updated_at", nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("users", "updated_at")
@@ -0,0 +1,152 @@
+"""native timestamp and time columns
+
+Revision ID: 8e4f2a61b9d0
+Revises: 5d2e9b7a1c3f
+Create Date: 2026-10-18 13:00:27.502114
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "8e4f2a61b9d0"
+down_revision: Union[str, Sequence[str], None] = "5d2e9b7a1c3f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+# table -> [(string column, typed column, type, SQL that parses the string)]
+CONVERSIONS = {
+    "tasks": [
+        ("created_at", "created_at_ts", sa.DateTime(timezone=True), "pg_temp.to_ts"),
+        ("updated_at", "updated_at_ts", sa.DateTime(timezone=True), "pg_temp.to_ts"),
+        ("time", "time_of_day", sa.Time(), "pg_temp.to_time"),
+    ],
+    "users": [
+        ("created_at", "created_at_ts", sa.DateTime(timezone=True), "pg_temp.to_ts"),
+        ("updated_at", "updated_at_ts", sa.DateTime(timezone=True), "pg_temp.to_ts"),
+    ],
+}
+
+# The string columns were all NOT NULL before, some with a server default;
+# downgrade() puts that back
+PREVIOUS_DEFAULTS = {
+    ("tasks", "created_at"): "TIMEZONE('utc', NOW())",
+    ("tasks", "updated_at"): "TIMEZONE('utc', NOW())",
+    ("tasks", "time"): None,
+    ("users", "created_at"): "TIMEZONE('utc', NOW())",
+    ("users", "updated_at"): None,
+}
+
+# Values that don't parse become NULL instead of failing the migration.
+# Timestamps without an offset were written as UTC.
+PARSE_FUNCTIONS = [
+    """
+CREATE FUNCTION pg_temp.to_ts(value text) RETURNS timestamptz AS $$
+BEGIN
+    RETURN value::timestamptz;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END $$ LANGUAGE plpgsql
+""",
+    """
+CREATE FUNCTION pg_temp.to_time(value text) RETURNS time AS $$
+BEGIN
+    RETURN value::time;
+EXCEPTION WHEN others THEN
+    BEGIN
+        RETURN value::timestamp::time;
+    EXCEPTION WHEN others THEN
+        RETURN NULL;
+    END;
+END $$ LANGUAGE plpgsql
+""",
+]
+
+
+def backfill(table: str) -> None:
+    """Copies the parsed strings over one id range at a time.
+
+    Runs in autocommit, so every batch is its own short transaction and
+    the table isn't locked for the whole backfill.
+    """
+    conn = op.get_bind()
+    low, high = conn.execute(sa.text(f"SELECT min(id), max(id) FROM {table}")).one()
+    if low is None:
+        return
+
+    assignments = ", ".join(
+        f"{typed} = {parse}({column})" for column, typed, _, parse in CONVERSIONS[table]
+    )
+    for start in range(low, high + 1, BATCH_SIZE):
+        conn.execute(
+            sa.text(
+                f"UPDATE {table} SET {assignments} WHERE id >= :start AND id < :stop"
+            ),
+            {"start": start, "stop": start + BATCH_SIZE},
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, conversions in CONVERSIONS.items():
+        for _, typed, type_, _ in conversions:
+            op.add_column(table, sa.Column(typed, type_, nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.execute("SET TIME ZONE 'UTC'")
+        # asyncpg runs one statement per execute
+        for function in PARSE_FUNCTIONS:
+            op.execute(function)
+        for table in CONVERSIONS:
+            backfill(table)
+
+    for table, conversions in CONVERSIONS.items():
+        for column, typed, _, _ in conversions:
+            # also drops the keyset indexes on created_at, recreated below
+            op.drop_column(table, column)
+            op.alter_column(table, typed, new_column_name=column)
+
+    for table in CONVERSIONS:
+        op.execute(f"UPDATE {table} SET created_at = now() WHERE created_at IS NULL")
+        op.execute(
+            f"UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL"
+        )
+        for column in ("created_at", "updated_at"):
+            op.alter_column(table, column, nullable=False)
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in [
+            ("ix_tasks_created_at_id", "tasks", ["created_at", "id"]),
+            ("ix_tasks_user_id_created_at", "tasks", ["user_id", "created_at"]),
+            ("ix_tasks_updated_at", "tasks", ["updated_at"]),
+            ("ix_users_created_at_id", "users", ["created_at", "id"]),
+        ]:
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_tasks_updated_at", table_name="tasks")
+    op.drop_index("ix_tasks_user_id_created_at", table_name="tasks")
+
+    for table, conversions in CONVERSIONS.items():
+        for column, _, _, _ in conversions:
+            op.execute(
+                f"ALTER TABLE {table} ALTER COLUMN {column} TYPE VARCHAR "
+                f"USING to_json({column}) #>> '{{}}'"
+            )
+            default = PREVIOUS_DEFAULTS[(table, column)]
+            fill = default or "''"
+            # times that didn't parse, or were never set, are NULL by now
+            op.execute(f"UPDATE {table} SET {column} = {fill} WHERE {column} IS NULL")
+            op.alter_column(
+                table,
+                column,
+                nullable=False,
+                server_default=sa.text(default) if default else None,
+            )
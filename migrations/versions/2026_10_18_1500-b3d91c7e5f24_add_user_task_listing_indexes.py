@@ -0,0 +1,44 @@
+"""add user task listing indexes
+
+Revision ID: b3d91c7e5f24
+Revises: 8e4f2a61b9d0
+Create Date: 2026-10-18 15:00:08.733291
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b3d91c7e5f24"
+down_revision: Union[str, Sequence[str], None] = "8e4f2a61b9d0"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # built concurrently so large tables stay writable
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tasks_user_id_is_completed_priority_id",
+            "tasks",
+            ["user_id", "is_completed", "priority", "id"],
+            postgresql_concurrently=True,
+        )
+        # open tasks are a small part of the table and what dashboards ask for
+        op.create_index(
+            "ix_tasks_open_user_id_priority_id",
+            "tasks",
+            ["user_id", "priority", "id"],
+            postgresql_where=sa.text("NOT is_completed"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_tasks_open_user_id_priority_id", table_name="tasks")
+    op.drop_index("ix_tasks_user_id_is_completed_priority_id", table_name="tasks")
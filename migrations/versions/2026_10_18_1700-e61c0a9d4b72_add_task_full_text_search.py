@@ -0,0 +1,72 @@
+"""add task full-text search
+
+Revision ID: e61c0a9d4b72
+Revises: b3d91c7e5f24
+Create Date: 2026-10-18 17:00:44.190562
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+from models.task_model import (
+    SEARCH_COLUMN,
+    SEARCH_EXTENSION,
+    SEARCH_FUNCTION,
+    SEARCH_INDEX,
+    SEARCH_TRIGGER,
+    search_vector,
+)
+
+# revision identifiers, used by Alembic.
+revision: str = "e61c0a9d4b72"
+down_revision: Union[str, Sequence[str], None] = "b3d91c7e5f24"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+
+def backfill() -> None:
+    """Fills the vectors of the rows that predate the trigger, a batch at a time.
+
+    Runs in autocommit, so every batch is its own short transaction and
+    the table isn't locked for the whole backfill.
+    """
+    conn = op.get_bind()
+    low, high = conn.execute(sa.text("SELECT min(id), max(id) FROM tasks")).one()
+    if low is None:
+        return
+
+    for start in range(low, high + 1, BATCH_SIZE):
+        conn.execute(
+            sa.text(
+                f"UPDATE tasks SET search_vector = {search_vector('tasks')} "
+                "WHERE id >= :start AND id < :stop AND search_vector IS NULL"
+            ),
+            {"start": start, "stop": start + BATCH_SIZE},
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # a nullable column without a default is only a catalog change, and the
+    # trigger keeps every row written from here on current
+    op.execute(SEARCH_COLUMN)
+    op.execute(SEARCH_FUNCTION)
+    op.execute(SEARCH_TRIGGER)
+    op.execute(SEARCH_EXTENSION)
+
+    with op.get_context().autocommit_block():
+        backfill()
+        op.execute(f"CREATE INDEX CONCURRENTLY {SEARCH_INDEX}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_tasks_search", table_name="tasks")
+    op.execute("DROP TRIGGER tasks_search_vector ON tasks")
+    op.execute("DROP FUNCTION tasks_search_vector()")
+    op.drop_column("tasks", "search_vector")
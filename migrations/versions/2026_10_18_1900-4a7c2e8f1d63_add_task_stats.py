@@ -0,0 +1,42 @@
+"""add task_stats
+
+Revision ID: 4a7c2e8f1d63
+Revises: e61c0a9d4b72
+Create Date: 2026-10-18 19:00:15.864027
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4a7c2e8f1d63"
+down_revision: Union[str, Sequence[str], None] = "e61c0a9d4b72"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "task_stats",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("is_completed", sa.Boolean(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "priority", "is_completed"),
+    )
+    # the same as services.task_stats.reconcile_task_stats
+    op.execute(
+        "INSERT INTO task_stats (user_id, priority, is_completed, count) "
+        "SELECT user_id, priority, is_completed, count(*) FROM tasks "
+        "GROUP BY user_id, priority, is_completed"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("task_stats")
@@ -1,18 +1,91 @@
-from datetime import datetime, timezone
-from typing import Annotated
+import re
+from datetime import datetime, time, timezone
+from typing import Annotated, Any, Optional
 
-from sqlalchemy import Integer, String
+from sqlalchemy import DateTime, Integer, Time, TypeDecorator
 from sqlalchemy.orm import mapped_column
 
 # from .task_model import Task
 # from .user_model import User
 
 
-def get_current_utc_time() -> str:
-    return datetime.now(timezone.utc).isoformat()
+def get_current_utc_time() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def parse_utc_datetime(value: Any) -> Optional[datetime]:
+    """Accepts datetimes and ISO strings, naive ones are taken as UTC."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+_TIME_OF_DAY = re.compile(
+    r"^\s*(\d{1,2})(?::(\d{2}))?(?::(\d{2}))?\s*([ap]\.?m\.?)?\s*$", re.IGNORECASE
+)
+
+
+def parse_time_of_day(value: Any) -> Optional[time]:
+    """Reads "07:30", "7:30:15", "3pm", "3:15 PM" or the time of an ISO datetime."""
+    if value is None or isinstance(value, time):
+        return value
+    if isinstance(value, datetime):
+        return value.time()
+    match = _TIME_OF_DAY.match(str(value))
+    if match is None:
+        try:
+            return datetime.fromisoformat(str(value)).time()
+        except ValueError:
+            raise ValueError(f"Invalid time of day {value!r}")
+
+    hour, minute, second, meridiem = match.groups()
+    hour = int(hour)
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"Invalid time of day {value!r}")
+        hour = hour % 12 + (12 if meridiem[0].lower() == "p" else 0)
+    return time(hour, int(minute or 0), int(second or 0))
+
+
+class UTCDateTime(TypeDecorator):
+    """timestamptz that always hands back aware UTC datetimes.
+
+    SQLite has no time zones and returns naive values, they were stored as UTC.
+    """
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    @property
+    def python_type(self):
+        return datetime
+
+    def process_bind_param(self, value, dialect):
+        return parse_utc_datetime(value)
+
+    def process_result_value(self, value, dialect):
+        return parse_utc_datetime(value)
+
+
+class TimeOfDay(TypeDecorator):
+    impl = Time
+    cache_ok = True
+
+    @property
+    def python_type(self):
+        return time
+
+    def process_bind_param(self, value, dialect):
+        return parse_time_of_day(value)
 
 
 intpk = Annotated[int, mapped_column(Integer, primary_key=True)]
-DateStr = Annotated[str, mapped_column(String, default=get_current_utc_time)]
+UTCTimestamp = Annotated[
+    datetime, mapped_column(UTCDateTime, default=get_current_utc_time)
+]
 
 # __all__ = ["Task", "User"]
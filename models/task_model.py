@@ -1,12 +1,13 @@
-from typing import TYPE_CHECKING
+from datetime import time as time_of_day
+from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import DDL, ForeignKey, Index, String, event, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from core.setup import Base
 from schemas import PriorityEnum
 
-from . import DateStr, get_current_utc_time, intpk
+from . import TimeOfDay, UTCTimestamp, get_current_utc_time, intpk
 
 if TYPE_CHECKING:
     from .user_model import User
@@ -17,12 +18,118 @@ class Task(Base):
 
     title: Mapped[str] = mapped_column(String(100))
     description: Mapped[str] = mapped_column(String(255), default=None)
-    time: Mapped[str] = mapped_column(default=None)
+    time: Mapped[Optional[time_of_day]] = mapped_column(TimeOfDay, default=None)
     priority: Mapped[int] = mapped_column(default=PriorityEnum.DEFAULT.value)
     is_completed: Mapped[bool] = mapped_column(default=False)
-    created_at: Mapped[DateStr]
-    updated_at: Mapped[DateStr] = mapped_column(onupdate=get_current_utc_time)
+    created_at: Mapped[UTCTimestamp]
+    updated_at: Mapped[UTCTimestamp] = mapped_column(onupdate=get_current_utc_time)
 
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
 
     task_owner: Mapped["User"] = relationship("User", back_populates="tasks")
+
+    __table_args__ = (
+        # keyset pagination on (sort key, id)
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_priority_id", "priority", "id"),
+        # a user's tasks in a date range, and "changed since" polling
+        Index("ix_tasks_user_id_created_at", "user_id", "created_at"),
+        Index("ix_tasks_updated_at", "updated_at"),
+        # per-user listings filtered by status and priority
+        Index(
+            "ix_tasks_user_id_is_completed_priority_id",
+            "user_id",
+            "is_completed",
+            "priority",
+            "id",
+        ),
+        Index(
+            "ix_tasks_open_user_id_priority_id",
+            "user_id",
+            "priority",
+            "id",
+            postgresql_where=text("NOT is_completed"),
+            sqlite_where=text("NOT is_completed"),
+        ),
+    )
+
+
+# Full-text search over title and description. Postgres keeps a tsvector
+# column, filled by a trigger, under a GIN index, SQLite an FTS5 table synced
+# by triggers. Neither is mapped, searches reach them through
+# services.task_services. The migration adding search to existing databases
+# uses the same Postgres statements.
+def search_vector(row: str) -> str:
+    """The tsvector of a tasks row, its title weighing more than its description."""
+    return (
+        f"setweight(to_tsvector('english', coalesce({row}.title, '')), 'A') || "
+        f"setweight(to_tsvector('english', coalesce({row}.description, '')), 'B')"
+    )
+
+
+SEARCH_COLUMN = "ALTER TABLE tasks ADD COLUMN search_vector tsvector"
+SEARCH_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION tasks_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {search_vector("NEW")};
+    RETURN NEW;
+END $$ LANGUAGE plpgsql
+"""
+SEARCH_TRIGGER = """
+CREATE TRIGGER tasks_search_vector
+BEFORE INSERT OR UPDATE OF title, description ON tasks
+FOR EACH ROW EXECUTE FUNCTION tasks_search_vector()
+"""
+# lets user_id share the GIN index with the tsvector
+SEARCH_EXTENSION = "CREATE EXTENSION IF NOT EXISTS btree_gin"
+# one index serves both global and per-user searches, after CREATE INDEX
+SEARCH_INDEX = "ix_tasks_search ON tasks USING gin (user_id, search_vector)"
+
+SEARCH_DDL = {
+    "postgresql": [
+        SEARCH_COLUMN,
+        SEARCH_FUNCTION,
+        SEARCH_TRIGGER,
+        SEARCH_EXTENSION,
+        f"CREATE INDEX {SEARCH_INDEX}",
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            title, description, content='tasks', content_rowid='id'
+        )
+        """,
+        """
+        CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """,
+        """
+        CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END
+        """,
+        """
+        CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description ON tasks
+        BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO tasks_fts (rowid, title, description)
+            VALUES (new.id, new.title, new.description);
+        END
+        """,
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(
+            Task.__table__, "after_create", DDL(statement).execute_if(dialect=dialect)
+        )
+event.listen(
+    Task.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"),
+)
@@ -0,0 +1,20 @@
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from core.setup import Base
+
+
+class TaskStat(Base):
+    """How many of a user's tasks have one priority and completion status.
+
+    Kept up to date by services.task_stats, at most a handful of rows per user.
+    """
+
+    __tablename__ = "task_stats"
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    priority: Mapped[int] = mapped_column(primary_key=True)
+    is_completed: Mapped[bool] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
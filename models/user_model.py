@@ -1,11 +1,12 @@
 from typing import TYPE_CHECKING, List
 
-from sqlalchemy import String
+from sqlalchemy import Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from core.setup import Base
 
-from . import DateStr, intpk
+from . import UTCTimestamp, get_current_utc_time, intpk
+from .task_stats_model import TaskStat
 
 if TYPE_CHECKING:
     from .task_model import Task
@@ -17,8 +18,12 @@ class User(Base):
     email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
     username: Mapped[str] = mapped_column(String(50), index=True)
     password: Mapped[str] = mapped_column(String(255), index=True)
-    created_at: Mapped[DateStr]
+    created_at: Mapped[UTCTimestamp]
+    updated_at: Mapped[UTCTimestamp] = mapped_column(onupdate=get_current_utc_time)
 
     tasks: Mapped[List["Task"]] = relationship(
         "Task", back_populates="task_owner", cascade="all, delete-orphan"
     )
+    task_stats: Mapped[List[TaskStat]] = relationship(cascade="all, delete-orphan")
+
+    __table_args__ = (Index("ix_users_created_at_id", "created_at", "id"),)
@@ -26,13 +26,15 @@ def auth_user_issue_jwt_access(user: UserSchema = Depends(validate_auth_user)):
 
 
 @router.post("/refresh/", response_model=TokenInfo, response_model_exclude_none=True)
-def auth_user_issue_jwt_refresh(
+async def auth_user_issue_jwt_refresh(
     request: Request,
     user: UserSchema = Depends(get_current_auth_user_for_refresh),
     payload: dict = Depends(get_current_token_payload),
 ):
     blacklist = request.app.state.blacklist
-    blacklist.add(jti=payload["jti"], expires_at=payload["exp"], sub=payload["sub"])
+    await blacklist.add(
+        jti=payload["jti"], expires_at=payload["exp"], sub=payload["sub"]
+    )
 
     access_token = create_access_token(user)
     refresh_token = create_refresh_token(user)
@@ -41,10 +43,12 @@ def auth_user_issue_jwt_refresh(
 
 
 @router.post("/logout/")
-def auth_user_logout(
+async def auth_user_logout(
     request: Request,
     payload: dict = Depends(get_current_token_payload),
 ):
     blacklist = request.app.state.blacklist
-    blacklist.add(jti=payload["jti"], expires_at=payload["exp"], sub=payload["sub"])
+    await blacklist.add(
+        jti=payload["jti"], expires_at=payload["exp"], sub=payload["sub"]
+    )
     return {"detail": "Successfully logged out"}
@@ -1,48 +1,84 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.responses import StreamingResponse
 
+from schemas.bulk_schemas import BulkResult
+from schemas.page_schemas import Page
 from schemas.relation_schemas import TaskRelSchema
-from schemas.task_schemas import TaskSchema
+from schemas.task_schemas import TaskSchema, TaskSearchHit
 from services.task_services import (
+    bulk_create_tasks,
+    bulk_delete_tasks,
+    bulk_update_tasks,
     change_task,
     create_task,
     delete_task_by_id,
-    get_task_by_id,
+    export_tasks,
+    get_task_if_modified,
     get_tasks,
+    search_tasks,
 )
+from utils.responses import model_response
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
 
+@router.get("/export", response_class=StreamingResponse)
+async def export_tasks_handle(response: StreamingResponse = Depends(export_tasks)):
+    return response
+
+
+@router.get("/search", response_model=List[TaskSearchHit])
+async def search_tasks_handle(hits: List[TaskSearchHit] = Depends(search_tasks)):
+    return model_response(hits)
+
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_tasks_handle(result: BulkResult = Depends(bulk_create_tasks)):
+    return model_response(result)
+
+
+@router.patch("/bulk", response_model=BulkResult)
+async def bulk_update_tasks_handle(result: BulkResult = Depends(bulk_update_tasks)):
+    return model_response(result)
+
+
+@router.delete("/bulk", response_model=BulkResult)
+async def bulk_delete_tasks_handle(result: BulkResult = Depends(bulk_delete_tasks)):
+    return model_response(result)
+
+
 @router.get("/{id}", response_model=TaskRelSchema)
-async def get_task_handle(id: int):
-    task = await get_task_by_id(id)
-    return task
+async def get_task_handle(id: int, request: Request, response: Response):
+    task = await get_task_if_modified(id, request, response)
+    return model_response(task, response)
 
 
-@router.get("/", response_model=List[TaskSchema])
-async def get_tasks_handle(tasks: List[TaskSchema] = Depends(get_tasks)):
-    return tasks
+@router.get("/", response_model=Page[TaskSchema])
+async def get_tasks_handle(
+    response: Response, tasks: Page[TaskSchema] = Depends(get_tasks)
+):
+    return model_response(tasks, response)
 
 
 @router.delete("/", response_model=TaskSchema)
 async def delete_task_handle(task: TaskSchema = Depends(delete_task_by_id)):
-    return task
+    return model_response(task)
 
 
 @router.patch("/", response_model=TaskSchema)
 async def change_task_handle(task: TaskSchema = Depends(change_task)):
-    return task
+    return model_response(task, schema=TaskSchema)
 
 
 @router.post("/", response_model=TaskSchema, status_code=status.HTTP_201_CREATED)
 async def create_task_handle(task: TaskSchema = Depends(create_task)):
-    return task
+    return model_response(task, status_code=status.HTTP_201_CREATED)
 
 
 @router.post("/{id}/complete", response_model=TaskSchema)
 async def mark_task_complete_handle(id: int):
     from services.task_services import mark_task_as_complete
 
-    return await mark_task_as_complete(id)
+    return model_response(await mark_task_as_complete(id))
@@ -1,47 +1,77 @@
-from typing import List
-
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import StreamingResponse
 
+from schemas.page_schemas import Page
 from schemas.relation_schemas import UserRelSchema
+from schemas.stats_schemas import UserTaskStats
+from schemas.task_schemas import TaskSchema
 from schemas.user_schemas import UserSchema
 from services.auth_validation import (
     get_current_auth_user,
+    get_current_principal,
     get_current_token_payload,
 )
+from services.task_services import get_user_tasks
+from services.task_stats import get_user_task_stats
 from services.user_services import (
     change_user,
     delete_user_by_id,
-    get_user_by_email,
-    get_user_by_id,
+    export_users,
+    get_user_by_email_query,
+    get_user_if_modified,
     get_users,
 )
+from utils.responses import model_response
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
+@router.get("/export", response_class=StreamingResponse)
+async def export_users_handle(response: StreamingResponse = Depends(export_users)):
+    return response
+
+
 @router.get("/{user_id}", response_model=UserRelSchema)
-async def get_user_by_id_handle(user: UserRelSchema = Depends(get_user_by_id)):
-    return user
+async def get_user_by_id_handle(
+    response: Response, user: UserRelSchema = Depends(get_user_if_modified)
+):
+    return model_response(user, response)
+
+
+@router.get("/{user_id}/tasks", response_model=Page[TaskSchema])
+async def get_user_tasks_handle(
+    response: Response, tasks: Page[TaskSchema] = Depends(get_user_tasks)
+):
+    return model_response(tasks, response)
+
+
+@router.get("/{user_id}/stats", response_model=UserTaskStats)
+async def get_user_task_stats_handle(
+    stats: UserTaskStats = Depends(get_user_task_stats),
+):
+    return model_response(stats)
 
 
 @router.get("/email/", response_model=UserRelSchema)
-async def get_user_by_email_handle(user=Depends(get_user_by_email)):
-    return user
+async def get_user_by_email_handle(user=Depends(get_user_by_email_query)):
+    return model_response(user)
 
 
-@router.get("/", response_model=List[UserSchema])
-async def get_users_handle(users: List[UserSchema] = Depends(get_users)):
-    return users
+@router.get("/", response_model=Page[UserSchema])
+async def get_users_handle(
+    response: Response, users: Page[UserSchema] = Depends(get_users)
+):
+    return model_response(users, response)
 
 
 @router.delete("/", response_model=UserSchema)
 async def delete_user_handle(user: UserSchema = Depends(delete_user_by_id)):
-    return user
+    return model_response(user)
 
 
 @router.patch("/", response_model=UserSchema)
 async def change_user_handle(user: UserSchema = Depends(change_user)):
-    return user
+    return model_response(user, schema=UserSchema)
 
 
 @router.get("/me/")
@@ -56,7 +86,7 @@ def auth_person_me(
 @router.delete("/me/")
 async def auth_person_delete_me(
     payload: dict = Depends(get_current_token_payload),
-    user=Depends(get_current_auth_user),
+    user=Depends(get_current_principal),
 ):
     await delete_user_by_id(user.id)
     return {"detail": f"Your account has been deleted successfully, {user.email}."}
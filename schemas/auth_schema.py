@@ -1,7 +1,17 @@
-from pydantic import BaseModel
+from typing import Optional
+
+from pydantic import BaseModel, EmailStr
 
 
 class TokenInfo(BaseModel):
     access_token: str
     refresh_token: str | None = None
     token_type: str = "Bearer"
+
+
+class Principal(BaseModel):
+    """Caller identity taken from access token claims, no database lookup."""
+
+    id: int
+    email: Optional[EmailStr] = None
+    username: Optional[str] = None
@@ -0,0 +1,27 @@
+from typing import Any, List, Literal, Optional
+
+from pydantic import BaseModel, Field
+
+BulkMode = Literal["atomic", "partial"]
+
+
+class BulkItemResult(BaseModel):
+    index: int = Field(description="Position of the item in the request")
+    id: Optional[int] = Field(default=None, description="Id of the affected object")
+    error: Optional[Any] = Field(
+        default=None, description="Why the item was rejected, if it was"
+    )
+
+
+class BulkResult(BaseModel):
+    mode: BulkMode = Field(
+        description="`atomic` writes nothing unless every item is valid, "
+        "`partial` writes the valid items and reports the rest"
+    )
+    succeeded: int = Field(description="Amount of items written")
+    failed: int = Field(description="Amount of items rejected")
+    items: List[BulkItemResult] = Field(description="Outcome of every item, in order")
+
+
+class BulkDelete(BaseModel):
+    ids: List[int] = Field(description="Ids of the objects to delete")
@@ -0,0 +1,16 @@
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel, Field
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T] = Field(description="Objects on this page")
+    next_cursor: Optional[str] = Field(
+        default=None, description="Pass as `cursor` to get the following page"
+    )
+    prev_cursor: Optional[str] = Field(
+        default=None, description="Pass as `cursor` to get the preceding page"
+    )
+    limit: int = Field(description="Maximum amount of objects per page")
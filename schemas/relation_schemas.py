@@ -1,8 +1,14 @@
-from typing import List
+from typing import List, Literal, Optional
 
+from pydantic import Field
+
+from .stats_schemas import TaskCounts
 from .task_schemas import TaskSchema
 from .user_schemas import UserSchema
 
+# How a user's tasks are embedded: a first page, only their counts, or not at all
+TaskEmbed = Literal["page", "counts", "none"]
+
 
 class TaskRelSchema(TaskSchema):
     task_owner: "UserSchema"
@@ -10,3 +16,8 @@ class TaskRelSchema(TaskSchema):
 
 class UserRelSchema(UserSchema):
     tasks: List["TaskSchema"] = []
+    tasks_next_cursor: Optional[str] = Field(
+        default=None,
+        description="Continues the embedded tasks at /users/{id}/tasks?cursor=",
+    )
+    task_counts: Optional[TaskCounts] = None
@@ -0,0 +1,16 @@
+from typing import Dict
+
+from pydantic import BaseModel, Field
+
+
+class TaskCounts(BaseModel):
+    total: int = Field(default=0, description="All tasks")
+    open: int = Field(default=0, description="Tasks that aren't completed")
+    completed: int = Field(default=0, description="Completed tasks")
+
+
+class UserTaskStats(TaskCounts):
+    user_id: int = Field(description="Id of the user the tasks belong to")
+    by_priority: Dict[int, TaskCounts] = Field(
+        default_factory=dict, description="The same counts for each priority"
+    )
@@ -1,18 +1,22 @@
-from typing import Optional
+from datetime import datetime, time
+from typing import Annotated, Optional
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
 
-from models.__init__ import get_current_utc_time
+from models.__init__ import get_current_utc_time, parse_time_of_day
 
 from . import PriorityEnum
 
+# lenient so "3pm" and "15:00" both work
+TimeOfDay = Annotated[time, BeforeValidator(parse_time_of_day)]
+
 
 class TaskBase(BaseModel):
     title: str = Field(description="Title of the task")
     description: Optional[str] = Field(
         default=None, description="Details about the task"
     )
-    time: Optional[str] = Field(
+    time: Optional[TimeOfDay] = Field(
         default=None, description="Time when the task is supposed to be done "
     )
     priority: int = Field(
@@ -22,11 +26,12 @@ class TaskBase(BaseModel):
         default=False,
         description="Status of the task which shows, whether the task is completed or not",
     )
-    created_at: str = Field(
-        default=get_current_utc_time(), description="Date of when the task was created"
+    created_at: datetime = Field(
+        default_factory=get_current_utc_time,
+        description="Date of when the task was created",
     )
-    updated_at: str = Field(
-        default=get_current_utc_time(),
+    updated_at: datetime = Field(
+        default_factory=get_current_utc_time,
         description="Date of when the task was last updated",
     )
     user_id: int = Field(description="Id of the user this task belongs to")
@@ -38,10 +43,18 @@ class TaskSchema(TaskBase):
     id: int = Field(description="Unique identifier")
 
 
+class TaskSearchHit(TaskSchema):
+    rank: float = Field(description="Relevance to the search, higher is better")
+
+
 class TaskUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
-    time: Optional[str] = None
+    time: Optional[TimeOfDay] = None
     priority: Optional[int] = None
     is_completed: Optional[bool] = None
-    created_at: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class TaskBulkUpdate(TaskUpdate):
+    id: int = Field(description="Id of the task to update")
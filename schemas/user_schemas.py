@@ -1,9 +1,9 @@
-from typing import Optional, Self
+from datetime import datetime
+from typing import Optional
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field, SecretStr, model_validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, SecretStr
 
 from models.__init__ import get_current_utc_time
-from utils.auth_utils import hash_pwd
 
 
 class UserCreate(BaseModel):
@@ -12,20 +12,19 @@ class UserCreate(BaseModel):
     password: SecretStr = Field(min_length=4, description="Password (will be hashed)")
     model_config = ConfigDict(from_attributes=True)
 
-    @model_validator(mode="after")
-    def hash_password(self) -> Self:
-        self.password = hash_pwd(self.password.get_secret_value())  # type: ignore
-        return self
-
 
 class UserSchema(BaseModel):
     id: int = Field(description="Unique identifier")
     email: EmailStr = Field(description="User's email, one email per one user")
     username: str = Field(default="user", description="Name of the user")
-    created_at: str = Field(
-        default=get_current_utc_time(),
+    created_at: datetime = Field(
+        default_factory=get_current_utc_time,
         description="Time when user was created",
     )
+    updated_at: datetime = Field(
+        default_factory=get_current_utc_time,
+        description="Time when user was last updated",
+    )
 
     model_config = ConfigDict(from_attributes=True)
 
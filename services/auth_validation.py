@@ -6,11 +6,12 @@ from fastapi.security import HTTPAuthorizationCredentials
 from pydantic import EmailStr
 
 from core.setup import get_db
-from schemas.user_schemas import UserLogin
+from schemas.auth_schema import Principal
+from schemas.user_schemas import UserLogin, UserSchema
 from services.user_services import (
     get_user_by_email,
     get_user_by_email_for_login,
-    get_user_by_id,
+    get_user_for_auth,
 )
 from utils.auth_helper import (
     ACCESS_TOKEN_TYPE,
@@ -18,7 +19,8 @@ from utils.auth_helper import (
     TOKEN_TYPE_FIELD,
     http_bearer,
 )
-from utils.auth_utils import decode_jwt, validate_pwd
+from utils.auth_utils import decode_jwt_cached
+from utils.hashing import password_hasher
 
 
 async def validate_auth_user(
@@ -26,11 +28,13 @@ async def validate_auth_user(
 ):
     user_login: UserLogin = await get_user_by_email_for_login(email, session)
     if user_login is not None:
-        if validate_pwd(password, user_login.password.get_secret_value()):
-            return await get_user_by_email(email, session)
+        if await password_hasher.verify(
+            password, user_login.password.get_secret_value()
+        ):
+            return await get_user_by_email(email, embed="none", session=session)
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
-        detail=f"Invalid password or email, {email}, {password}, {user_login.password.get_secret_value()}, {validate_pwd(password=password, hashed_password=user_login.password.get_secret_value())}",
+        detail=f"Invalid password or email, {email}",
     )
 
 
@@ -46,7 +50,7 @@ async def get_current_token_payload(
         )
 
     try:
-        payload = decode_jwt(token)
+        payload = decode_jwt_cached(token)
     except jwt.PyJWTError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -57,7 +61,7 @@ async def get_current_token_payload(
 
 async def validate_blacklisted_token(payload: dict, request: Request):
     blacklist = request.app.state.blacklist
-    if blacklist.is_blacklisted(payload["jti"]):
+    if await blacklist.is_blacklisted(payload["jti"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Your token is blacklisted use newer token, or log in to get another one",
@@ -67,7 +71,7 @@ async def validate_blacklisted_token(payload: dict, request: Request):
 
 async def validate_suspicious_token(payload: dict, request: Request):
     blacklist = request.app.state.blacklist
-    earliest_token_expiry: int | None = blacklist.is_suspicious(payload["sub"])
+    earliest_token_expiry: int | None = await blacklist.is_suspicious(payload["sub"])
     if earliest_token_expiry:
         earliest_token_expiry_dt = datetime.fromtimestamp(
             earliest_token_expiry, tz=timezone.utc
@@ -89,17 +93,35 @@ async def validate_token_type(payload: dict, expected_token_type: str):
     return True
 
 
-class UserGetterFromToken:
+class PrincipalGetterFromToken:
     def __init__(self, token_type: str):
         self.token_type = token_type
 
     async def __call__(
         self, request: Request, payload: dict = Depends(get_current_token_payload)
-    ):
+    ) -> Principal:
         await validate_token_type(payload, self.token_type)
         await validate_blacklisted_token(payload, request)
         await validate_suspicious_token(payload, request)
-        return await get_user_by_id(int(payload.get("sub")))
+        return Principal(
+            id=int(payload["sub"]),
+            email=payload.get("email"),
+            username=payload.get("username"),
+        )
+
+
+get_current_principal = PrincipalGetterFromToken(ACCESS_TOKEN_TYPE)
+
+
+class UserGetterFromToken:
+    def __init__(self, token_type: str):
+        self.principal_getter = PrincipalGetterFromToken(token_type)
+
+    async def __call__(
+        self, request: Request, payload: dict = Depends(get_current_token_payload)
+    ) -> UserSchema:
+        principal = await self.principal_getter(request, payload)
+        return await get_user_for_auth(principal.id)
 
 
 get_current_auth_user = UserGetterFromToken(ACCESS_TOKEN_TYPE)
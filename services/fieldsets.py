@@ -0,0 +1,74 @@
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@dataclass(frozen=True)
+class Expansion:
+    """A related value `expand=` can add to every item of a list.
+
+    `load` gets the `requires` column of each row and returns the value for
+    each of them, in one query for the whole page.
+    """
+
+    annotation: Any
+    requires: str
+    load: Callable[[AsyncSession, List[Any]], Awaitable[Dict[Any, Any]]]
+    default: Any = None
+
+
+@dataclass(frozen=True)
+class FieldSet:
+    """Columns to select and the response model for one fields/expand combination."""
+
+    names: Tuple[str, ...]
+    expand: Tuple[str, ...]
+    columns: Tuple[Any, ...]
+    model: type[BaseModel]
+    adapter: TypeAdapter
+
+
+def parse_names(raw: Optional[str], allowed: Sequence[str], param: str) -> Tuple:
+    """Splits "a,b" into sorted, known names; unknown ones are a 400."""
+    if not raw:
+        return ()
+    names = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = names - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown {param} {sorted(unknown)}, use some of {list(allowed)}",
+        )
+    return tuple(sorted(names))
+
+
+def build_fieldset(
+    schema: type[BaseModel],
+    table: Any,
+    names: Tuple[str, ...],
+    expand: Tuple[str, ...],
+    expansions: Dict[str, Expansion],
+) -> FieldSet:
+    """A trimmed copy of `schema` with only `names`, plus the expanded relations."""
+    names = names or tuple(schema.model_fields)
+    fields: Dict[str, Any] = {
+        name: (info.annotation, info)
+        for name, info in schema.model_fields.items()
+        if name in names
+    }
+    for name in expand:
+        expansion = expansions[name]
+        fields[name] = (expansion.annotation, expansion.default)
+    model = create_model(
+        f"{schema.__name__}_{'_'.join(names + expand)}",
+        __config__=ConfigDict(from_attributes=True),
+        **fields,
+    )
+
+    # id for cursors, and whatever the expansions look up
+    needed = {"id", *names, *(expansions[name].requires for name in expand)}
+    columns = tuple(column for column in table.c if column.name in needed)
+    return FieldSet(names, expand, columns, model, TypeAdapter(List[model]))
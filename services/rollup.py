@@ -0,0 +1,71 @@
+from collections import Counter
+from typing import Any, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import DeclarativeBase
+
+
+class Rollup:
+    """Row counts of `source` grouped by `keys`, stored in `model`.
+
+    Writers pass the keys of the rows they removed and added, and the counters
+    are moved by the difference in the writer's own transaction, so they
+    commit or roll back together with the rows.
+    """
+
+    def __init__(self, model: type[DeclarativeBase], source: Any, keys: Sequence[str]):
+        self.model = model
+        self.source = source
+        self.keys = tuple(keys)
+
+    def key(self, obj: Any) -> Tuple:
+        return tuple(getattr(obj, name) for name in self.keys)
+
+    async def keys_of(self, session: AsyncSession, ids: Iterable[int]) -> List[Tuple]:
+        """Current keys of the source rows with these ids, for bulk writes."""
+        columns = [getattr(self.source, name) for name in self.keys]
+        query = select(*columns).where(self.source.id.in_(set(ids)))
+        return [tuple(row) for row in await session.execute(query)]
+
+    async def apply(
+        self,
+        session: AsyncSession,
+        removed: Iterable[Tuple] = (),
+        added: Iterable[Tuple] = (),
+    ) -> None:
+        deltas = Counter(added)
+        deltas.subtract(removed)
+        # sorted, so concurrent writers lock counter rows in the same order
+        rows = [
+            {**dict(zip(self.keys, key)), "count": delta}
+            for key, delta in sorted(deltas.items())
+            if delta
+        ]
+        if not rows:
+            return
+
+        table = self.model.__table__
+        dialect = postgresql if session.bind.dialect.name == "postgresql" else sqlite
+        query = dialect.insert(table)
+        query = query.on_conflict_do_update(
+            index_elements=list(self.keys),
+            set_={"count": table.c.count + query.excluded.count},
+        )
+        await session.execute(query, rows)
+
+    async def rebuild(self, session: AsyncSession) -> None:
+        """Recounts everything from the source table, fixing any drift."""
+        table = self.model.__table__
+        if session.bind.dialect.name == "postgresql":
+            # writers wait for the rebuild instead of moving counters under it
+            await session.execute(text(f"LOCK TABLE {table.name} IN EXCLUSIVE MODE"))
+        columns = [getattr(self.source, name) for name in self.keys]
+        await session.execute(delete(table))
+        await session.execute(
+            insert(table).from_select(
+                [*self.keys, "count"],
+                select(*columns, func.count()).group_by(*columns),
+            )
+        )
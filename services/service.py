@@ -1,15 +1,94 @@
-from typing import Generic, List, TypeVar
+from collections import defaultdict
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 from fastapi import HTTPException, status
-from pydantic import BaseModel
-from sqlalchemy import select
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import (
+    cast,
+    column,
+    delete,
+    insert,
+    select,
+    tuple_,
+    update,
+    values,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import DeclarativeBase
 
-from core.setup import async_session_factory
+from core.config import settings
+from core.setup import session_scope
+from schemas.bulk_schemas import BulkItemResult, BulkMode, BulkResult
+from schemas.page_schemas import Page
+from utils.entity_cache import EntityCache, invalidate_entities
+from utils.etag import latest, make_etag
+from utils.pagination import cursor_value, decode_cursor, page_cursor
+
+from .fieldsets import Expansion, FieldSet, build_fieldset, parse_names
+from .rollup import Rollup
 
 M = TypeVar("M", bound=DeclarativeBase)
 P = TypeVar("P", bound=BaseModel)
 
+# (session, obj) -> rel_schema of obj, for relations too large to load eagerly
+RelLoader = Callable[[AsyncSession, Any], Awaitable[BaseModel]]
+
+# (session, ids) -> cache entries of other entities that embed these objects
+RelatedEntities = Callable[
+    [AsyncSession, Sequence[int]], Awaitable[Iterable[Tuple[str, int]]]
+]
+
+
+def validate_items(
+    items: List[Dict[str, Any]], schema: type[BaseModel]
+) -> Tuple[Dict[int, BaseModel], Dict[int, Any]]:
+    """Validates every item in one pass, returning valid items and errors by index."""
+    valid, errors = {}, {}
+    for index, item in enumerate(items):
+        try:
+            valid[index] = schema.model_validate(item)
+        except ValidationError as e:
+            errors[index] = e.errors(include_url=False, include_context=False)
+    return valid, errors
+
+
+def check_bulk_errors(mode: BulkMode, errors: Dict[int, Any]) -> None:
+    """In atomic mode any rejected item fails the whole batch before writing."""
+    if mode == "atomic" and errors:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[
+                {"index": index, "error": error}
+                for index, error in sorted(errors.items())
+            ],
+        )
+
+
+def bulk_result(
+    mode: BulkMode, size: int, ids: Dict[int, int], errors: Dict[int, Any]
+) -> BulkResult:
+    items = [
+        BulkItemResult(index=index, id=ids.get(index), error=errors.get(index))
+        for index in range(size)
+    ]
+    return BulkResult(mode=mode, succeeded=len(ids), failed=len(errors), items=items)
+
 
 class Service(Generic[M, P]):
     def __init__(
@@ -20,63 +99,413 @@ class Service(Generic[M, P]):
         schema_base: P,
         schema_update: P,
         rel_schema: P,
+        sort_fields: Sequence[str] = ("id",),
+        cache: Optional[EntityCache] = None,
+        related_entities: Optional[RelatedEntities] = None,
+        rollup: Optional[Rollup] = None,
+        rel_loader: Optional[RelLoader] = None,
+        expansions: Optional[Dict[str, Expansion]] = None,
     ):
         self.model = model
+        self.sort_fields = sort_fields
+        self.cache = cache
+        self.related_entities = related_entities
+        self.rollup = rollup
+        self.rel_loader = rel_loader
+        self.expansions = expansions or {}
+        self._fieldsets: Dict[Tuple, FieldSet] = {}
         self.model_options = model_options
         self.schema = schema
         self.schema_base = schema_base
         self.schema_update = schema_update
         self.rel_schema = rel_schema
 
+        # Projection for list endpoints: table columns for the schema's fields,
+        # read as plain rows and validated in one call, no ORM objects involved
+        table = model.__table__  # type: ignore
+        self.columns = [
+            table.c[name] for name in schema.model_fields if name in table.c
+        ]  # type: ignore
+        self.list_adapter = TypeAdapter(List[schema])  # type: ignore
+
+    async def cache_entries(
+        self, session: AsyncSession, ids: Iterable[int]
+    ) -> Set[Tuple[str, int]]:
+        """Cache entries showing any of `ids`: their own and their related objects'."""
+        ids = list(ids)
+        if self.cache is None or not ids:
+            return set()
+        entries = {(self.cache.name, obj_id) for obj_id in ids}
+        if self.related_entities is not None:
+            entries.update(await self.related_entities(session, ids))
+        return entries
+
     async def create_obj(self, obj_data: BaseModel) -> P:
-        async with async_session_factory() as session:
+        async with session_scope() as session:
             new_obj = self.model(**obj_data.model_dump())  # type: ignore
             session.add(new_obj)
+            await session.flush()
+            if self.rollup is not None:
+                await self.rollup.apply(session, added=[self.rollup.key(new_obj)])
+            # collected before commit, which gives the connection back
+            entries = await self.cache_entries(session, [new_obj.id])
 
             await session.commit()
             await session.refresh(new_obj)
 
+            await invalidate_entities(entries)
             return self.schema.model_validate(new_obj)
 
-    async def get_by_id(self, obj_id: int) -> P:
-        async with async_session_factory() as session:
-            obj = await session.get(self.model, obj_id, options=self.model_options)  # type: ignore
+    async def get_by_id(self, obj_id: int, with_relations: bool = True) -> P:
+        if with_relations and self.cache is not None:
+            raw = await self.cache.get_or_load(
+                obj_id, lambda: self._load_rel_json(obj_id)
+            )
+            return self.rel_schema.model_validate_json(raw)
+        return await self._load(obj_id, with_relations)
+
+    async def _load_rel_json(self, obj_id: int) -> str:
+        return (await self._load(obj_id, with_relations=True)).model_dump_json()
+
+    async def _load(self, obj_id: int, with_relations: bool) -> P:
+        async with session_scope() as session:
+            options = self.model_options if with_relations else []
+            # the request's session may already hold this object without relations
+            obj = await session.get(
+                self.model,  # type: ignore
+                obj_id,
+                options=options,
+                populate_existing=bool(options),
+            )
             if obj is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"No {self.model.__name__} with id ({obj_id}) found",
                 )
-            return self.rel_schema.model_validate(obj)
+            if not with_relations:
+                return self.schema.model_validate(obj)
+            return await self.to_rel(session, obj)
+
+    async def to_rel(self, session: AsyncSession, obj: Any) -> P:
+        if self.rel_loader is not None:
+            return await self.rel_loader(session, obj)  # type: ignore
+        return self.rel_schema.model_validate(obj)
+
+    def fieldset(
+        self, fields: Optional[str] = None, expand: Optional[str] = None
+    ) -> Optional[FieldSet]:
+        """Trimmed columns and model for `fields=` / `expand=`, None for the full schema.
+
+        Built once per combination and reused, requests don't create models.
+        """
+        names = parse_names(fields, list(self.schema.model_fields), "fields")
+        expanded = parse_names(expand, list(self.expansions), "expand")
+        if not names and not expanded:
+            return None
+        key = (names, expanded)
+        if key not in self._fieldsets:
+            self._fieldsets[key] = build_fieldset(
+                self.schema,  # type: ignore
+                self.model.__table__,  # type: ignore
+                names,
+                expanded,
+                self.expansions,
+            )
+        return self._fieldsets[key]
+
+    async def build_items(
+        self, session: AsyncSession, rows: Sequence, fieldset: Optional[FieldSet]
+    ) -> List[Any]:
+        if fieldset is None:
+            return self.list_adapter.validate_python(rows, from_attributes=True)
+
+        items = [dict(row._mapping) for row in rows]
+        for name in fieldset.expand:
+            expansion = self.expansions[name]
+            keys = {item[expansion.requires] for item in items}
+            loaded = await expansion.load(session, list(keys))
+            for item in items:
+                item[name] = loaded.get(item[expansion.requires], expansion.default)
+        return fieldset.adapter.validate_python(items)
+
+    def _page_query(
+        self,
+        cursor: Optional[str],
+        limit: int,
+        sort: str,
+        order: Literal["asc", "desc"],
+        filters: Sequence,
+        columns: Sequence = (),
+    ):
+        if sort not in self.sort_fields:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Can't sort {self.model.__name__} by {sort!r}, use one of {list(self.sort_fields)}",
+            )
+        sort_col = getattr(self.model, sort)
+        id_col = self.model.id  # type: ignore
+        keyset = [id_col] if sort == "id" else [sort_col, id_col]
+
+        position = decode_cursor(cursor) if cursor else None
+        if position and (position.get("s"), position.get("o")) != (sort, order):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor was issued for a different sort order",
+            )
+        backwards = bool(position) and position.get("d") == "prev"
+        descending = (order == "desc") != backwards
+
+        columns = list(columns or self.columns)
+        table = self.model.__table__  # type: ignore
+        if table.c[sort] not in columns:
+            columns.append(table.c[sort])  # cursors need the sort value
+        query = select(*columns).where(*filters)
+        if position:
+            try:
+                values = [cursor_value(id_col, position["id"])]
+                if sort != "id":
+                    values.insert(0, cursor_value(sort_col, position["v"]))
+            except (KeyError, TypeError, ValueError) as e:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid cursor: {e!r}",
+                )
+            keys, bound = tuple_(*keyset), tuple_(*values)
+            query = query.where(keys < bound if descending else keys > bound)
+        query = query.order_by(
+            *[col.desc() if descending else col.asc() for col in keyset]
+        ).limit(limit + 1)
+        return query, position, backwards
+
+    async def page_version(
+        self,
+        cursor: Optional[str],
+        limit: int,
+        sort: str = "id",
+        order: Literal["asc", "desc"] = "asc",
+        filters: Sequence = (),
+        fieldset: Optional[FieldSet] = None,
+    ) -> Tuple[str, Optional[datetime]]:
+        """ETag and Last-Modified of a page, from its ids and update times only.
+
+        Expanded relations aren't covered, callers don't answer 304 for them.
+        """
+        query, _, _ = self._page_query(cursor, limit, sort, order, filters)
+        query = query.with_only_columns(self.model.id, self.model.updated_at)  # type: ignore
+        async with session_scope() as session:
+            rows = [tuple(row) for row in await session.execute(query)]
+        variant = (fieldset.names, fieldset.expand) if fieldset else None
+        etag = make_etag(self.model.__name__, cursor, limit, sort, order, variant, rows)
+        return etag, latest(updated_at for _, updated_at in rows)
+
+    async def get_page(
+        self,
+        cursor: Optional[str],
+        limit: int,
+        sort: str = "id",
+        order: Literal["asc", "desc"] = "asc",
+        filters: Sequence = (),
+        fieldset: Optional[FieldSet] = None,
+    ) -> Page[P]:
+        """Keyset pagination on (sort, id), served by the matching index."""
+        query, position, backwards = self._page_query(
+            cursor,
+            limit,
+            sort,
+            order,
+            filters,
+            fieldset.columns if fieldset else self.columns,
+        )
+
+        async with session_scope() as session:
+            rows = list((await session.execute(query)).all())
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            if backwards:
+                rows.reverse()
+            items = await self.build_items(session, rows, fieldset)
+
+        next_cursor = prev_cursor = None
+        if rows:
+            # walking backwards we came from a later page, so one exists
+            if has_more or backwards:
+                next_cursor = page_cursor(rows[-1], sort, order, "next")
+            if (has_more and backwards) or (position and not backwards):
+                prev_cursor = page_cursor(rows[0], sort, order, "prev")
+
+        model = fieldset.model if fieldset else self.schema
+        return Page[model](  # type: ignore
+            items=items,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+            limit=limit,
+        )
+
+    async def stream_rows(
+        self,
+        fields: Sequence[str],
+        filters: Sequence = (),
+        batch_size: int = settings.export_batch_size,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yields plain column rows from a server-side cursor, `batch_size` at a time."""
+        columns = [getattr(self.model, field) for field in fields]
+        query = (
+            select(*columns)
+            .where(*filters)
+            .order_by(self.model.id)  # type: ignore
+            .execution_options(yield_per=batch_size)
+        )
+        async with session_scope() as session:
+            result = await session.stream(query)
+            async for row in result.mappings():
+                yield row
+
+    async def existing_ids(self, ids: Iterable[int]) -> Set[int]:
+        query = select(self.model.id).where(self.model.id.in_(set(ids)))  # type: ignore
+        async with session_scope() as session:
+            return set((await session.scalars(query)).all())
+
+    async def bulk_create(self, rows: List[Dict[str, Any]]) -> List[P]:
+        """Inserts all rows with multi-row INSERT ... RETURNING, in one transaction."""
+        if not rows:
+            return []
+        query = insert(self.model).returning(  # type: ignore
+            self.model, sort_by_parameter_order=True
+        )
+        async with session_scope() as session:
+            objs = (await session.scalars(query, rows)).all()
+            created = [self.schema.model_validate(obj) for obj in objs]
+            if self.rollup is not None:
+                await self.rollup.apply(
+                    session, added=[self.rollup.key(obj) for obj in objs]
+                )
+            entries = await self.cache_entries(session, [obj.id for obj in created])
+            await session.commit()
+        await invalidate_entities(entries)
+        return created
+
+    async def bulk_update(self, rows: List[Dict[str, Any]]) -> None:
+        """Applies per-row changes keyed by `id`, in one transaction.
+
+        Rows changing the same columns go out together as
+        UPDATE ... FROM (VALUES ...) on Postgres; other dialects fall back
+        to an executemany UPDATE by primary key.
+        """
+        groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            fields = tuple(sorted(key for key in row if key != "id"))
+            if fields:
+                groups[fields].append(row)
+
+        table = self.model.__table__  # type: ignore
+        ids = [row["id"] for row in rows]
+        async with session_scope() as session:
+            entries = await self.cache_entries(session, ids)
+            if self.rollup is not None:
+                removed = await self.rollup.keys_of(session, ids)
+            use_values = session.bind.dialect.name == "postgresql"
+            for fields, group in groups.items():
+                if not use_values:
+                    await session.execute(update(self.model), group)  # type: ignore
+                    continue
+
+                names = ("id", *fields)
+                size = settings.bulk_chunk_size
+                for start in range(0, len(group), size):
+                    rows_values = values(
+                        *[column(name, table.c[name].type) for name in names],
+                        name="v",
+                    ).data(
+                        [
+                            tuple(row[name] for name in names)
+                            for row in group[start : start + size]
+                        ]
+                    )
+                    # VALUES params arrive untyped, so cast back to the column types
+                    query = (
+                        update(self.model)  # type: ignore
+                        .where(table.c.id == cast(rows_values.c.id, table.c.id.type))
+                        .values(
+                            {
+                                name: cast(rows_values.c[name], table.c[name].type)
+                                for name in fields
+                            }
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                    await session.execute(query)
+            # related objects may have changed too, e.g. a task's owner
+            entries |= await self.cache_entries(session, ids)
+            if self.rollup is not None:
+                await self.rollup.apply(
+                    session, removed, await self.rollup.keys_of(session, ids)
+                )
+            await session.commit()
+        await invalidate_entities(entries)
 
-    async def get_all(self, offset: int, limit: int) -> List[P]:
-        async with async_session_factory() as session:
-            query = select(self.model).offset(offset).limit(limit)  # type: ignore
-            res = await session.scalars(query)
-            objs = res.all()
-            return [self.schema.model_validate(obj) for obj in objs]
+    async def bulk_delete(self, ids: Iterable[int]) -> Set[int]:
+        ids = set(ids)
+        query = (
+            delete(self.model)  # type: ignore
+            .where(self.model.id.in_(ids))  # type: ignore
+            .returning(self.model.id)  # type: ignore
+        )
+        async with session_scope() as session:
+            entries = await self.cache_entries(session, ids)
+            if self.rollup is not None:
+                await self.rollup.apply(
+                    session, removed=await self.rollup.keys_of(session, ids)
+                )
+            deleted = set((await session.scalars(query)).all())
+            await session.commit()
+        await invalidate_entities(entries)
+        return deleted
 
     async def delete_obj_by_id(self, obj_id: int) -> P:
-        async with async_session_factory() as session:
+        async with session_scope() as session:
             obj = await session.get(self.model, obj_id)  # type: ignore
             if obj is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail=f"No {self.model.__name__} with id ({obj_id}) found",
                 )
+            entries = await self.cache_entries(session, [obj_id])
+            if self.rollup is not None:
+                await self.rollup.apply(session, removed=[self.rollup.key(obj)])
             await session.delete(obj)
             await session.commit()
+            await invalidate_entities(entries)
 
             return self.schema.model_validate(obj)
 
     async def change_obj(self, obj_data: P, obj_id: int) -> P:
-        async with async_session_factory() as session:
-            obj_to_change = await session.get(self.model, obj_id)  # type: ignore
+        async with session_scope() as session:
+            obj_to_change = await session.get(
+                self.model,  # type: ignore
+                obj_id,
+                options=self.model_options,
+                populate_existing=True,
+            )
+            if obj_to_change is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"No {self.model.__name__} with id ({obj_id}) found",
+                )
+            entries = await self.cache_entries(session, [obj_id])
             obj_data_dict = obj_data.model_dump(exclude_unset=True)
+            before = self.rollup.key(obj_to_change) if self.rollup else None
 
             for key, val in obj_data_dict.items():
                 setattr(obj_to_change, key, val)
+            await session.flush()
+            if self.rollup is not None:
+                await self.rollup.apply(
+                    session, [before], [self.rollup.key(obj_to_change)]
+                )
+            entries |= await self.cache_entries(session, [obj_id])
 
             await session.commit()
             await session.refresh(obj_to_change)
 
-            return self.rel_schema.model_validate(obj_to_change)
+            await invalidate_entities(entries)
+            return await self.to_rel(session, obj_to_change)
@@ -1,18 +1,57 @@
-from typing import List
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional, Sequence
 
-from fastapi import HTTPException, status
+from fastapi import Body, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import Select, column, func, literal_column, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from core.setup import async_session_factory
+from core.config import settings
+from core.setup import session_scope
 from models.task_model import Task
 from models.user_model import User
+from schemas.bulk_schemas import BulkDelete, BulkMode, BulkResult
+from schemas.page_schemas import Page
 from schemas.relation_schemas import TaskRelSchema
-from schemas.task_schemas import TaskBase, TaskSchema, TaskUpdate
+from schemas.task_schemas import (
+    TaskBase,
+    TaskBulkUpdate,
+    TaskSchema,
+    TaskSearchHit,
+    TaskUpdate,
+)
+from schemas.user_schemas import UserSchema
+from utils.entity_cache import EntityCache, invalidate_entities
+from utils.etag import conditional_response, latest, make_etag
+from utils.export import ExportFormat, export_response
 
-from .service import Service
+from .fieldsets import Expansion
+from .service import Service, bulk_result, check_bulk_errors, validate_items
+from .task_stats import task_stats
 
 user_model = User  # circular import models fix
 
+
+async def task_related_entities(session: AsyncSession, ids: Sequence[int]):
+    """A task shows up in its owner's UserRelSchema."""
+    owners = await session.scalars(select(Task.user_id).where(Task.id.in_(ids)))
+    return [("user", user_id) for user_id in set(owners.all())]
+
+
+owner_columns = [User.__table__.c[name] for name in UserSchema.model_fields]
+owners_adapter = TypeAdapter(List[UserSchema])
+
+
+async def load_task_owners(session: AsyncSession, user_ids: List[int]):
+    """expand=task_owner: every owner on a page in one query."""
+    query = select(*owner_columns).where(User.id.in_(user_ids))
+    rows = (await session.execute(query)).mappings().all()
+    return {owner.id: owner for owner in owners_adapter.validate_python(rows)}
+
+
 task_service: Service = Service(
     model=Task,
     model_options=[selectinload(Task.task_owner)],
@@ -20,8 +59,21 @@ task_service: Service = Service(
     schema_base=TaskBase,
     schema_update=TaskUpdate,
     rel_schema=TaskRelSchema,
+    sort_fields=("id", "created_at", "priority"),
+    # a cached task embeds its owner, whose writes orphan it by version
+    cache=EntityCache("task", parent=("user", lambda raw: json.loads(raw)["user_id"])),
+    related_entities=task_related_entities,
+    rollup=task_stats,
+    expansions={
+        "task_owner": Expansion(Optional[UserSchema], "user_id", load_task_owners)
+    },
 )
 
+FIELDS_QUERY = Query(
+    default=None, description="Comma separated fields to return, e.g. id,title"
+)
+EXPAND_QUERY = Query(default=None, description="Relations to include: task_owner")
+
 
 async def create_task(task_data: TaskBase) -> TaskSchema:
     return await task_service.create_obj(task_data)
@@ -31,8 +83,176 @@ async def get_task_by_id(task_id: int) -> TaskRelSchema:
     return await task_service.get_by_id(task_id)
 
 
-async def get_tasks(offset: int = 0, limit: int = 5) -> List[TaskSchema]:
-    return await task_service.get_all(offset, limit)
+async def get_task_if_modified(
+    task_id: int, request: Request, response: Response
+) -> TaskRelSchema | Response:
+    """Answers 304 from the task's and its owner's update times if nothing changed."""
+    query = (
+        select(Task.updated_at, User.updated_at)
+        .join(User, Task.user_id == User.id)
+        .where(Task.id == task_id)
+    )
+    async with session_scope() as session:
+        version = (await session.execute(query)).first()
+    if version is not None:
+        etag = make_etag("Task", task_id, *version)
+        not_modified = conditional_response(request, response, etag, latest(version))
+        if not_modified is not None:
+            return not_modified
+    return await get_task_by_id(task_id)
+
+
+async def get_tasks(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(
+        default=settings.default_page_size, ge=1, le=settings.max_page_size
+    ),
+    sort: str = "id",
+    order: Literal["asc", "desc"] = "asc",
+    fields: Optional[str] = FIELDS_QUERY,
+    expand: Optional[str] = EXPAND_QUERY,
+) -> Page[TaskSchema] | Response:
+    fieldset = task_service.fieldset(fields, expand)
+    if fieldset is None or not fieldset.expand:
+        etag, last_modified = await task_service.page_version(
+            cursor, limit, sort, order, fieldset=fieldset
+        )
+        not_modified = conditional_response(request, response, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+    return await task_service.get_page(cursor, limit, sort, order, fieldset=fieldset)
+
+
+async def get_user_tasks(
+    user_id: int,
+    request: Request,
+    response: Response,
+    is_completed: Optional[bool] = None,
+    priority: Optional[int] = None,
+    min_priority: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(
+        default=settings.default_page_size, ge=1, le=settings.max_page_size
+    ),
+    sort: str = "id",
+    order: Literal["asc", "desc"] = "asc",
+    fields: Optional[str] = FIELDS_QUERY,
+) -> Page[TaskSchema] | Response:
+    """One user's tasks, filtered and sorted by the database.
+
+    Served by the (user_id, is_completed, priority, id) index, and open tasks
+    by the partial index over them only.
+    """
+    async with session_scope() as session:
+        owner = await session.scalar(select(User.id).where(User.id == user_id))
+        if owner is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User with id {user_id} not found",
+            )
+
+    filters = [Task.user_id == user_id]
+    if is_completed is not None:
+        filters.append(Task.is_completed == is_completed)
+    if priority is not None:
+        filters.append(Task.priority == priority)
+    if min_priority is not None:
+        filters.append(Task.priority >= min_priority)
+    if created_from is not None:
+        filters.append(Task.created_at >= created_from)
+    if created_to is not None:
+        filters.append(Task.created_at < created_to)
+
+    fieldset = task_service.fieldset(fields)
+    etag, last_modified = await task_service.page_version(
+        cursor, limit, sort, order, filters, fieldset
+    )
+    not_modified = conditional_response(request, response, etag, last_modified)
+    if not_modified is not None:
+        return not_modified
+    return await task_service.get_page(cursor, limit, sort, order, filters, fieldset)
+
+
+def fts5_query(q: str) -> str:
+    """Every word as a quoted FTS5 string, so user input can't be query syntax."""
+    words = q.split()
+    return " ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+
+def task_search_query(dialect: str, q: str) -> Select:
+    """Tasks matching `q` with their rank, on the dialect's full-text index."""
+    if dialect == "postgresql":
+        tsquery = func.websearch_to_tsquery("english", q)
+        vector = literal_column("tasks.search_vector")
+        rank = func.ts_rank_cd(vector, tsquery)
+        return select(Task, rank.label("rank")).where(vector.op("@@")(tsquery))
+
+    fts = table("tasks_fts", column("rowid"))
+    # MATCH and bm25 take the table itself, not one of its columns
+    fts_table = literal_column("tasks_fts")
+    # bm25 is lower for better matches; titles weigh twice as much
+    rank = -func.bm25(fts_table, 2.0, 1.0)
+    return (
+        select(Task, rank.label("rank"))
+        .join(fts, fts.c.rowid == Task.id)
+        .where(fts_table.op("MATCH")(fts5_query(q)))
+    )
+
+
+async def search_tasks(
+    q: str = Query(min_length=1, max_length=200),
+    user_id: Optional[int] = None,
+    limit: int = Query(
+        default=settings.default_page_size, ge=1, le=settings.max_page_size
+    ),
+) -> List[TaskSearchHit]:
+    """Best matches first, at most `limit` of them.
+
+    The index finds the matches, but every one of them is ranked before the
+    top `limit` are kept, so a query matching most tasks costs about as much
+    as reading them all.
+    """
+    if not q.strip():
+        return []
+    async with session_scope() as session:
+        query = task_search_query(session.bind.dialect.name, q)
+        if user_id is not None:
+            query = query.where(Task.user_id == user_id)
+        query = query.order_by(literal_column("rank").desc(), Task.id).limit(limit)
+        rows = (await session.execute(query)).all()
+
+    return [
+        TaskSearchHit.model_validate(
+            {**TaskSchema.model_validate(task).model_dump(), "rank": rank}
+        )
+        for task, rank in rows
+    ]
+
+
+async def export_tasks(
+    format: ExportFormat = "ndjson",
+    user_id: Optional[int] = None,
+    is_completed: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> StreamingResponse:
+    filters = []
+    if user_id is not None:
+        filters.append(Task.user_id == user_id)
+    if is_completed is not None:
+        filters.append(Task.is_completed == is_completed)
+    if created_from is not None:
+        filters.append(Task.created_at >= created_from)
+    if created_to is not None:
+        filters.append(Task.created_at < created_to)
+
+    fields = list(TaskSchema.model_fields)
+    rows = task_service.stream_rows(fields, filters)
+    return export_response(rows, fields, format, "tasks")
 
 
 async def delete_task_by_id(task_id: int) -> TaskSchema:
@@ -43,8 +263,82 @@ async def change_task(task_data: TaskUpdate, task_id: int) -> TaskRelSchema:
     return await task_service.change_obj(task_data, task_id)
 
 
+async def bulk_create_tasks(
+    items: List[Dict[str, Any]] = Body(max_length=settings.bulk_max_items),
+    mode: BulkMode = "atomic",
+) -> BulkResult:
+    valid, errors = validate_items(items, TaskBase)
+
+    owner_ids = {task.user_id for task in valid.values()}
+    async with session_scope() as session:
+        query = select(User.id).where(User.id.in_(owner_ids))
+        known_owners = set((await session.scalars(query)).all())
+    for index, task in list(valid.items()):
+        if task.user_id not in known_owners:
+            errors[index] = f"No User with id ({task.user_id}) found"
+            del valid[index]
+
+    check_bulk_errors(mode, errors)
+    created = await task_service.bulk_create(
+        [task.model_dump() for task in valid.values()]
+    )
+    ids = {index: task.id for index, task in zip(valid, created)}
+    return bulk_result(mode, len(items), ids, errors)
+
+
+async def bulk_update_tasks(
+    items: List[Dict[str, Any]] = Body(max_length=settings.bulk_max_items),
+    mode: BulkMode = "atomic",
+) -> BulkResult:
+    valid, errors = validate_items(items, TaskBulkUpdate)
+
+    found = await task_service.existing_ids(task.id for task in valid.values())
+    seen = set()
+    for index, task in list(valid.items()):
+        if task.id not in found:
+            errors[index] = f"No Task with id ({task.id}) found"
+        elif task.id in seen:
+            errors[index] = f"Task with id ({task.id}) is repeated in this batch"
+        seen.add(task.id)
+        if index in errors:
+            del valid[index]
+
+    check_bulk_errors(mode, errors)
+    await task_service.bulk_update(
+        [
+            task.model_dump(exclude_unset=True) | {"id": task.id}
+            for task in valid.values()
+        ]
+    )
+    ids = {index: task.id for index, task in valid.items()}
+    return bulk_result(mode, len(items), ids, errors)
+
+
+async def bulk_delete_tasks(data: BulkDelete, mode: BulkMode = "atomic") -> BulkResult:
+    if len(data.ids) > settings.bulk_max_items:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"At most {settings.bulk_max_items} ids per request",
+        )
+    found = await task_service.existing_ids(data.ids)
+    errors = {
+        index: f"No Task with id ({task_id}) found"
+        for index, task_id in enumerate(data.ids)
+        if task_id not in found
+    }
+
+    check_bulk_errors(mode, errors)
+    deleted = await task_service.bulk_delete(found)
+    ids = {
+        index: task_id
+        for index, task_id in enumerate(data.ids)
+        if task_id in deleted and index not in errors
+    }
+    return bulk_result(mode, len(data.ids), ids, errors)
+
+
 async def mark_task_as_complete(task_id: int):
-    async with async_session_factory() as session:
+    async with session_scope() as session:
         task = await session.get(Task, task_id)
         if task is None:
             raise HTTPException(
@@ -52,7 +346,13 @@ async def mark_task_as_complete(task_id: int):
                 detail=f"Task with id {task_id} not found",
             )
 
+        before = task_stats.key(task)
         task.is_completed = True
+        await session.flush()
+        await task_stats.apply(session, [before], [task_stats.key(task)])
+        entries = await task_service.cache_entries(session, [task_id])
         await session.commit()
         await session.refresh(task)
+
+        await invalidate_entities(entries)
         return TaskSchema.model_validate(task)
@@ -0,0 +1,62 @@
+import asyncio
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.setup import session_scope
+from models.task_model import Task
+from models.task_stats_model import TaskStat
+from models.user_model import User
+from schemas.stats_schemas import TaskCounts, UserTaskStats
+
+from .rollup import Rollup
+
+# moved by the task service on every write, see Service(rollup=...)
+task_stats = Rollup(TaskStat, Task, keys=("user_id", "priority", "is_completed"))
+
+
+def add_count(counts: TaskCounts, is_completed: bool, count: int) -> None:
+    counts.total += count
+    if is_completed:
+        counts.completed += count
+    else:
+        counts.open += count
+
+
+async def get_user_task_stats(user_id: int) -> UserTaskStats:
+    """Open, completed and per-priority counts from the user's few counter rows."""
+    async with session_scope() as session:
+        owner = await session.scalar(select(User.id).where(User.id == user_id))
+        if owner is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User with id {user_id} not found",
+            )
+        return await user_task_stats(session, user_id)
+
+
+async def user_task_stats(session: AsyncSession, user_id: int) -> UserTaskStats:
+    rows = await session.scalars(select(TaskStat).where(TaskStat.user_id == user_id))
+
+    stats = UserTaskStats(user_id=user_id)
+    for row in rows:
+        add_count(stats, row.is_completed, row.count)
+        add_count(
+            stats.by_priority.setdefault(row.priority, TaskCounts()),
+            row.is_completed,
+            row.count,
+        )
+    return stats
+
+
+async def reconcile_task_stats() -> None:
+    """Rebuilds every user's counters from the tasks table."""
+    async with session_scope() as session:
+        await task_stats.rebuild(session)
+        await session.commit()
+    print("✅ Task stats rebuilt")
+
+
+if __name__ == "__main__":
+    asyncio.run(reconcile_task_stats())
@@ -1,66 +1,259 @@
 # TODO: make default username like, user132121312
-from typing import List
+from datetime import datetime
+from typing import List, Literal, Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import EmailStr, SecretStr
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
 
-from core.setup import get_db
+from core.config import settings
+from core.setup import get_db, session_scope
 from models.task_model import Task  # Add this import
 from models.user_model import User
-from schemas.relation_schemas import UserRelSchema
+from schemas.page_schemas import Page
+from schemas.relation_schemas import TaskEmbed, UserRelSchema
+from schemas.stats_schemas import TaskCounts
+from schemas.task_schemas import TaskSchema
 from schemas.user_schemas import UserCreate, UserLogin, UserSchema, UserUpdate
+from utils.cache import TTLCache
+from utils.cache_events import evict, register_cache
+from utils.entity_cache import EntityCache
+from utils.etag import conditional_response, latest, make_etag
+from utils.export import ExportFormat, export_response
+from utils.hashing import password_hasher
+from utils.pagination import page_cursor
 
+from .fieldsets import Expansion
 from .service import Service
+from .task_services import FIELDS_QUERY, task_service
+from .task_stats import user_task_stats
 
 task_model = Task  # circular import models fix
 
+
+async def embed_tasks(
+    session: AsyncSession,
+    user: User,
+    embed: TaskEmbed = "page",
+    tasks_limit: int = settings.embedded_tasks_limit,
+) -> UserRelSchema:
+    """A user with a bounded view of their tasks, however many they have.
+
+    "page" embeds the first `tasks_limit` tasks by id and a cursor for
+    /users/{id}/tasks, "counts" only the counters from task_stats.
+    """
+    # only the columns, reading user.tasks would load every task
+    rel = UserRelSchema.model_validate(
+        {name: getattr(user, name) for name in UserSchema.model_fields}
+    )
+    if embed == "page":
+        query = (
+            select(*task_service.columns)
+            .where(Task.user_id == user.id)
+            .order_by(Task.id)
+            .limit(tasks_limit + 1)
+        )
+        rows = (await session.execute(query)).mappings().all()
+        rel.tasks = task_service.list_adapter.validate_python(rows[:tasks_limit])
+        if len(rows) > tasks_limit and rel.tasks:
+            rel.tasks_next_cursor = page_cursor(rel.tasks[-1], "id", "asc", "next")
+    elif embed == "counts":
+        stats = await user_task_stats(session, user.id)
+        rel.task_counts = TaskCounts(
+            total=stats.total, open=stats.open, completed=stats.completed
+        )
+    return rel
+
+
+async def load_first_tasks(session: AsyncSession, user_ids: List[int]):
+    """expand=tasks: the first `embedded_tasks_limit` tasks of every user on a page."""
+    position = (
+        func.row_number().over(partition_by=Task.user_id, order_by=Task.id).label("n")
+    )
+    ranked = (
+        select(*task_service.columns, position)
+        .where(Task.user_id.in_(user_ids))
+        .subquery()
+    )
+    query = (
+        select(*[ranked.c[column.name] for column in task_service.columns])
+        .where(ranked.c.n <= settings.embedded_tasks_limit)
+        .order_by(ranked.c.user_id, ranked.c.id)
+    )
+    rows = (await session.execute(query)).mappings().all()
+    tasks = {}
+    for task in task_service.list_adapter.validate_python(rows):
+        tasks.setdefault(task.user_id, []).append(task)
+    return tasks
+
+
 user_service: Service = Service(
     model=User,
-    model_options=[joinedload(User.tasks)],
+    model_options=[],
     schema=UserSchema,
     schema_base=UserCreate,
     schema_update=UserUpdate,
     rel_schema=UserRelSchema,
+    sort_fields=("id", "created_at"),
+    cache=EntityCache("user"),
+    # the entity cache holds the default embedding
+    rel_loader=embed_tasks,
+    expansions={"tasks": Expansion(List[TaskSchema], "id", load_first_tasks, [])},
+)
+
+# Users resolved for authentication, without their tasks. Writes evict them
+# in every worker through utils.cache_events.
+user_cache = register_cache(
+    TTLCache(
+        maxsize=settings.user_cache_size, ttl=settings.user_cache_ttl, name="user_cache"
+    )
 )
 
 
 async def create_user(user_data: UserCreate) -> UserSchema:
+    hashed_password = await password_hasher.hash(user_data.password)
+    user_data = user_data.model_copy(update={"password": hashed_password})
     return await user_service.create_obj(user_data)
 
 
-async def get_user_by_id(user_id: int) -> UserRelSchema:
-    return await user_service.get_by_id(user_id)
+async def get_user_by_id(
+    user_id: int,
+    embed: TaskEmbed = "page",
+    tasks_limit: int = settings.embedded_tasks_limit,
+) -> UserRelSchema:
+    if embed == "page" and tasks_limit == settings.embedded_tasks_limit:
+        return await user_service.get_by_id(user_id)
+
+    async with session_scope() as session:
+        user = await session.get(User, user_id)
+        if user is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User with id {user_id} not found",
+            )
+        return await embed_tasks(session, user, embed, tasks_limit)
+
+
+async def get_user_for_auth(user_id: int) -> UserSchema:
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await user_service.get_by_id(user_id, with_relations=False)
+        user_cache.set(user_id, user)
+    return user
+
+
+async def get_user_if_modified(
+    user_id: int,
+    request: Request,
+    response: Response,
+    embed: TaskEmbed = "page",
+    tasks_limit: int = Query(
+        default=settings.embedded_tasks_limit, ge=0, le=settings.max_page_size
+    ),
+) -> UserRelSchema | Response:
+    """Answers 304 from the user's and their tasks' update times if nothing changed."""
+    query = (
+        select(User.updated_at, func.max(Task.updated_at), func.count(Task.id))
+        .outerjoin(Task, Task.user_id == User.id)
+        .where(User.id == user_id)
+        .group_by(User.id)
+    )
+    async with session_scope() as session:
+        version = (await session.execute(query)).first()
+    if version is not None:
+        etag = make_etag("User", user_id, embed, tasks_limit, *version)
+        not_modified = conditional_response(
+            request, response, etag, latest(version[:2])
+        )
+        if not_modified is not None:
+            return not_modified
+    return await get_user_by_id(user_id, embed, tasks_limit)
+
+
+async def get_users(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(
+        default=settings.default_page_size, ge=1, le=settings.max_page_size
+    ),
+    sort: str = "id",
+    order: Literal["asc", "desc"] = "asc",
+    fields: Optional[str] = FIELDS_QUERY,
+    expand: Optional[str] = Query(
+        default=None, description="Relations to include: tasks"
+    ),
+) -> Page[UserSchema] | Response:
+    fieldset = user_service.fieldset(fields, expand)
+    if fieldset is None or not fieldset.expand:
+        etag, last_modified = await user_service.page_version(
+            cursor, limit, sort, order, fieldset=fieldset
+        )
+        not_modified = conditional_response(request, response, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+    return await user_service.get_page(cursor, limit, sort, order, fieldset=fieldset)
 
 
-async def get_users(offset: int = 0, limit: int = 5) -> List[UserSchema]:
-    return await user_service.get_all(offset, limit)
+async def export_users(
+    format: ExportFormat = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+) -> StreamingResponse:
+    filters = []
+    if created_from is not None:
+        filters.append(User.created_at >= created_from)
+    if created_to is not None:
+        filters.append(User.created_at < created_to)
+
+    # UserSchema has no password, so neither does the export
+    fields = list(UserSchema.model_fields)
+    rows = user_service.stream_rows(fields, filters)
+    return export_response(rows, fields, format, "users")
 
 
 async def delete_user_by_id(user_id: int) -> UserSchema:
-    return await user_service.delete_obj_by_id(user_id)
+    user = await user_service.delete_obj_by_id(user_id)
+    await evict(user_cache.name, user_id)
+    return user
 
 
 async def change_user(user_data: UserUpdate, user_id: int) -> UserRelSchema:
-    return await user_service.change_obj(user_data, user_id)
+    user = await user_service.change_obj(user_data, user_id)
+    await evict(user_cache.name, user_id)
+    return user
 
 
 async def get_user_by_email(
-    user_email: EmailStr, session: AsyncSession = Depends(get_db)
+    user_email: EmailStr,
+    session: AsyncSession,
+    embed: TaskEmbed = "page",
+    tasks_limit: int = settings.embedded_tasks_limit,
 ):
-    query = select(User).where(User.email == user_email).options(joinedload(User.tasks))
+    query = select(User).where(User.email == user_email)
     res = await session.scalars(query)
 
-    user = res.unique().first()
+    user = res.first()
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User with email {user_email} not found",
         )
 
-    return UserRelSchema.model_validate(user)
+    return await embed_tasks(session, user, embed, tasks_limit)
+
+
+async def get_user_by_email_query(
+    user_email: EmailStr,
+    embed: TaskEmbed = "page",
+    tasks_limit: int = Query(
+        default=settings.embedded_tasks_limit, ge=0, le=settings.max_page_size
+    ),
+    session: AsyncSession = Depends(get_db),
+) -> UserRelSchema:
+    return await get_user_by_email(user_email, session, embed, tasks_limit)
 
 
 async def get_user_by_email_for_login(
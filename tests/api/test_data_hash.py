@@ -0,0 +1,37 @@
+import pytest
+
+import data_hash
+from utils.seed_loader import iter_seed, load_seed, open_seed
+
+USERS, TASKS_PER_USER = 3, 2
+
+
+def generate(path) -> bytes:
+    suffix = str(path).removesuffix(".gz").rsplit(".", 1)[1]
+    rows = data_hash.generate(USERS, TASKS_PER_USER, seed=7)
+    data_hash.WRITERS[f".{suffix}"](rows, str(path))
+    return path.read_bytes()
+
+
+class TestDataHash:
+    """Test the synthetic seed generator against the seed loader."""
+
+    @pytest.mark.parametrize("suffix", [".json", ".jsonl", ".json.gz", ".jsonl.gz"])
+    def test_output_is_reproducible(self, tmp_path, suffix):
+        """Test the same arguments give the same bytes, whatever the file name."""
+        first = generate(tmp_path / f"first{suffix}")
+        assert generate(tmp_path / f"second{suffix}") == first
+
+        path = str(tmp_path / f"first{suffix}")
+        with open_seed(path) as f:
+            names = [name for name, _ in iter_seed(f, path)]
+        assert names == ["users"] * USERS + ["tasks"] * USERS * TASKS_PER_USER
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("suffix", [".json", ".jsonl.gz"])
+    async def test_output_loads(self, db_session, tmp_path, suffix):
+        path = tmp_path / f"seed{suffix}"
+        generate(path)
+
+        counts = await load_seed(db_session, str(path))
+        assert counts == {"users": USERS, "tasks": USERS * TASKS_PER_USER, "skipped": 0}
@@ -0,0 +1,132 @@
+import asyncio
+import socket
+
+import pytest
+import redis.asyncio as redis
+from aiosmtpd.controller import Controller
+from fastapi.testclient import TestClient
+
+from core.config import settings
+from utils.email_outbox import (
+    DEAD_LETTER_STREAM,
+    OUTBOX_STREAM,
+    RETRY_SET,
+    EmailWorker,
+    SMTPSender,
+    enqueue_email,
+)
+
+
+class Inbox:
+    """aiosmtpd handler keeping every message it receives."""
+
+    def __init__(self):
+        self.envelopes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.envelopes.append(envelope)
+        return "250 OK"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    inbox = Inbox()
+    controller = Controller(inbox, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller, inbox
+    controller.stop()
+
+
+@pytest.fixture
+async def redis_client():
+    client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    yield client
+    await client.aclose()
+
+
+class TestEmailOutbox:
+    """Test emails go through the outbox instead of SMTP inside the request."""
+
+    @pytest.mark.asyncio
+    async def test_forgot_password_is_delivered_by_worker(
+        self, client: TestClient, test_user, smtp_server, redis_client
+    ):
+        """Test the handler only enqueues and the worker sends the email."""
+        controller, inbox = smtp_server
+
+        response = client.get(
+            "/jwt/forgot-password/", params={"email": test_user.email}
+        )
+        assert response.status_code == 200
+        assert inbox.envelopes == []
+
+        sender = SMTPSender(
+            controller.hostname, controller.port, starttls=False, password=None
+        )
+        worker = EmailWorker(sender, client=redis_client)
+        assert await worker.process_once() == 1
+        sender.close()
+
+        assert len(inbox.envelopes) == 1
+        assert inbox.envelopes[0].rcpt_tos == [test_user.email]
+        assert b"Token for account reset" in inbox.envelopes[0].content
+
+    @pytest.mark.asyncio
+    async def test_failed_send_is_retried_later(
+        self, client: TestClient, test_user, redis_client
+    ):
+        """Test an unreachable SMTP server sends the email to the retry set."""
+        client.get("/jwt/forgot-password/", params={"email": test_user.email})
+
+        sender = SMTPSender("127.0.0.1", free_port(), starttls=False, password=None)
+        worker = EmailWorker(sender, client=redis_client)
+        assert await worker.process_once() == 1
+
+        assert await redis_client.zcard(RETRY_SET) == 1
+        # nothing is due yet, so the next round has nothing to send
+        assert await worker.process_once() == 0
+
+    @pytest.mark.asyncio
+    async def test_malformed_entry_is_dead_lettered(self, smtp_server, redis_client):
+        """Test an entry without a recipient doesn't stop the rest of the batch."""
+        controller, inbox = smtp_server
+        await redis_client.xadd(OUTBOX_STREAM, {"subject": "no recipient"})
+        await enqueue_email("a@example.com", "Hi", "Body", client=redis_client)
+
+        sender = SMTPSender(
+            controller.hostname, controller.port, starttls=False, password=None
+        )
+        worker = EmailWorker(sender, client=redis_client)
+        assert await worker.process_once() == 2
+        sender.close()
+
+        assert [e.rcpt_tos for e in inbox.envelopes] == [["a@example.com"]]
+        [(_, dead)] = await redis_client.xrange(DEAD_LETTER_STREAM)
+        assert dead["subject"] == "no recipient"
+        assert "Malformed outbox entry" in dead["error"]
+        assert await redis_client.xlen(OUTBOX_STREAM) == 0
+
+    @pytest.mark.asyncio
+    async def test_worker_survives_unexpected_errors(self, monkeypatch):
+        """Test run() logs an unexpected error and goes on polling."""
+        monkeypatch.setattr(settings, "email_poll_interval", 0.01)
+        worker = EmailWorker(SMTPSender())
+        calls = 0
+
+        async def process_once(block_ms=None):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise KeyError("to")
+            worker.stop()
+            return 0
+
+        monkeypatch.setattr(worker, "process_once", process_once)
+        await asyncio.wait_for(worker.run(), timeout=1)
+        assert calls == 2
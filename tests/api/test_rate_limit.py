@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+import redis.asyncio as redis
+from fastapi.testclient import TestClient
+from redis.exceptions import RedisError
+
+from core.config import settings
+from core.metrics import metrics
+from core.redis import redis_manager
+from tests.helpers.auth import get_auth_headers_for_user
+from utils import rate_limit
+from utils.rate_limit import (
+    RATE_LIMIT_SCRIPTS,
+    RateLimit,
+    evaluate_rate_limits,
+    local_leases,
+)
+
+
+async def charged(key: str) -> int:
+    """Requests Redis has counted against a sliding_log key."""
+    client = redis.from_url(settings.REDIS_URL)
+    try:
+        return await client.zcard(key)
+    finally:
+        await client.aclose()
+
+
+class TestRateLimit:
+    """Test rate limit policies and headers."""
+
+    def test_headers_on_success(self, client: TestClient):
+        """Test RateLimit-* headers are sent on allowed requests."""
+        first = client.get("/")
+        second = client.get("/")
+
+        assert first.status_code == 200
+        assert first.headers["RateLimit-Policy"] == "100;w=60"
+        remaining = int(first.headers["RateLimit-Remaining"])
+        # the global limit is charged once per request, not once per dependency
+        assert int(second.headers["RateLimit-Remaining"]) == remaining - 1
+
+    def test_route_limits_evaluated_together(self, client: TestClient, test_user):
+        """Test a router policy reports both its own and the global limit."""
+        headers = get_auth_headers_for_user(client, test_user)
+
+        response = client.get("/users/me/", headers=headers)
+
+        assert response.status_code == 200
+        assert response.headers["RateLimit-Policy"] == "100;w=60, 1000;w=3600"
+
+    @pytest.mark.asyncio
+    async def test_slow_client_pays_one_token_per_request(
+        self, client: TestClient, monkeypatch
+    ):
+        """Test expired leases do not burn quota for clients below the lease rate."""
+        monkeypatch.setattr(local_leases, "sync_interval", 0.05)
+
+        statuses = []
+        for _ in range(15):
+            statuses.append(client.get("/").status_code)
+            await asyncio.sleep(0.06)
+
+        assert statuses == [200] * 15
+        assert await charged("rate_limit:sliding_log:global:testclient") == 15
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_tokens_are_carried_over(
+        self, client: TestClient, monkeypatch
+    ):
+        """Test tokens left in an expired lease count toward its renewal."""
+        monkeypatch.setattr(local_leases, "sync_interval", 0.2)
+        key = "rate_limit:sliding_log:global:testclient"
+
+        for _ in range(4):
+            client.get("/")
+        assert local_leases.leases[key].tokens > 0
+        assert await charged(key) == 4 + local_leases.leases[key].tokens
+
+        await asyncio.sleep(0.25)
+        response = client.get("/")
+        assert response.status_code == 200
+        assert await charged(key) == 5 + local_leases.leases[key].tokens
+        assert int(response.headers["RateLimit-Remaining"]) == 100 - 5
+
+    @pytest.mark.parametrize("fail_open, expected", [(True, 200), (False, 503)])
+    def test_redis_failure(self, client: TestClient, monkeypatch, fail_open, expected):
+        """Test a Redis error lets requests through or answers 503, as configured."""
+
+        async def unavailable(*args, **kwargs):
+            raise RedisError("connection refused")
+
+        monkeypatch.setattr(rate_limit, "evaluate_rate_limits", unavailable)
+        monkeypatch.setattr(settings, "rate_limit_fail_open", fail_open)
+        errors = metrics.counters["rate_limit_redis_errors"]
+
+        response = client.get("/")
+
+        assert response.status_code == expected
+        assert metrics.counters["rate_limit_redis_errors"] == errors + 1
+
+
+@pytest.fixture
+async def redis_client(monkeypatch):
+    """The real Redis behind redis_manager, with scripts registered on it."""
+    client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    monkeypatch.setattr(redis_manager, "client", client)
+    monkeypatch.setattr(rate_limit, "_registered_scripts", {})
+    yield client
+    await client.aclose()
+
+
+ALGORITHMS = list(RATE_LIMIT_SCRIPTS)
+
+
+class TestRateLimitAlgorithms:
+    """Test every Lua algorithm against Redis."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("algorithm", ALGORITHMS)
+    async def test_allows_exactly_limit(self, redis_client, algorithm):
+        """Test `limit` requests pass, the next waits for `retry_after`."""
+        limit = RateLimit("test", limit=3, window=1)
+
+        allowed = [
+            await evaluate_rate_limits([(limit, "a")], algorithm) for _ in range(3)
+        ]
+        assert [result.allowed for (result,) in allowed] == [True] * 3
+        assert [result.remaining for (result,) in allowed] == [2, 1, 0]
+
+        (denied,) = await evaluate_rate_limits([(limit, "a")], algorithm)
+        assert not denied.allowed
+        assert 1 <= denied.retry_after <= 2
+
+        await asyncio.sleep(denied.retry_after)
+        (result,) = await evaluate_rate_limits([(limit, "a")], algorithm)
+        assert result.allowed
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("algorithm", ALGORITHMS)
+    async def test_multi_key_is_all_or_nothing(self, redis_client, algorithm):
+        """Test a request denied by one key charges none of the others."""
+        wide = RateLimit("wide", limit=3, window=60)
+        narrow = RateLimit("narrow", limit=1, window=60)
+        both = [(wide, "a"), (narrow, "a")]
+
+        assert all(r.allowed for r in await evaluate_rate_limits(both, algorithm))
+        wide_result, narrow_result = await evaluate_rate_limits(both, algorithm)
+        assert not narrow_result.allowed
+        assert wide_result.allowed and wide_result.remaining == 2
+
+        alone = [await evaluate_rate_limits([(wide, "a")], algorithm) for _ in range(3)]
+        assert [result.allowed for (result,) in alone] == [True, True, False]
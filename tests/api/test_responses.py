@@ -0,0 +1,79 @@
+import json
+from datetime import datetime, time, timedelta, timezone
+from typing import List, Optional
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from schemas import PriorityEnum
+from schemas.relation_schemas import UserRelSchema
+from schemas.task_schemas import TaskSchema
+from schemas.user_schemas import UserSchema
+from tests.helpers.auth import get_auth_headers_for_user
+from utils.responses import model_response
+
+NOW = datetime(2025, 3, 4, 5, 6, 7, 890123, tzinfo=timezone.utc)
+
+
+class Sample(BaseModel):
+    priority: PriorityEnum
+    aware: datetime
+    naive: datetime
+    at: Optional[time]
+    rank: float
+    note: str
+    owners: List[UserRelSchema]
+
+
+def rel_user() -> UserRelSchema:
+    task = TaskSchema(
+        id=3, title="Task", time=time(7, 30), user_id=1, created_at=NOW, updated_at=NOW
+    )
+    return UserRelSchema(
+        id=1, email="a@example.com", created_at=NOW, updated_at=NOW, tasks=[task]
+    )
+
+
+class TestModelResponse:
+    """Test model_response renders what FastAPI's response_model path would."""
+
+    def test_body_matches_jsonable_encoder(self):
+        sample = Sample(
+            priority=PriorityEnum.HIGH,
+            aware=NOW.astimezone(timezone(timedelta(hours=-5))),
+            naive=NOW.replace(tzinfo=None),
+            at=None,
+            rank=0.001,
+            note='ünïcode "quoted" </script>',
+            owners=[rel_user()],
+        )
+
+        expected = JSONResponse(jsonable_encoder(sample)).body
+        assert model_response(sample).body == expected
+
+    def test_schema_keeps_relations_out(self):
+        """Test a richer model only loses its extra fields when schema= is given."""
+        user = rel_user()
+
+        assert "tasks" in json.loads(model_response(user).body)
+        body = json.loads(model_response(user, schema=UserSchema).body)
+        assert set(body) == set(UserSchema.model_fields)
+
+    @pytest.mark.asyncio
+    async def test_changed_user_has_no_tasks(
+        self, client: TestClient, test_user, test_task
+    ):
+        """Test PATCH /users/ answers with UserSchema, not the cached relations."""
+        headers = get_auth_headers_for_user(client, test_user)
+
+        response = client.patch(
+            "/users/",
+            params={"user_id": test_user.id},
+            json={"username": "renamed"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        assert set(response.json()) == set(UserSchema.model_fields)
@@ -0,0 +1,77 @@
+import gzip
+import json
+
+import pytest
+
+from utils import seed_loader
+from utils.seed_loader import SeedRows, iter_seed, open_seed
+
+SEED = {
+    "meta": {"note": "skipped, not an array", "numbers": [1, 2]},
+    "users": [
+        {"id": 12345678, "email": "a@example.com", "username": 'quote" comma, colon:'},
+        {"id": -7, "email": "b@example.com", "username": "snow ☃ \\ slash"},
+    ],
+    "empty": [],
+    "tasks": [
+        {"title": "T", "priority": 3, "user_id": 12345678, "rank": -1.25e-3},
+        {"title": "[not] {json}", "description": None, "user_id": -7, "done": True},
+    ],
+}
+EXPECTED = [(name, row) for name in ("users", "tasks") for row in SEED[name]]
+
+
+def write_seed(path, text: str) -> None:
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        f.write(text)
+
+
+def read_seed(path):
+    with open_seed(str(path)) as f:
+        return list(iter_seed(f, str(path)))
+
+
+class TestSeedLoader:
+    """Test the streaming seed parser on values split across chunk boundaries."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 5, 64])
+    @pytest.mark.parametrize("suffix", [".json", ".json.gz", ".jsonl", ".jsonl.gz"])
+    def test_rows_survive_any_chunking(self, tmp_path, monkeypatch, chunk_size, suffix):
+        """Test every chunk size and format yields the same rows as json.loads."""
+        monkeypatch.setattr(seed_loader, "CHUNK_SIZE", chunk_size)
+        path = tmp_path / f"seed{suffix}"
+        if ".jsonl" in suffix:
+            text = "".join(
+                json.dumps({"table": name, **row}) + "\n\n" for name, row in EXPECTED
+            )
+        else:
+            # spaces and newlines around every separator, and none at all
+            text = json.dumps(SEED, indent=1, separators=(" , ", " : "))
+            write_seed(
+                tmp_path / "compact.json", json.dumps(SEED, separators=(",", ":"))
+            )
+            assert read_seed(tmp_path / "compact.json") == EXPECTED
+        write_seed(path, text)
+
+        assert read_seed(path) == EXPECTED
+
+    @pytest.mark.parametrize("text", ['{"users": [{"id": 1}', '["users"]'])
+    def test_broken_file_is_an_error(self, tmp_path, monkeypatch, text):
+        monkeypatch.setattr(seed_loader, "CHUNK_SIZE", 2)
+        path = tmp_path / "seed.json"
+        write_seed(path, text)
+
+        with pytest.raises(ValueError):
+            read_seed(path)
+
+    def test_missing_field_names_the_row(self):
+        """Test a row without a required field fails with its position."""
+        records = [
+            ("users", {"email": "a@example.com", "username": "a", "password": "x"}),
+            ("tasks", {"title": "T", "description": "D", "user_id": 1}),
+            ("tasks", {"title": "T", "user_id": 1}),
+        ]
+
+        with pytest.raises(ValueError, match=r"row 3 \(tasks\) has no 'description'"):
+            list(SeedRows(1).batches(iter(records), 10))
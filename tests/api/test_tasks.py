@@ -1,7 +1,18 @@
+import gzip
+import json
+
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import select
 
+from core.metrics import metrics
+from models.task_model import Task
+from models.user_model import User
+from schemas.task_schemas import TaskSchema
+from schemas.user_schemas import UserSchema
 from tests.helpers.auth import get_auth_headers_for_test_user
+from utils.pagination import encode_cursor
+from utils.seed_loader import load_seed
 
 # from schemas import PriorityEnum
 
@@ -35,6 +46,382 @@ class TestTaskEndpoints:
 
         assert response.status_code == 401
 
+    @pytest.mark.asyncio
+    async def test_list_tasks_with_cursor(
+        self, client: TestClient, test_user, multiple_tasks
+    ):
+        """Test walking task pages forwards and backwards with cursors."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+        expected = sorted(task.id for task in multiple_tasks)
+
+        seen, cursor, pages = [], None, []
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            response = client.get("/tasks/", params=params, headers=headers)
+            assert response.status_code == 200
+            page = response.json()
+            pages.append(page)
+            seen += [task["id"] for task in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert seen == expected
+        assert pages[0]["prev_cursor"] is None
+
+        response = client.get(
+            "/tasks/",
+            params={"limit": 2, "cursor": pages[-1]["prev_cursor"]},
+            headers=headers,
+        )
+        assert [task["id"] for task in response.json()["items"]] == expected[2:4]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "position",
+        [
+            {"id": "abc", "s": "id", "o": "asc", "d": "next"},
+            {"v": "yesterday", "id": 1, "s": "created_at", "o": "asc", "d": "next"},
+            {"s": "id", "o": "asc", "d": "next"},
+        ],
+    )
+    async def test_list_tasks_bad_cursor_value(
+        self, client: TestClient, test_user, position
+    ):
+        """Test a well-formed cursor holding unusable values is a 400, not a 500."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+
+        response = client.get(
+            "/tasks/",
+            params={"cursor": encode_cursor(position), "sort": position["s"]},
+            headers=headers,
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith("Invalid cursor")
+
+    @pytest.mark.asyncio
+    async def test_list_user_tasks_filtered(
+        self, client: TestClient, test_user, multiple_tasks
+    ):
+        """Test listing a user's open high priority tasks, highest first."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+
+        response = client.get(
+            f"/users/{test_user.id}/tasks",
+            params={"is_completed": False, "sort": "priority", "order": "desc"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        open_tasks = [task for task in multiple_tasks if not task.is_completed]
+        expected = sorted(open_tasks, key=lambda t: (t.priority, t.id), reverse=True)
+        assert [task["id"] for task in response.json()["items"]] == [
+            task.id for task in expected
+        ]
+
+        response = client.get(
+            f"/users/{test_user.id}/tasks",
+            params={"is_completed": False, "min_priority": 3},
+            headers=headers,
+        )
+        assert [task["title"] for task in response.json()["items"]] == ["Task 3"]
+
+        response = client.get("/users/999999/tasks", headers=headers)
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_search_tasks(
+        self, client: TestClient, test_user, multiple_tasks, tasks_for_multiple_users
+    ):
+        """Test full-text search ranks title matches first and scopes by user."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+        client.patch(
+            "/tasks/",
+            params={"task_id": multiple_tasks[0].id},
+            json={"title": "Pay rent", "description": "Before the task 4 deadline"},
+            headers=headers,
+        )
+
+        response = client.get(
+            "/tasks/search", params={"q": "task", "limit": 50}, headers=headers
+        )
+        assert response.status_code == 200
+        hits = response.json()
+        assert len(hits) > len(multiple_tasks)
+        assert hits[-1]["id"] == multiple_tasks[0].id
+        assert hits[0]["rank"] >= hits[-1]["rank"]
+
+        response = client.get(
+            "/tasks/search",
+            params={"q": "rent", "user_id": test_user.id},
+            headers=headers,
+        )
+        assert [hit["title"] for hit in response.json()] == ["Pay rent"]
+
+    @pytest.mark.asyncio
+    async def test_user_task_stats(
+        self, client: TestClient, test_user, task_create_data: dict
+    ):
+        """Test the stats counters follow task creation, completion and deletion."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+        ids = [
+            client.post("/tasks/", json=task_create_data, headers=headers).json()["id"]
+            for _ in range(3)
+        ]
+        client.post(f"/tasks/{ids[0]}/complete", headers=headers)
+        client.delete("/tasks/", params={"task_id": ids[1]}, headers=headers)
+
+        response = client.get(f"/users/{test_user.id}/stats", headers=headers)
+        assert response.status_code == 200
+        stats = response.json()
+        assert (stats["total"], stats["open"], stats["completed"]) == (2, 1, 1)
+        priority = str(task_create_data["priority"])
+        assert stats["by_priority"][priority] == {"total": 2, "open": 1, "completed": 1}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "path, model, schema",
+        [("/tasks/", Task, TaskSchema), ("/users/", User, UserSchema)],
+    )
+    async def test_list_items_match_orm_schema(
+        self,
+        client: TestClient,
+        db_session,
+        test_user,
+        multiple_tasks,
+        path,
+        model,
+        schema,
+    ):
+        """Test list items built from projected rows equal the schema of the ORM objects."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+
+        response = client.get(path, params={"limit": 100}, headers=headers)
+        assert response.status_code == 200
+
+        objs = await db_session.scalars(
+            select(model).order_by(model.id).execution_options(populate_existing=True)
+        )
+        expected = [schema.model_validate(obj).model_dump(mode="json") for obj in objs]
+        assert response.json()["items"] == expected
+
+    @pytest.mark.asyncio
+    async def test_list_tasks_sparse_fields(
+        self, client: TestClient, test_user, multiple_tasks
+    ):
+        """Test fields= trims the items and expand= adds the owner."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+        params = {"fields": "id,title,is_completed", "expand": "task_owner", "limit": 2}
+
+        response = client.get("/tasks/", params=params, headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        item = page["items"][0]
+        assert set(item) == {"id", "title", "is_completed", "task_owner"}
+        assert item["task_owner"]["id"] == test_user.id
+        assert page["next_cursor"] is not None
+
+        response = client.get("/tasks/", params={"fields": "secret"}, headers=headers)
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_load_seed_file(
+        self, client: TestClient, test_user, db_session, tmp_path
+    ):
+        """Test the seed loader streams gzipped JSONL and remaps task owners."""
+        path = tmp_path / "seed.jsonl.gz"
+        with gzip.open(path, "wt") as f:
+            for i in (1, 2):
+                user = {"email": f"seed{i}@example.com", "username": f"seed{i}"}
+                f.write(json.dumps({"table": "users", **user, "password": "x"}) + "\n")
+            for i in range(5):
+                task = {"title": f"Seed {i}", "description": "-", "time": "7:30"}
+                task.update(user_id=i % 3 + 1, is_completed=i == 0, priority=1)
+                f.write(json.dumps({"table": "tasks", **task}) + "\n")
+
+        counts = await load_seed(db_session, str(path), batch_size=2)
+        assert counts == {"users": 2, "tasks": 4, "skipped": 1}
+
+        headers = get_auth_headers_for_test_user(client, test_user)
+        stats = client.get(f"/users/{test_user.id + 1}/stats", headers=headers).json()
+        assert (stats["total"], stats["completed"]) == (2, 1)
+        response = client.get(f"/users/{test_user.id + 2}/tasks", headers=headers)
+        assert [task["time"] for task in response.json()["items"]] == ["07:30:00"] * 2
+
+    @pytest.mark.asyncio
+    async def test_list_tasks_page_size_is_capped(self, client: TestClient, test_user):
+        """Test requesting more than the maximum page size is rejected."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+
+        response = client.get("/tasks/", params={"limit": 10_000}, headers=headers)
+        assert response.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_reset_clears_caches(self, client: TestClient, test_user, test_task):
+        """Test PUT / drops cached entities and users, whose ids get reused."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+        client.patch(
+            "/tasks/",
+            params={"task_id": test_task.id},
+            json={"title": "STALE"},
+            headers=headers,
+        )
+        response = client.get(f"/tasks/{test_task.id}", headers=headers)
+        assert response.json()["title"] == "STALE"
+
+        assert client.put("/").status_code == 200
+
+        task = client.get(f"/tasks/{test_task.id}", headers=headers).json()
+        assert task["title"] == "Morning jog"
+        me = client.get("/users/me/", headers=headers).json()
+        assert me["email"] != test_user.email
+
+    def test_cached_task_sees_owner_change(
+        self, client: TestClient, test_user, test_task
+    ):
+        """Test a cached task's owner is refreshed by the owner's version alone."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+        url = f"/tasks/{test_task.id}"
+
+        assert client.get(url, headers=headers).json()["task_owner"]["username"] == (
+            test_user.username
+        )
+        hits = metrics.snapshot()["counters"].get("entity_cache_task_hits", 0)
+        client.get(url, headers=headers)
+        assert metrics.snapshot()["counters"]["entity_cache_task_hits"] == hits + 1
+
+        response = client.patch(
+            "/users/",
+            params={"user_id": test_user.id},
+            json={"username": "renamed"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+
+        task = client.get(url, headers=headers).json()
+        assert task["task_owner"]["username"] == "renamed"
+        assert client.get(url, headers=headers).json() == task
+        assert metrics.snapshot()["counters"]["entity_cache_task_hits"] == hits + 2
+
+    @pytest.mark.asyncio
+    async def test_export_tasks(self, client: TestClient, test_user, multiple_tasks):
+        """Test streaming tasks out as NDJSON and CSV with filters."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+
+        response = client.get("/tasks/export", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["id"] for row in rows] == sorted(t.id for t in multiple_tasks)
+
+        response = client.get(
+            "/tasks/export",
+            params={"format": "csv", "is_completed": True},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert lines[0].startswith("title,description")
+        completed = [t for t in multiple_tasks if t.is_completed]
+        assert len(lines) - 1 == len(completed)
+
+    @pytest.mark.asyncio
+    async def test_bulk_task_endpoints(
+        self, client: TestClient, test_user, task_create_data
+    ):
+        """Test creating, updating and deleting tasks in batches."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+        items = [
+            {**task_create_data, "title": f"Bulk {i}", "user_id": test_user.id}
+            for i in range(3)
+        ]
+
+        response = client.post("/tasks/bulk", json=items, headers=headers)
+        assert response.status_code == 200
+        result = response.json()
+        assert result["succeeded"] == 3
+        ids = [item["id"] for item in result["items"]]
+
+        changes = [
+            {"id": ids[0], "is_completed": True},
+            {"id": ids[1], "title": "Renamed"},
+        ]
+        response = client.patch("/tasks/bulk", json=changes, headers=headers)
+        assert response.status_code == 200
+        assert client.get(f"/tasks/{ids[0]}", headers=headers).json()["is_completed"]
+        assert client.get(f"/tasks/{ids[1]}", headers=headers).json()["title"] == (
+            "Renamed"
+        )
+
+        response = client.request(
+            "DELETE", "/tasks/bulk", json={"ids": [ids[0], 999999]}, headers=headers
+        )
+        assert response.status_code == 422
+        assert client.get(f"/tasks/{ids[0]}", headers=headers).status_code == 200
+
+        response = client.request(
+            "DELETE",
+            "/tasks/bulk",
+            params={"mode": "partial"},
+            json={"ids": [ids[0], 999999]},
+            headers=headers,
+        )
+        result = response.json()
+        assert (result["succeeded"], result["failed"]) == (1, 1)
+        assert result["items"][1]["error"] is not None
+        assert client.get(f"/tasks/{ids[0]}", headers=headers).status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_request_reuses_one_connection(
+        self, client: TestClient, test_user, task_create_data
+    ):
+        """Test several queries in one request check out a single connection."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+        items = [{**task_create_data, "user_id": test_user.id}]
+
+        def checkouts() -> int:
+            timers = metrics.snapshot()["timers"]
+            return timers.get("db_pool_checkout_wait", {}).get("count", 0)
+
+        before = checkouts()
+        # owner lookup and insert both run on the request's session
+        response = client.post("/tasks/bulk", json=items, headers=headers)
+        assert response.status_code == 200
+        assert checkouts() - before == 1
+
+    @pytest.mark.asyncio
+    async def test_conditional_get_task(self, client: TestClient, test_user, test_task):
+        """Test an unchanged task is answered with 304 until it is edited."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+        url = f"/tasks/{test_task.id}"
+
+        response = client.get(url, headers=headers)
+        etag = response.headers["ETag"]
+        assert "Last-Modified" in response.headers
+
+        response = client.get(url, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        client.post(f"/tasks/{test_task.id}/complete", headers=headers)
+        response = client.get(url, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+
+    @pytest.mark.asyncio
+    async def test_conditional_get_task_page(
+        self, client: TestClient, test_user, multiple_tasks
+    ):
+        """Test list pages carry an ETag that changes with their items."""
+        headers = get_auth_headers_for_test_user(client, test_user)
+
+        etag = client.get("/tasks/", headers=headers).headers["ETag"]
+        response = client.get("/tasks/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+
+        client.post(f"/tasks/{multiple_tasks[1].id}/complete", headers=headers)
+        response = client.get("/tasks/", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+
     # @pytest.mark.asyncio
     # async def test_get_task(self, client: TestClient, test_user, test_task):
     #     """Test retrieving a single task."""
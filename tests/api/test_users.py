@@ -1,5 +1,20 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+import redis.asyncio as redis
 from fastapi.testclient import TestClient
 
+from core.config import settings
+from core.metrics import metrics
+from schemas.user_schemas import UserSchema
+from services.user_services import get_user_by_email, user_cache
+from tests.helpers.auth import get_auth_headers_for_user
+from utils.auth_helper import SUSPICIOUS_REVOKED_TOKENS, RedisTokenBlackList
+from utils.cache_events import EVICTIONS_CHANNEL
+
 
 class TestUserEndpoints:
     """Test user-related endpoints."""
@@ -57,6 +72,165 @@ class TestUserEndpoints:
     #     assert data["id"] == test_user.id
     #     assert data["email"] == test_user.email
 
+    def test_login_with_form_credentials(self, client: TestClient, test_user):
+        """Test login hashes off the event loop and issues tokens."""
+        response = client.post(
+            "/jwt/login/",
+            data={"email": test_user.email, "password": "TestPass123!"},
+        )
+
+        assert response.status_code == 200
+        assert "access_token" in response.json()
+
+        response = client.post(
+            "/jwt/login/",
+            data={"email": test_user.email, "password": "WrongPassword!"},
+        )
+        assert response.status_code == 401
+        assert "WrongPassword!" not in response.json()["detail"]
+
+    def test_logged_out_token_is_rejected(self, client: TestClient, test_user):
+        """Test a revoked token is refused on the next request."""
+        headers = get_auth_headers_for_user(client, test_user)
+
+        assert client.get("/users/me/", headers=headers).status_code == 200
+        assert client.post("/jwt/logout/", headers=headers).status_code == 200
+        assert client.get("/users/me/", headers=headers).status_code == 401
+
+    def test_verified_token_is_cached(self, client: TestClient, test_user):
+        """Test a repeated access token is served from the verified-JWT cache."""
+        headers = get_auth_headers_for_user(client, test_user)
+
+        def hits() -> float:
+            return metrics.snapshot()["counters"].get("jwt_cache_hits", 0)
+
+        client.get("/users/me/", headers=headers)
+        before = hits()
+        assert client.get("/users/me/", headers=headers).status_code == 200
+        assert hits() == before + 1
+
+    def test_cached_user_refreshed_after_change(self, client: TestClient, test_user):
+        """Test changing a user invalidates the authenticated user cache."""
+        headers = get_auth_headers_for_user(client, test_user)
+
+        assert client.get("/users/me/", headers=headers).json()["username"] == (
+            test_user.username
+        )
+
+        response = client.patch(
+            "/users/",
+            params={"user_id": test_user.id},
+            json={"username": "renamed"},
+            headers=headers,
+        )
+        assert response.status_code == 200
+
+        me = client.get("/users/me/", headers=headers).json()
+        assert me["username"] == "renamed"
+        assert "tasks" not in me
+
+    @pytest.mark.asyncio
+    async def test_cached_user_evicted_by_other_worker(
+        self, client: TestClient, test_user
+    ):
+        """Test an eviction published by another worker reaches this one's cache."""
+        headers = get_auth_headers_for_user(client, test_user)
+        publisher = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        try:
+            while not (await publisher.pubsub_numsub(EVICTIONS_CHANNEL))[0][1]:
+                await asyncio.sleep(0.01)
+
+            user = UserSchema.model_validate(test_user)
+            user_cache.set(test_user.id, user.model_copy(update={"username": "stale"}))
+            assert client.get("/users/me/", headers=headers).json()["username"] == (
+                "stale"
+            )
+
+            event = {"cache": user_cache.name, "key": test_user.id}
+            await publisher.publish(EVICTIONS_CHANNEL, json.dumps(event))
+            for _ in range(100):
+                if user_cache.get(test_user.id) is None:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await publisher.aclose()
+
+        me = client.get("/users/me/", headers=headers).json()
+        assert me["username"] == test_user.username
+
+    @pytest.mark.asyncio
+    async def test_suspicious_check_is_read_only(self):
+        """Test expired revocations don't count and aren't pruned by the check."""
+        client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        blacklist = RedisTokenBlackList(SimpleNamespace(client=client))
+        key, now = blacklist._sub_key("42"), int(time.time())
+        try:
+            await client.zadd(key, {"expired": now - 10})
+            live = {f"jti{i}": now + 100 + i for i in range(SUSPICIOUS_REVOKED_TOKENS)}
+            await client.zadd(key, live)
+            assert await blacklist.is_suspicious("42") is False
+
+            await client.zadd(key, {"one-more": now + 50})
+            assert await blacklist.is_suspicious("42") == now + 50
+            assert await client.zcard(key) == SUSPICIOUS_REVOKED_TOKENS + 2
+        finally:
+            await client.aclose()
+
+    def test_cached_user_sees_new_task(
+        self, client: TestClient, test_user, task_create_data
+    ):
+        """Test a cached UserRelSchema is invalidated when one of its tasks changes."""
+        headers = get_auth_headers_for_user(client, test_user)
+        url = f"/users/{test_user.id}"
+
+        assert client.get(url, headers=headers).json()["tasks"] == []
+        hits = metrics.snapshot()["counters"].get("entity_cache_user_hits", 0)
+        assert client.get(url, headers=headers).json()["tasks"] == []
+        assert metrics.snapshot()["counters"]["entity_cache_user_hits"] == hits + 1
+
+        task = {**task_create_data, "user_id": test_user.id}
+        assert client.post("/tasks/", json=task, headers=headers).status_code == 201
+
+        tasks = client.get(url, headers=headers).json()["tasks"]
+        assert [t["title"] for t in tasks] == [task["title"]]
+
+    def test_user_embeds_bounded_tasks(
+        self, client: TestClient, test_user, multiple_tasks
+    ):
+        """Test a user embeds a first page of tasks with a cursor, or counts only."""
+        headers = get_auth_headers_for_user(client, test_user)
+        url = f"/users/{test_user.id}"
+
+        user = client.get(url, params={"tasks_limit": 2}, headers=headers).json()
+        assert [t["id"] for t in user["tasks"]] == [t.id for t in multiple_tasks[:2]]
+        rest = client.get(
+            f"{url}/tasks",
+            params={"cursor": user["tasks_next_cursor"], "limit": 10},
+            headers=headers,
+        ).json()
+        assert [t["id"] for t in rest["items"]] == [t.id for t in multiple_tasks[2:]]
+
+        user = client.get(url, params={"embed": "counts"}, headers=headers).json()
+        assert user["tasks"] == []
+        assert user["task_counts"] is not None
+
+    @pytest.mark.asyncio
+    async def test_user_by_email_direct_and_route(
+        self, client: TestClient, db_session, test_user, multiple_tasks
+    ):
+        """Test the service defaults to a plain limit and the route honours tasks_limit."""
+        user = await get_user_by_email(test_user.email, db_session)
+        assert len(user.tasks) == len(multiple_tasks)
+
+        headers = get_auth_headers_for_user(client, test_user)
+        response = client.get(
+            "/users/email/",
+            params={"user_email": test_user.email, "tasks_limit": 2},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        assert len(response.json()["tasks"]) == 2
+
     def test_get_current_user_unauthorized(self, client: TestClient):
         """Test getting current user without authentication."""
         response = client.get("/users/")
@@ -6,15 +6,19 @@ import pytest
 
 # Use SQLite for testing (no external database needed)
 os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///./test.db"
+# Tests drive the email worker themselves, against a local SMTP server
+os.environ["EMAIL_WORKER_ENABLED"] = "false"
 
 # Now import app modules
 from datetime import datetime
 from unittest.mock import AsyncMock, patch
 
+import redis.asyncio as redis
 from fastapi.testclient import TestClient
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.pool import NullPool
 
+from core.config import settings
 from core.redis import redis_manager
 from core.setup import Base, get_db
 from main import app
@@ -22,6 +26,7 @@ from models.task_model import Task
 from models.user_model import User
 from schemas import PriorityEnum
 from utils.auth_utils import hash_pwd
+from utils.rate_limit import local_leases
 
 
 @pytest.fixture
@@ -249,6 +254,11 @@ async def db_session() -> AsyncGenerator[AsyncSession, None]:
             await session.rollback()
             await session.close()
 
+            # Fixtures commit, so wipe committed rows between tests as well
+            async with test_engine.begin() as conn:
+                for table in reversed(Base.metadata.sorted_tables):
+                    await conn.execute(table.delete())
+
 
 # @pytest.fixture
 # async def client(db_session: AsyncSession) -> AsyncGenerator[TestClient, None]:
@@ -284,6 +294,19 @@ async def mock_redis():
         yield
 
 
+@pytest.fixture(autouse=True)
+async def clean_redis():
+    """Drop rate limit counters, revoked tokens, cached entities and queued emails."""
+    client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    for pattern in ("rate_limit:*", "blacklist:*", "entity*", "email:*"):
+        keys = [key async for key in client.scan_iter(match=pattern)]
+        if keys:
+            await client.delete(*keys)
+    await client.aclose()
+    local_leases.leases.clear()
+    yield
+
+
 @pytest.fixture
 def client(db_session: AsyncSession):
     """Create test client with mocked Redis."""
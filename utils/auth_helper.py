@@ -1,4 +1,5 @@
 import asyncio
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional
 
@@ -8,6 +9,7 @@ from fastapi.security import (
 )
 
 from core.config import settings
+from core.redis import redis_manager
 from schemas.user_schemas import UserSchema
 
 from .auth_utils import encode_jwt
@@ -37,7 +39,7 @@ def create_jwt(
 
 
 def create_access_token(user: UserSchema) -> str:
-    jwt_payload = {**user.model_dump()}
+    jwt_payload = {**user.model_dump(mode="json")}
     return create_jwt(
         token_type=ACCESS_TOKEN_TYPE,
         token_data=jwt_payload,
@@ -55,31 +57,36 @@ def create_refresh_token(user: UserSchema) -> str:
     )
 
 
+SUSPICIOUS_REVOKED_TOKENS = 7
+
+
 class TokenBlackList:
     def __init__(self):
         self.jti_to_expiry_blacklist: Dict[str, datetime] = {}
         self.jti_to_user_blacklist: Dict[str, str] = {}
 
-    def add(self, jti: str, expires_at: datetime, sub: str):
+    async def add(self, jti: str, expires_at: datetime, sub: str):
         self.jti_to_expiry_blacklist[jti] = expires_at
         self.jti_to_user_blacklist[jti] = sub
 
-    def is_blacklisted(self, jti: str):
+    async def is_blacklisted(self, jti: str):
         return jti in self.jti_to_expiry_blacklist
 
+    async def entries(self) -> Dict[str, datetime]:
+        return self.jti_to_expiry_blacklist
+
     # TODO: IP Change Detection
-    def is_suspicious(self, sub: str):
+    async def is_suspicious(self, sub: str):
         user_tokens_to_expiry = {}
         for jti, user_id in self.jti_to_user_blacklist.items():
             if user_id == sub:
                 user_tokens_to_expiry[jti] = self.jti_to_expiry_blacklist[jti]
 
-        if len(user_tokens_to_expiry) > 7:
+        if len(user_tokens_to_expiry) > SUSPICIOUS_REVOKED_TOKENS:
             earliest_token_expiry = sorted(
                 user_tokens_to_expiry.items(), key=lambda item: item[1]
             )[0][1]
             return earliest_token_expiry
-        print(user_tokens_to_expiry)
         return False
 
     def _cleanup(self):
@@ -101,5 +108,93 @@ class TokenBlackList:
             print(f"[{datetime.now()}] Cleanup finished...")
 
 
-def get_blacklist(request: Request) -> TokenBlackList:
+# KEYS: jti key, subject zset | ARGV: expiry (unix seconds), sub, jti, now
+ADD_REVOKED_TOKEN_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[2], 'EXAT', ARGV[1])
+redis.call('ZADD', KEYS[2], ARGV[1], ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', ARGV[4])
+local latest = redis.call('ZRANGE', KEYS[2], -1, -1, 'WITHSCORES')
+if latest[2] then
+    redis.call('EXPIREAT', KEYS[2], latest[2])
+end
+return 1
+"""
+
+
+class RedisTokenBlackList:
+    """Blacklist shared by every worker through Redis.
+
+    Each revoked jti is a plain key that expires with the token, and each
+    subject has a sorted set of its revoked jtis scored by expiry, so the
+    suspicious-activity check never scans other users' tokens. Redis TTLs
+    do the cleanup, there is no periodic task.
+    """
+
+    prefix = "blacklist"
+
+    def __init__(self, redis_manager=redis_manager):
+        self.redis_manager = redis_manager
+
+    @property
+    def client(self):
+        return self.redis_manager.client
+
+    def _jti_key(self, jti: str) -> str:
+        return f"{self.prefix}:jti:{jti}"
+
+    def _sub_key(self, sub: str) -> str:
+        return f"{self.prefix}:sub:{sub}"
+
+    async def add(self, jti: str, expires_at: int, sub: str):
+        await self.client.eval(
+            ADD_REVOKED_TOKEN_SCRIPT,
+            2,
+            self._jti_key(jti),
+            self._sub_key(sub),
+            int(expires_at),
+            sub,
+            jti,
+            int(time.time()),
+        )
+
+    async def is_blacklisted(self, jti: str) -> bool:
+        return bool(await self.client.exists(self._jti_key(jti)))
+
+    async def entries(self) -> Dict[str, int]:
+        jti_prefix = self._jti_key("")
+        keys = [key async for key in self.client.scan_iter(match=f"{jti_prefix}*")]
+        if not keys:
+            return {}
+
+        now = int(time.time())
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.ttl(key)
+            ttls = await pipe.execute()
+        return {
+            key.removeprefix(jti_prefix): now + ttl
+            for key, ttl in zip(keys, ttls)
+            if ttl > 0
+        }
+
+    async def is_suspicious(self, sub: str):
+        # read-only on every request, expired entries are pruned by add()
+        key, live = self._sub_key(sub), f"({int(time.time())}"
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zcount(key, live, "+inf")
+            pipe.zrangebyscore(key, live, "+inf", start=0, num=1, withscores=True)
+            revoked_count, earliest = await pipe.execute()
+
+        if revoked_count > SUSPICIOUS_REVOKED_TOKENS:
+            return int(earliest[0][1])
+        return False
+
+
+def create_blacklist(backend: str = settings.token_blacklist_backend):
+    if backend == "redis":
+        return RedisTokenBlackList()
+    return TokenBlackList()
+
+
+def get_blacklist(request: Request):
     return request.app.state.blacklist
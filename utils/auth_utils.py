@@ -1,6 +1,9 @@
+import hashlib
+import time
 import uuid
 from copy import deepcopy
 from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
 
 import jwt
 from passlib.context import CryptContext
@@ -8,6 +11,10 @@ from pydantic import SecretStr
 
 from core.config import settings
 
+from .cache import TTLCache
+from .cache_events import register_cache
+from .keyring import keyring
+
 pwd_context = CryptContext(
     schemes=["argon2"],  # No length limitations
     default="argon2",
@@ -21,8 +28,8 @@ pwd_context = CryptContext(
 
 def encode_jwt(
     payload: dict,
-    key: str = settings.private_key_path.read_text(),
-    algorithm: str = settings.algorithm,
+    key: Any = None,
+    algorithm: Optional[str] = None,
     expire_minutes: int = settings.access_token_expire,
     expire_timedelta: timedelta | None = None,
 ):
@@ -37,18 +44,62 @@ def encode_jwt(
     to_encode.update(iat=now, exp=exp, jti=jti, sub=str(to_encode["id"]))
     to_encode.pop("id", None)
 
-    return jwt.encode(to_encode, key, algorithm)
+    # without an explicit key, sign with the keyring's active key and its kid
+    if key is None:
+        return keyring.encode(to_encode)
+    return jwt.encode(to_encode, key, algorithm or settings.algorithm)
 
 
 def decode_jwt(
     jwt_token: str | bytes,
-    key: str = settings.public_key_path.read_text(),
-    algorithm: str = settings.algorithm,
+    key: Any = None,
+    algorithm: Optional[str] = None,
 ):
-    decoded = jwt.decode(jwt=jwt_token, key=key, algorithms=algorithm)
+    if key is None:
+        return keyring.decode(jwt_token)
+    decoded = jwt.decode(
+        jwt=jwt_token, key=key, algorithms=[algorithm or settings.algorithm]
+    )
     return decoded
 
 
+# Never outlives an access token; entries are also cut to each token's exp
+jwt_cache = register_cache(
+    TTLCache(
+        maxsize=settings.jwt_cache_size,
+        ttl=settings.access_token_expire * 60,
+        name="jwt_cache",
+    )
+)
+
+
+def decode_jwt_cached(jwt_token: str | bytes) -> dict:
+    """`decode_jwt`, remembering tokens whose signature was already verified.
+
+    Only the signature check is skipped; revocation is up to the caller.
+    """
+    if not settings.jwt_cache_enabled:
+        return decode_jwt(jwt_token)
+
+    if isinstance(jwt_token, str):
+        jwt_token = jwt_token.encode()
+    key = hashlib.sha256(jwt_token).digest()
+
+    payload = jwt_cache.get(key)
+    if payload is None:
+        payload = decode_jwt(jwt_token)
+        time_left = payload.get("exp", 0) - time.time()
+        if time_left > 0:
+            jwt_cache.set(key, payload, ttl=time_left)
+    return dict(payload)
+
+
+def reload_keys() -> None:
+    """Re-reads the keyring; verified tokens are checked again against the new keys."""
+    keyring.reload_or_keep()
+    jwt_cache.clear()
+
+
 def hash_pwd(password: str | SecretStr) -> str:
     if isinstance(password, SecretStr):
         password = password.get_secret_value()
@@ -0,0 +1,59 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+from core.metrics import metrics
+
+
+class TTLCache:
+    """Small in-process LRU cache whose entries also expire after `ttl` seconds.
+
+    Hits and misses are counted in `core.metrics` as `<name>_hits` and
+    `<name>_misses`, and the entry count is kept in the `<name>_size` gauge.
+    A `maxsize` of 0 turns the cache off.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._lock = threading.Lock()
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    metrics.incr(f"{self.name}_hits")
+                    return value
+                del self._data[key]
+        metrics.incr(f"{self.name}_misses")
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            metrics.gauge(f"{self.name}_size", len(self._data))
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+            metrics.gauge(f"{self.name}_size", len(self._data))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            metrics.gauge(f"{self.name}_size", 0)
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,88 @@
+import asyncio
+import json
+from typing import Dict, Hashable, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from core.config import settings
+from core.metrics import metrics
+from core.redis import redis_manager
+
+from .cache import TTLCache
+
+# Every worker applies what is published here to its own in-process caches
+EVICTIONS_CHANNEL = "cache:evictions"
+
+_caches: Dict[str, TTLCache] = {}
+
+
+def register_cache(cache: TTLCache) -> TTLCache:
+    """Makes `cache` reachable by name for evictions from other workers."""
+    _caches[cache.name] = cache
+    return cache
+
+
+def apply_eviction(name: str, key: Optional[Hashable]) -> None:
+    cache = _caches.get(name)
+    if cache is None:
+        return
+    if key is None:
+        cache.clear()
+    else:
+        cache.pop(key)
+
+
+async def evict(name: str, key: Optional[Hashable] = None) -> None:
+    """Drops `key` from cache `name` in every worker, everything when key is None.
+
+    This worker's cache is updated before anything is published, so it is
+    never behind its own writes even when Redis is down.
+    """
+    apply_eviction(name, key)
+    try:
+        await redis_manager.client.publish(
+            EVICTIONS_CHANNEL, json.dumps({"cache": name, "key": key})
+        )
+    except RedisError as e:
+        metrics.incr("cache_eviction_errors")
+        print(f"⚠️ Cache eviction broadcast failed: {e}")
+
+
+class EvictionListener:
+    """Applies evictions published by the other workers.
+
+    It keeps its own connection, since a subscribed connection can't serve
+    other commands and would otherwise be taken from the shared pool for
+    good. Evictions published while it is disconnected are lost, so every
+    (re)subscribe clears the registered caches.
+    """
+
+    def __init__(self, url: str = settings.REDIS_URL, retry_interval: float = 1.0):
+        self.url = url
+        self.retry_interval = retry_interval
+        self._stopped = asyncio.Event()
+
+    async def run(self) -> None:
+        while not self._stopped.is_set():
+            client = redis.from_url(self.url, decode_responses=True)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(EVICTIONS_CHANNEL)
+                    for cache in _caches.values():
+                        cache.clear()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            event = json.loads(message["data"])
+                            apply_eviction(event["cache"], event["key"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.incr("cache_eviction_errors")
+                print(f"⚠️ Cache eviction listener error: {e!r}")
+                await asyncio.sleep(self.retry_interval)
+            finally:
+                await client.aclose()
+
+    def stop(self) -> None:
+        self._stopped.set()
@@ -0,0 +1,292 @@
+import asyncio
+import json
+import os
+import smtplib
+import socket
+import time
+import uuid
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+from core.config import settings
+from core.metrics import metrics
+from core.redis import redis_manager
+
+OUTBOX_STREAM = "email:outbox"
+RETRY_SET = "email:retry"
+DEAD_LETTER_STREAM = "email:dead"
+CONSUMER_GROUP = "mailers"
+
+# Moves retries whose backoff has passed back onto the outbox stream
+REQUEUE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, payload in ipairs(due) do
+    local fields = cjson.decode(payload)
+    local args = {}
+    for name, value in pairs(fields) do
+        table.insert(args, name)
+        table.insert(args, tostring(value))
+    end
+    redis.call('XADD', KEYS[2], '*', unpack(args))
+    redis.call('ZREM', KEYS[1], payload)
+end
+return #due
+"""
+
+
+async def enqueue_email(
+    to: str, subject: str, body: str, client: Optional[redis.Redis] = None
+) -> str:
+    """Puts a message on the outbox; the worker delivers it later."""
+    client = client or redis_manager.client
+    fields = {
+        "id": uuid.uuid4().hex,
+        "to": to,
+        "subject": subject,
+        "body": body,
+        "attempts": 0,
+    }
+    entry_id = await client.xadd(
+        OUTBOX_STREAM, fields, maxlen=settings.email_outbox_maxlen, approximate=True
+    )
+    metrics.incr("email_enqueued")
+    return entry_id
+
+
+def build_message(fields: Dict[str, str]) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.MAIL_FROM
+    message["To"] = fields["to"]
+    message["Subject"] = fields["subject"]
+    message.set_content(fields["body"])
+    return message
+
+
+class SMTPSender:
+    """Sends batches over one SMTP connection that is kept open between batches.
+
+    Blocking, so the worker runs it in a thread.
+    """
+
+    def __init__(
+        self,
+        host: str = settings.SMTP_SERVER,
+        port: int = settings.SMTP_PORT,
+        starttls: bool = settings.SMTP_STARTTLS,
+        username: Optional[str] = settings.MAIL_FROM,
+        password: Optional[str] = settings.APP_PASSWORD_SECRET,
+        timeout: float = settings.SMTP_TIMEOUT,
+    ):
+        self.host = host
+        self.port = port
+        self.starttls = starttls
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.password:
+                smtp.login(self.username, self.password)
+        except BaseException:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        return smtp
+
+    def send_batch(self, messages: List[EmailMessage]) -> Dict[int, Tuple[str, bool]]:
+        """Returns {index: (error, permanent)} for the messages that weren't sent."""
+        errors: Dict[int, Tuple[str, bool]] = {}
+        try:
+            smtp = self._connect()
+        except (smtplib.SMTPException, OSError) as e:
+            return {index: (str(e), False) for index in range(len(messages))}
+
+        for index, message in enumerate(messages):
+            try:
+                smtp.send_message(message)
+            except smtplib.SMTPRecipientsRefused as e:
+                # the server won't ever take these recipients
+                errors[index] = (str(e), True)
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                self.close()
+                for rest in range(index, len(messages)):
+                    errors[rest] = (str(e), False)
+                break
+            except smtplib.SMTPException as e:
+                errors[index] = (str(e), False)
+        return errors
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+
+def retry_delay(attempts: int) -> float:
+    delay = settings.email_retry_base * 2 ** (attempts - 1)
+    return min(delay, settings.email_retry_max)
+
+
+class EmailWorker:
+    """Delivers the outbox through a consumer group, so several workers can share it.
+
+    Failed sends go to a retry set with exponential backoff and, after
+    `email_max_attempts`, to the dead letter stream, as do entries that
+    can't be made into a message at all. Entries a crashed worker left
+    pending are claimed back after `email_claim_idle` seconds.
+
+    Without a `client` the worker opens its own, so its blocking reads never
+    hold a connection of the shared pool.
+    """
+
+    def __init__(
+        self,
+        sender: Optional[SMTPSender] = None,
+        client: Optional[redis.Redis] = None,
+        consumer: Optional[str] = None,
+    ):
+        self.sender = sender or SMTPSender()
+        self._client = client
+        self._owns_client = False
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self._group_ready = False
+        self._requeue = None
+        self._stopped = asyncio.Event()
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+            self._owns_client = True
+        return self._client
+
+    async def _ensure_group(self) -> None:
+        if self._group_ready:
+            return
+        try:
+            await self.client.xgroup_create(
+                OUTBOX_STREAM, CONSUMER_GROUP, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def _requeue_due(self) -> int:
+        if self._requeue is None:
+            self._requeue = self.client.register_script(REQUEUE_SCRIPT)
+        return await self._requeue(
+            keys=[RETRY_SET, OUTBOX_STREAM],
+            args=[time.time(), settings.email_batch_size],
+            client=self.client,
+        )
+
+    async def _next_batch(self, block_ms: Optional[int]) -> List[Tuple[str, Dict]]:
+        _, entries, *_ = await self.client.xautoclaim(
+            OUTBOX_STREAM,
+            CONSUMER_GROUP,
+            self.consumer,
+            min_idle_time=int(settings.email_claim_idle * 1000),
+            count=settings.email_batch_size,
+        )
+        entries = [entry for entry in entries if entry[1]]
+        if entries:
+            return entries
+
+        reply = await self.client.xreadgroup(
+            CONSUMER_GROUP,
+            self.consumer,
+            {OUTBOX_STREAM: ">"},
+            count=settings.email_batch_size,
+            block=block_ms,
+        )
+        return reply[0][1] if reply else []
+
+    async def process_once(self, block_ms: Optional[int] = None) -> int:
+        """Delivers one batch, returns how many entries it handled."""
+        await self._ensure_group()
+        await self._requeue_due()
+        entries = await self._next_batch(block_ms)
+        if not entries:
+            return 0
+
+        messages, sent, errors = [], [], {}
+        for index, (_, fields) in enumerate(entries):
+            try:
+                int(fields.get("attempts", 0))
+                messages.append(build_message(fields))
+                sent.append(index)
+            except (KeyError, ValueError, TypeError) as e:
+                # retrying won't fix it, don't let it hold up the rest
+                errors[index] = (f"Malformed outbox entry: {e!r}", True)
+
+        if messages:
+            start = time.perf_counter()
+            failed = await asyncio.to_thread(self.sender.send_batch, messages)
+            metrics.observe("email_send_batch", time.perf_counter() - start)
+            errors.update((sent[index], error) for index, error in failed.items())
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            for index, (entry_id, fields) in enumerate(entries):
+                if index in errors:
+                    self._schedule_retry(pipe, fields, *errors[index])
+                else:
+                    metrics.incr("email_sent")
+                pipe.xack(OUTBOX_STREAM, CONSUMER_GROUP, entry_id)
+                # acked entries hold tokens, don't keep them around
+                pipe.xdel(OUTBOX_STREAM, entry_id)
+            await pipe.execute()
+        return len(entries)
+
+    def _schedule_retry(self, pipe, fields: Dict, error: str, permanent: bool) -> None:
+        attempts = int(fields.get("attempts", 0)) + 1
+        fields = {**fields, "attempts": attempts, "error": error}
+        if permanent or attempts >= settings.email_max_attempts:
+            metrics.incr("email_dead")
+            print(f"❌ Giving up on email to {fields.get('to')}: {error}")
+            pipe.xadd(DEAD_LETTER_STREAM, fields, maxlen=settings.email_outbox_maxlen)
+            return
+        metrics.incr("email_retried")
+        pipe.zadd(RETRY_SET, {json.dumps(fields): time.time() + retry_delay(attempts)})
+
+    async def run(self) -> None:
+        print("📬 Email worker started")
+        while not self._stopped.is_set():
+            try:
+                await self.process_once(
+                    block_ms=int(settings.email_poll_interval * 1000)
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.incr("email_worker_errors")
+                print(f"⚠️ Email worker error: {e!r}")
+                await asyncio.sleep(settings.email_poll_interval)
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    async def close(self) -> None:
+        self.sender.close()
+        if self._owns_client:
+            await self._client.aclose()
+            self._client = None
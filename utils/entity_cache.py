@@ -0,0 +1,244 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError
+
+from core.config import settings
+from core.metrics import metrics
+from core.redis import redis_manager
+
+# Values live under entity:{name}:{id}:v{generation}.{version}. Invalidating
+# bumps the version, so a reader that loaded the old row can't put it back.
+# Bumping the generation orphans every entry at once.
+#
+# An entity that embeds its parent (a task its owner) also records the parent's
+# id under KEYS[3] and appends the parent's version to its own, so a parent
+# write orphans every child entry with one INCR.
+VERSION = """
+local entity_version = redis.call('GET', KEYS[1]) or '0'
+local version = (redis.call('GET', KEYS[2]) or '0') .. '.' .. entity_version
+local parent = KEYS[3] and redis.call('GET', KEYS[3])
+if parent then
+    version = version .. '.' .. parent .. ':' ..
+        (redis.call('GET', ARGV[1] .. parent) or '0')
+end
+"""
+
+GET_SCRIPT = (
+    VERSION
+    + """
+if KEYS[3] and not parent then
+    return {version, false}
+end
+return {version, redis.call('GET', ARGV[2] .. version)}
+"""
+)
+
+# Only stores the value if nobody invalidated the entity (or its parent) since
+# it was read. Returns -1 if the parent wasn't known when it was read, the
+# caller has to read and load again now that it is.
+SET_SCRIPT = (
+    VERSION
+    + """
+if KEYS[3] and parent ~= ARGV[7] then
+    redis.call('SET', KEYS[3], ARGV[7], 'EX', ARGV[5])
+    return -1
+end
+if version ~= ARGV[6] then
+    return 0
+end
+redis.call('SET', ARGV[2] .. version, ARGV[3], 'EX', ARGV[4])
+if entity_version ~= '0' then
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+end
+if parent then
+    redis.call('EXPIRE', KEYS[3], ARGV[5])
+    redis.call('EXPIRE', ARGV[1] .. parent, ARGV[5])
+end
+return 1
+"""
+)
+
+GENERATION_KEY = "entity_generation"
+
+_registered_scripts: Dict[str, AsyncScript] = {}
+
+
+def _script(source: str) -> AsyncScript:
+    if source not in _registered_scripts:
+        _registered_scripts[source] = redis_manager.client.register_script(source)
+    return _registered_scripts[source]
+
+
+def version_key(name: str, id: int) -> str:
+    return f"entity_version:{name}:{id}"
+
+
+def value_key_prefix(name: str, id: int) -> str:
+    return f"entity:{name}:{id}:v"
+
+
+async def invalidate_entities(entities: Iterable[Tuple[str, int]]) -> None:
+    """Bumps the version of every (cache name, id) pair in one round trip."""
+    entities = set(entities)
+    if not entities or not settings.entity_cache_enabled:
+        return
+    try:
+        async with redis_manager.client.pipeline(transaction=False) as pipe:
+            for name, id in entities:
+                key = version_key(name, id)
+                pipe.incr(key)
+                # must outlive any value stored under an older version
+                pipe.expire(key, settings.entity_cache_ttl * 2)
+            await pipe.execute()
+    except RedisError as e:
+        metrics.incr("entity_cache_errors")
+        print(f"⚠️ Entity cache invalidation failed: {e}")
+
+
+async def clear_entity_cache() -> None:
+    """Orphans every cached entity, e.g. after the tables were recreated.
+
+    The old entries are left to expire on their own.
+    """
+    try:
+        await redis_manager.client.incr(GENERATION_KEY)
+    except RedisError as e:
+        metrics.incr("entity_cache_errors")
+        print(f"⚠️ Entity cache clear failed: {e}")
+
+
+class EntityCache:
+    """Read-through Redis cache of serialized schemas, one entry per id.
+
+    Concurrent misses for the same id share one load within a worker, and
+    across workers only the holder of a short Redis lock loads from the
+    database while the others wait for its result.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl: int = settings.entity_cache_ttl,
+        parent: Optional[Tuple[str, Callable[[str], int]]] = None,
+    ):
+        """`parent` is the cache name of an entity embedded in every value
+        and a function reading its id from the value, e.g. a task's owner.
+        Writes to the parent then orphan its children without knowing them.
+        """
+        self.name = name
+        self.ttl = ttl
+        self.parent = parent
+        self._loading: Dict[int, asyncio.Future] = {}
+
+    def _keys(self, id: int) -> List[str]:
+        keys = [version_key(self.name, id), GENERATION_KEY]
+        if self.parent is not None:
+            keys.append(f"entity_parent:{self.name}:{id}")
+        return keys
+
+    def _parent_prefix(self) -> str:
+        return f"entity_version:{self.parent[0]}:" if self.parent else ""
+
+    async def _read(self, id: int) -> Tuple[str, Optional[str]]:
+        version, value = await _script(GET_SCRIPT)(
+            keys=self._keys(id),
+            args=[self._parent_prefix(), value_key_prefix(self.name, id)],
+            client=redis_manager.client,
+        )
+        return version, value
+
+    async def _write(self, id: int, version: str, value: str) -> int:
+        # jitter keeps entries written together from expiring together
+        ttl = int(self.ttl * random.uniform(0.9, 1.0))
+        parent_id = self.parent[1](value) if self.parent else ""
+        return await _script(SET_SCRIPT)(
+            keys=self._keys(id),
+            args=[
+                self._parent_prefix(),
+                value_key_prefix(self.name, id),
+                value,
+                ttl,
+                self.ttl * 2,
+                version,
+                parent_id,
+            ],
+            client=redis_manager.client,
+        )
+
+    async def get_or_load(self, id: int, load: Callable[[], Awaitable[str]]) -> str:
+        """Returns the cached JSON for `id`, calling `load` on a miss."""
+        if not settings.entity_cache_enabled:
+            return await load()
+
+        pending = self._loading.get(id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[id] = future
+        try:
+            value = await self._get_or_load(id, load)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # nobody else may be waiting, don't warn about an unretrieved error
+            future.exception()
+            raise
+        finally:
+            del self._loading[id]
+
+    async def _get_or_load(self, id: int, load: Callable[[], Awaitable[str]]) -> str:
+        try:
+            version, value = await self._read(id)
+        except RedisError as e:
+            metrics.incr("entity_cache_errors")
+            print(f"⚠️ Entity cache read failed: {e}")
+            return await load()
+
+        if value is not None:
+            metrics.incr(f"entity_cache_{self.name}_hits")
+            return value
+        metrics.incr(f"entity_cache_{self.name}_misses")
+
+        lock_key = f"entity_lock:{self.name}:{id}"
+        lock_timeout = settings.entity_cache_lock_timeout
+        locked = False
+        try:
+            locked = await redis_manager.client.set(
+                lock_key, 1, nx=True, px=int(lock_timeout * 1000)
+            )
+            if not locked:
+                # another worker is loading this entity, wait for it to land
+                deadline = time.monotonic() + lock_timeout
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(0.05)
+                    version, value = await self._read(id)
+                    if value is not None:
+                        metrics.incr(f"entity_cache_{self.name}_waits")
+                        return value
+
+            value = await load()
+            if await self._write(id, version, value) == -1:
+                # the parent is known now, load again under its version
+                version, _ = await self._read(id)
+                value = await load()
+                await self._write(id, version, value)
+            return value
+        except RedisError as e:
+            metrics.incr("entity_cache_errors")
+            print(f"⚠️ Entity cache write failed: {e}")
+            return value if value is not None else await load()
+        finally:
+            if locked:
+                try:
+                    await redis_manager.client.delete(lock_key)
+                except RedisError:
+                    pass  # expires on its own
@@ -0,0 +1,83 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, Optional
+
+from fastapi import Request, Response, status
+
+
+def parse_timestamp(value: Any) -> Optional[datetime]:
+    """Reads a stored timestamp, treating naive ones as UTC."""
+    if value is None:
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def latest(values: Iterable[Any]) -> Optional[datetime]:
+    timestamps = [ts for ts in map(parse_timestamp, values) if ts is not None]
+    return max(timestamps, default=None)
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag over whatever identifies a version of a representation."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # weak comparison: W/ prefixes don't matter for GET
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def is_not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime]
+) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have whole seconds
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """Returns a 304 if the client's copy is current, otherwise sets the validators.
+
+    Callers decide `etag` from a version query, before loading the body.
+    """
+    headers = validator_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+from datetime import date, time
+from typing import Any, AsyncIterator, Dict, Literal, Sequence
+
+from fastapi.responses import StreamingResponse
+
+from core.config import settings
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def export_value(value: Any) -> Any:
+    """ISO 8601 for dates and times, the same as the JSON API returns."""
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+async def encode_ndjson(
+    rows: AsyncIterator[Dict[str, Any]], fields: Sequence[str]
+) -> AsyncIterator[str]:
+    async for row in rows:
+        row = {field: export_value(row[field]) for field in fields}
+        yield json.dumps(row, default=str) + "\n"
+
+
+async def encode_csv(
+    rows: AsyncIterator[Dict[str, Any]], fields: Sequence[str]
+) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(fields)
+    async for row in rows:
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([export_value(row[field]) for field in fields])
+    yield buffer.getvalue()
+
+
+ENCODERS = {"ndjson": encode_ndjson, "csv": encode_csv}
+
+
+async def chunked(
+    lines: AsyncIterator[str], chunk_size: int = settings.export_chunk_size
+) -> AsyncIterator[bytes]:
+    """Groups encoded lines into chunks of about `chunk_size` bytes."""
+    parts, size = [], 0
+    async for line in lines:
+        parts.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield "".join(parts).encode()
+            parts, size = [], 0
+    if parts:
+        yield "".join(parts).encode()
+
+
+def export_response(
+    rows: AsyncIterator[Dict[str, Any]],
+    fields: Sequence[str],
+    export_format: ExportFormat,
+    filename: str,
+) -> StreamingResponse:
+    """Streams rows as NDJSON or CSV while they are still being read."""
+    return StreamingResponse(
+        chunked(ENCODERS[export_format](rows, fields)),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format}"'
+        },
+    )
@@ -0,0 +1,115 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Callable, Optional, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import SecretStr
+
+from core.config import settings
+from core.metrics import metrics
+
+from .auth_utils import hash_pwd, validate_pwd
+
+
+def _timed_hash(password: str) -> Tuple[str, float]:
+    start = time.perf_counter()
+    hashed = hash_pwd(password)
+    return hashed, time.perf_counter() - start
+
+
+def _timed_verify(password: str, hashed_password: str) -> Tuple[bool, float]:
+    start = time.perf_counter()
+    is_valid = validate_pwd(password, hashed_password)
+    return is_valid, time.perf_counter() - start
+
+
+class PasswordHasher:
+    """Runs Argon2 off the event loop on a bounded process pool.
+
+    At most `max_in_flight` hashes run at once, and at most `max_queue`
+    callers may wait for a slot; anyone past that gets a 503 straight away
+    instead of piling onto the pool.
+    """
+
+    def __init__(
+        self,
+        workers: int = settings.hash_pool_workers,
+        max_in_flight: int = settings.hash_max_in_flight,
+        max_queue: int = settings.hash_max_queue,
+    ):
+        self.workers = workers
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.waiting = 0
+
+    def _get_executor(self) -> Optional[Executor]:
+        # workers == 0 falls back to the loop's default thread pool
+        if self._executor is None and self.workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._loop = loop
+        return self._semaphore
+
+    async def _run(self, name: str, func: Callable, *args):
+        if self.waiting >= self.max_queue:
+            metrics.incr(f"{name}_rejected")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many authentication requests in progress, try again shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        semaphore = self._get_semaphore()
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        try:
+            started_at = time.perf_counter()
+            metrics.observe(f"{name}_wait", started_at - queued_at)
+
+            loop = asyncio.get_running_loop()
+            result, hash_time = await loop.run_in_executor(
+                self._get_executor(), func, *args
+            )
+            metrics.observe(f"{name}_hash", hash_time)
+            return result
+        finally:
+            semaphore.release()
+
+    async def hash(self, password: str | SecretStr) -> str:
+        if isinstance(password, SecretStr):
+            password = password.get_secret_value()
+        return await self._run("password_hash", _timed_hash, password)
+
+    async def verify(self, password: str | SecretStr, hashed_password: str) -> bool:
+        if isinstance(password, SecretStr):
+            password = password.get_secret_value()
+        return await self._run(
+            "password_verify", _timed_verify, password, hashed_password
+        )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,138 @@
+import base64
+import hashlib
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
+
+from core.config import settings
+
+
+def algorithm_for(key: Any) -> str:
+    """The JWS algorithm a key is used with, decided by its type."""
+    if isinstance(key, (rsa.RSAPrivateKey, rsa.RSAPublicKey)):
+        return settings.algorithm
+    if isinstance(key, (ec.EllipticCurvePrivateKey, ec.EllipticCurvePublicKey)):
+        if key.curve.name != "secp256r1":
+            raise ValueError(f"Unsupported EC curve {key.curve.name!r}, use P-256")
+        return "ES256"
+    if isinstance(key, (ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey)):
+        return "EdDSA"
+    raise ValueError(f"Unsupported key type {type(key).__name__}")
+
+
+def key_id(public_key: Any) -> str:
+    """Stable `kid`: a digest of the public key, so every worker derives the same one."""
+    der = public_key.public_bytes(
+        serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return base64.urlsafe_b64encode(hashlib.sha256(der).digest()[:12]).decode()
+
+
+@dataclass(frozen=True)
+class SigningKey:
+    kid: str
+    algorithm: str
+    key: Any
+
+
+@dataclass(frozen=True)
+class VerificationKey:
+    kid: str
+    algorithm: str
+    key: Any
+
+
+def load_pem(path: Path) -> Any:
+    data = path.read_bytes()
+    if b"PRIVATE KEY" in data:
+        return serialization.load_pem_private_key(data, password=None)
+    return serialization.load_pem_public_key(data)
+
+
+class Keyring:
+    """Parsed JWT keys: one to sign with and every key tokens may still be verified by.
+
+    The signing key is `private_key_path`. Every `*.pem` in `keys_dir` is
+    accepted for verification, so during a rotation the old public key is
+    kept next to the new pair until the last old token has expired.
+    `reload()` re-reads the directory and swaps the keys in one step.
+    """
+
+    def __init__(
+        self,
+        private_key_path: Path = settings.private_key_path,
+        keys_dir: Path = settings.jwt_keys_dir,
+    ):
+        self.private_key_path = private_key_path
+        self.keys_dir = keys_dir
+        self._lock = threading.Lock()
+        self._signing: Optional[SigningKey] = None
+        self._verification: Dict[str, VerificationKey] = {}
+
+    def reload(self) -> None:
+        private_key = load_pem(self.private_key_path)
+        signing = SigningKey(
+            kid=key_id(private_key.public_key()),
+            algorithm=algorithm_for(private_key),
+            key=private_key,
+        )
+
+        verification = {
+            signing.kid: VerificationKey(
+                signing.kid, signing.algorithm, private_key.public_key()
+            )
+        }
+        for path in sorted(self.keys_dir.glob("*.pem")):
+            key = load_pem(path)
+            if hasattr(key, "private_bytes"):
+                key = key.public_key()
+            kid = key_id(key)
+            verification.setdefault(kid, VerificationKey(kid, algorithm_for(key), key))
+
+        with self._lock:
+            self._signing, self._verification = signing, verification
+        print(f"🔑 Loaded JWT keys, signing with {signing.algorithm} kid={signing.kid}")
+
+    def reload_or_keep(self) -> None:
+        """Signal handler: a broken key file shouldn't take the old keys down."""
+        try:
+            self.reload()
+        except (OSError, ValueError) as e:
+            print(f"❌ Reloading JWT keys failed, keeping the current ones: {e}")
+
+    @property
+    def signing_key(self) -> SigningKey:
+        if self._signing is None:
+            self.reload()
+        return self._signing  # type: ignore
+
+    def verification_key(self, kid: Optional[str]) -> VerificationKey:
+        if self._signing is None:
+            self.reload()
+        # tokens issued before keys had ids were signed with the active key
+        if kid is None:
+            kid = self.signing_key.kid
+        try:
+            return self._verification[kid]
+        except KeyError:
+            raise jwt.InvalidKeyError(f"Unknown signing key {kid!r}")
+
+    def encode(self, payload: dict) -> str:
+        signing = self.signing_key
+        return jwt.encode(
+            payload, signing.key, signing.algorithm, headers={"kid": signing.kid}
+        )
+
+    def decode(self, token: str | bytes) -> dict:
+        header = jwt.get_unverified_header(token)
+        verification = self.verification_key(header.get("kid"))
+        # pinned per key, so a token can't pick its own algorithm
+        return jwt.decode(token, verification.key, algorithms=[verification.algorithm])
+
+
+keyring = Keyring()
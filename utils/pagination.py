@@ -0,0 +1,42 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(data: Dict[str, Any]) -> str:
+    raw = json.dumps(data, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def page_cursor(obj: Any, sort: str, order: str, direction: str) -> str:
+    """Cursor continuing a (sort, id) keyset listing after or before `obj`."""
+    return encode_cursor(
+        {"v": getattr(obj, sort), "id": obj.id, "s": sort, "o": order, "d": direction}
+    )
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(data, dict):
+            raise ValueError("cursor is not an object")
+        return data
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor: {e}",
+        )
+
+
+def cursor_value(column, raw: Any) -> Any:
+    """Turns a value read back from a cursor into the column's python type."""
+    if raw is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(raw)
+    return python_type(raw)
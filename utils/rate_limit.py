@@ -1,72 +1,544 @@
+import asyncio
+import math
 import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Dict, List, Literal, Optional, Sequence, Tuple
 
 from fastapi import Depends, HTTPException, Request, status
+from redis.commands.core import AsyncScript
+from redis.exceptions import RedisError
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from core.config import settings
+from core.metrics import metrics
 from core.redis import redis_manager
-from services.auth_validation import get_current_auth_user
+from services.auth_validation import get_current_principal
 
+# Every script checks all of KEYS at once. ARGV holds a (limit, window in
+# seconds, cost) triple per key followed by a unique member. Nothing is charged
+# unless every key allows the request, and the reply is a flat list of
+# {allowed, remaining, reset_ms, retry_after_ms} per key. Time comes from
+# the Redis server so all workers share one clock.
+_PROLOGUE = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local member = ARGV[#ARGV]
+"""
 
-async def check_rate_limit(id: str, prefix: str, limit: int, window: int):
-    key = f"rate_limit:{prefix}:{id}"
-    current_time = time.time()
+_EPILOGUE = """
+local results = {}
+local allowed = true
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[i * 3 - 2])
+    local window = tonumber(ARGV[i * 3 - 1]) * 1000
+    local cost = tonumber(ARGV[i * 3])
+    local r = check(key, limit, window, cost)
+    r.cost = cost
+    results[i] = r
+    if r.allowed == 0 then
+        allowed = false
+    end
+end
+local reply = {}
+for i, key in ipairs(KEYS) do
+    local r = results[i]
+    if allowed then
+        commit(key, r)
+    elseif r.allowed == 1 then
+        -- nothing was charged, so this key keeps what it reserved
+        r.remaining = r.remaining + r.cost
+    end
+    table.insert(reply, r.allowed)
+    table.insert(reply, math.max(0, math.floor(r.remaining)))
+    table.insert(reply, math.ceil(r.reset))
+    table.insert(reply, math.ceil(r.retry))
+end
+return reply
+"""
 
-    await redis_manager.client.zremrangebyscore(key, 0, current_time - window)
+# One sorted-set member per request, exact but O(limit) memory per key.
+SLIDING_LOG_SCRIPT = (
+    _PROLOGUE
+    + """
+local function check(key, limit, window, cost)
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+    local count = redis.call('ZCARD', key)
+    local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+    local reset = window
+    if oldest[2] then
+        reset = tonumber(oldest[2]) + window - now
+    end
+    if count + cost > limit then
+        return {allowed = 0, remaining = limit - count, reset = reset,
+                retry = reset}
+    end
+    return {allowed = 1, remaining = limit - count - cost, reset = reset,
+            retry = 0, window = window}
+end
 
-    request_count = await redis_manager.client.zcard(key)
+local function commit(key, r)
+    for i = 1, r.cost do
+        redis.call('ZADD', key, now, member .. ':' .. i)
+    end
+    redis.call('PEXPIRE', key, r.window)
+end
+"""
+    + _EPILOGUE
+)
 
-    if request_count >= limit:
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Rate limit exceeded. {limit} requests per {window} seconds",
-            headers={
-                "X-RateLimit-Limit": str(limit),
-                "X-RateLimit-Remaining": "0",
-                "Retry-After": str(window),
-            },
+# Two fixed-window counters in one hash, previous window weighted by overlap.
+SLIDING_WINDOW_SCRIPT = (
+    _PROLOGUE
+    + """
+local function check(key, limit, window, cost)
+    local current = math.floor(now / window)
+    local elapsed = now - current * window
+    local count = tonumber(redis.call('HGET', key, current) or 0)
+    local previous = tonumber(redis.call('HGET', key, current - 1) or 0)
+    local estimated = previous * (window - elapsed) / window + count
+    local r = {allowed = 1, remaining = limit - estimated - cost,
+               reset = window - elapsed, retry = 0, window = window,
+               current = current}
+    if estimated + cost > limit then
+        r.allowed = 0
+        r.remaining = limit - estimated
+        r.retry = window - elapsed
+        if count + cost <= limit and previous > 0 then
+            r.retry = (window - elapsed) - (limit - cost - count) * window / previous
+        elseif count > 0 and cost <= limit then
+            -- this window's count alone is too high, wait for it to fade
+            -- out of the next window's estimate
+            r.retry = (window - elapsed) + (1 - (limit - cost) / count) * window
+        end
+    end
+    return r
+end
+
+local function commit(key, r)
+    redis.call('HINCRBY', key, r.current, r.cost)
+    redis.call('HDEL', key, r.current - 2)
+    redis.call('PEXPIRE', key, r.window * 2)
+end
+"""
+    + _EPILOGUE
+)
+
+# Generic cell rate algorithm: a single theoretical arrival time per key.
+GCRA_SCRIPT = (
+    _PROLOGUE
+    + """
+local function check(key, limit, window, cost)
+    local interval = window / limit
+    local tat = tonumber(redis.call('GET', key) or now)
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval * cost
+    local allow_at = new_tat - window
+    if now < allow_at then
+        return {allowed = 0, remaining = (window - (tat - now)) / interval,
+                reset = tat - now, retry = allow_at - now}
+    end
+    return {allowed = 1, remaining = (now - allow_at) / interval,
+            reset = new_tat - now, retry = 0, new_tat = new_tat}
+end
+
+local function commit(key, r)
+    redis.call('SET', key, r.new_tat, 'PX', math.ceil(r.new_tat - now))
+end
+"""
+    + _EPILOGUE
+)
+
+# Bucket of `limit` tokens refilled continuously over `window`.
+TOKEN_BUCKET_SCRIPT = (
+    _PROLOGUE
+    + """
+local function check(key, limit, window, cost)
+    local rate = limit / window
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or limit
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(limit, tokens + (now - ts) * rate)
+    if tokens < cost then
+        return {allowed = 0, remaining = tokens, reset = (limit - tokens) / rate,
+                retry = (cost - tokens) / rate}
+    end
+    return {allowed = 1, remaining = tokens - cost,
+            reset = (limit - tokens + cost) / rate, retry = 0,
+            tokens = tokens - cost}
+end
+
+local function commit(key, r)
+    redis.call('HSET', key, 'tokens', r.tokens, 'ts', now)
+    redis.call('PEXPIRE', key, math.ceil(r.reset))
+end
+"""
+    + _EPILOGUE
+)
+
+RATE_LIMIT_SCRIPTS = {
+    "sliding_log": SLIDING_LOG_SCRIPT,
+    "sliding_window": SLIDING_WINDOW_SCRIPT,
+    "gcra": GCRA_SCRIPT,
+    "token_bucket": TOKEN_BUCKET_SCRIPT,
+}
+
+_registered_scripts: Dict[str, AsyncScript] = {}
+
+
+def get_rate_limit_script(algorithm: str) -> AsyncScript:
+    if algorithm not in _registered_scripts:
+        _registered_scripts[algorithm] = redis_manager.client.register_script(
+            RATE_LIMIT_SCRIPTS[algorithm]
         )
+    return _registered_scripts[algorithm]
 
-    await redis_manager.client.zadd(key, {str(current_time): current_time})
-    await redis_manager.client.expire(key, window + 10)
 
-    return {
-        "limit": limit,
-        "remaining": limit - request_count - 1,
-        "reset": int(current_time + window),
-    }
+@dataclass(frozen=True)
+class RateLimit:
+    prefix: str
+    limit: int
+    window: int
+    scope: Literal["ip", "user"] = "ip"
 
 
-async def get_global_rate_limit(request: Request):
-    return await check_rate_limit(
-        id=request.client.host,
-        prefix="global",
-        limit=settings.redis_limit_global,
-        window=settings.redis_window,
-    )
+@dataclass(frozen=True)
+class RateLimitResult:
+    limit: RateLimit
+    allowed: bool
+    remaining: int
+    reset: int
+    retry_after: int
+    cost: int = 1
 
 
-async def get_auth_rate_limit(request: Request):
-    return await check_rate_limit(
-        id=request.client.host,
-        prefix="auth",
-        limit=settings.redis_limit_auth,
-        window=settings.redis_window,
-    )
+GLOBAL_LIMIT = RateLimit("global", settings.redis_limit_global, settings.redis_window)
+AUTH_LIMIT = RateLimit("auth", settings.redis_limit_auth, settings.redis_window)
+USER_LIMIT = RateLimit(
+    "user", settings.rate_limit_api, settings.redis_user_window, scope="user"
+)
 
 
-async def get_user_rate_limit(user=Depends(get_current_auth_user)):
-    return await check_rate_limit(
-        id=user.id,
-        prefix="user",
-        limit=settings.rate_limit_api,
-        window=settings.redis_user_window,
-    )
+def rate_limit_key(algorithm: str, limit: RateLimit, id) -> str:
+    return f"rate_limit:{algorithm}:{limit.prefix}:{id}"
+
 
+async def evaluate_rate_limits(
+    limits: Sequence[Tuple[RateLimit, str]],
+    algorithm: str = settings.rate_limit_algorithm,
+    costs: Optional[Sequence[int]] = None,
+) -> List[RateLimitResult]:
+    """Checks and charges every (limit, id) pair in one script call."""
+    costs = costs or [1] * len(limits)
+    keys = [rate_limit_key(algorithm, limit, id) for limit, id in limits]
+    args: List = []
+    for (limit, _), cost in zip(limits, costs):
+        args.extend((limit.limit, limit.window, cost))
+    args.append(uuid.uuid4().hex)
 
-async def custom_user_rate_limit(user=Depends(get_current_auth_user)):
-    return await check_rate_limit(
-        id=user.id,
-        prefix="custom",
-        limit=5,
-        window=60,
+    script = get_rate_limit_script(algorithm)
+    reply = await asyncio.wait_for(
+        script(keys=keys, args=args, client=redis_manager.client),
+        timeout=settings.rate_limit_redis_timeout,
     )
+
+    return [
+        RateLimitResult(
+            limit=limit,
+            allowed=bool(reply[i * 4]),
+            remaining=reply[i * 4 + 1],
+            reset=math.ceil(reply[i * 4 + 2] / 1000),
+            retry_after=max(1, math.ceil(reply[i * 4 + 3] / 1000)),
+        )
+        for i, (limit, _) in enumerate(limits)
+    ]
+
+
+class LocalLease:
+    __slots__ = ("tokens", "used", "remaining", "reset_at", "expires_at", "stale_at")
+
+    def __init__(
+        self,
+        tokens: int,
+        remaining: int,
+        reset_at: float,
+        expires_at: float,
+        stale_at: float,
+    ):
+        self.tokens = tokens
+        self.used = 1  # requests served by this lease, the fetching one included
+        self.remaining = remaining
+        self.reset_at = reset_at
+        self.expires_at = expires_at
+        self.stale_at = stale_at  # Redis stops counting the charge after this
+
+
+class LocalLeases:
+    """Slices of Redis quota handed out by this worker without a round trip.
+
+    A lease is charged to Redis up front and spent locally until it runs out
+    or is older than the sync interval. A key starts with single requests and
+    its lease only grows while the last one ran dry inside the interval, so a
+    key seen once in a while is charged exactly one token per request.
+
+    Tokens left in an expired lease are credited against its renewal for as
+    long as Redis still counts them, so they are not charged twice. Only a
+    lease evicted past `max_keys` loses its tokens, at most what that key
+    used in one interval.
+    """
+
+    def __init__(
+        self,
+        fraction: float = settings.rate_limit_lease_fraction,
+        max_tokens: int = settings.rate_limit_lease_max_tokens,
+        sync_interval: float = settings.rate_limit_lease_sync_interval,
+        max_keys: int = settings.rate_limit_lease_max_keys,
+    ):
+        self.fraction = fraction
+        self.max_tokens = max_tokens
+        self.sync_interval = sync_interval
+        self.max_keys = max_keys
+        self.leases: OrderedDict[str, LocalLease] = OrderedDict()
+
+    def size(self, key: str, limit: RateLimit) -> int:
+        """Tokens the next lease of `key` should hold, this request included."""
+        cap = max(1, min(self.max_tokens, int(limit.limit * self.fraction)))
+        lease = self.leases.get(key)
+        if lease is None:
+            return 1
+        if lease.tokens <= 0 and lease.expires_at > time.monotonic():
+            return min(cap, lease.used * 2)
+        return max(1, min(cap, lease.used))
+
+    def has(self, key: str) -> bool:
+        lease = self.leases.get(key)
+        return (
+            lease is not None
+            and lease.tokens > 0
+            and lease.expires_at > time.monotonic()
+        )
+
+    def claim(self, key: str, limit: RateLimit) -> Tuple[int, int]:
+        """(cost to charge Redis, tokens carried over) for renewing `key`.
+
+        The carried tokens leave the old lease straight away, so concurrent
+        renewals cannot both count them.
+        """
+        size = self.size(key, limit)
+        lease = self.leases.get(key)
+        credit = 0
+        if lease is not None and lease.stale_at > time.monotonic():
+            credit = max(0, lease.tokens)
+            lease.tokens -= credit
+        return max(1, size - credit), credit
+
+    def restore(self, key: str, tokens: int, used: int = 0):
+        """Gives back tokens of a request that was denied after all."""
+        lease = self.leases.get(key)
+        if lease is not None:
+            lease.tokens += tokens
+            lease.used -= used
+
+    def grant(
+        self,
+        key: str,
+        limit: RateLimit,
+        cost: int,
+        credit: int,
+        result: RateLimitResult,
+    ) -> int:
+        """Stores the lease bought for `cost`, returns the tokens it holds."""
+        now = time.monotonic()
+        tokens = credit + cost - 1  # this request spends one
+        lease = self.leases.get(key)
+        if lease is not None and lease.expires_at > now and lease.tokens > 0:
+            # a concurrent request refreshed this key too, keep both slices
+            tokens += lease.tokens
+        self.leases[key] = LocalLease(
+            tokens=tokens,
+            remaining=result.remaining,
+            reset_at=now + result.reset,
+            expires_at=now + self.sync_interval,
+            stale_at=now + limit.window,
+        )
+        self.leases.move_to_end(key)
+        while len(self.leases) > self.max_keys:
+            self.leases.popitem(last=False)
+        return tokens
+
+    def take(self, key: str, limit: RateLimit) -> Optional[RateLimitResult]:
+        """Spends a token of a live lease, None when `key` needs Redis."""
+        if not self.has(key):
+            return None
+        lease = self.leases[key]
+        lease.tokens -= 1
+        lease.used += 1
+        return RateLimitResult(
+            limit=limit,
+            allowed=True,
+            remaining=lease.remaining + lease.tokens,
+            reset=max(0, math.ceil(lease.reset_at - time.monotonic())),
+            retry_after=0,
+        )
+
+
+local_leases = LocalLeases()
+
+
+def rate_limit_headers(results: List[RateLimitResult]) -> Dict[str, str]:
+    denied = [result for result in results if not result.allowed]
+    if denied:
+        tightest = max(denied, key=lambda result: result.retry_after)
+    else:
+        tightest = min(results, key=lambda result: result.remaining)
+
+    headers = {
+        "RateLimit-Limit": str(tightest.limit.limit),
+        "RateLimit-Remaining": str(tightest.remaining),
+        "RateLimit-Reset": str(tightest.reset),
+        "RateLimit-Policy": ", ".join(
+            f"{result.limit.limit};w={result.limit.window}" for result in results
+        ),
+    }
+    if denied:
+        headers.update(
+            {
+                "Retry-After": str(tightest.retry_after),
+                "X-RateLimit-Limit": str(tightest.limit.limit),
+                "X-RateLimit-Remaining": "0",
+            }
+        )
+    return headers
+
+
+class RateLimitPolicy:
+    """All limits a route is subject to, evaluated together in one round trip.
+
+    The resulting `RateLimit-*` headers are stored on the request and added
+    to the response by `RateLimitHeadersMiddleware`.
+    """
+
+    def __init__(
+        self, *limits: RateLimit, algorithm: str = settings.rate_limit_algorithm
+    ):
+        self.limits = limits
+        self.algorithm = algorithm
+
+    async def check(self, request: Request, user_id: Optional[int] = None):
+        ids = {"ip": request.client.host, "user": user_id}
+        entries = [(limit, ids[limit.scope]) for limit in self.limits]
+        keys = [rate_limit_key(self.algorithm, limit, id) for limit, id in entries]
+
+        # taken before any await, so a lease cannot go away in between
+        results: Dict[int, RateLimitResult] = {}
+        stale = []
+        for i, (limit, _) in enumerate(entries):
+            result = local_leases.take(keys[i], limit)
+            if result is None:
+                stale.append(i)
+            else:
+                results[i] = result
+
+        if stale:
+            claims = [local_leases.claim(keys[i], entries[i][0]) for i in stale]
+            try:
+                fetched = await self._fetch(
+                    [entries[i] for i in stale], [cost for cost, _ in claims]
+                )
+            except HTTPException:
+                self._give_back(keys, stale, claims, results)
+                raise
+            if fetched is None:
+                self._give_back(keys, stale, claims, {})
+                return []  # Redis is unavailable and we fail open
+
+            denied = [result for result in fetched if not result.allowed]
+            if denied:
+                self._give_back(keys, stale, claims, results)
+                headers = rate_limit_headers(fetched)
+                request.state.rate_limit_headers = headers
+                limit = max(denied, key=lambda result: result.retry_after).limit
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail=f"Rate limit exceeded. {limit.limit} requests per {limit.window} seconds",
+                    headers=headers,
+                )
+
+            for i, (_, credit), result in zip(stale, claims, fetched):
+                limit = entries[i][0]
+                tokens = local_leases.grant(keys[i], limit, result.cost, credit, result)
+                results[i] = replace(result, remaining=result.remaining + tokens)
+
+        ordered = [results[i] for i in range(len(entries))]
+        request.state.rate_limit_headers = rate_limit_headers(ordered)
+        return ordered
+
+    @staticmethod
+    def _give_back(
+        keys: List[str],
+        stale: List[int],
+        claims: List[Tuple[int, int]],
+        taken: Dict[int, RateLimitResult],
+    ):
+        """Nothing was charged in Redis, so every key keeps what it had."""
+        for i, (_, credit) in zip(stale, claims):
+            local_leases.restore(keys[i], credit)
+        for i in taken:
+            local_leases.restore(keys[i], 1, used=1)
+
+    async def _fetch(
+        self, entries: List[Tuple[RateLimit, str]], costs: List[int]
+    ) -> Optional[List[RateLimitResult]]:
+        try:
+            results = await evaluate_rate_limits(entries, self.algorithm, costs)
+            if any(not result.allowed for result in results) and max(costs) > 1:
+                # not enough quota for a whole lease, fall back to one request
+                costs = [1] * len(entries)
+                results = await evaluate_rate_limits(entries, self.algorithm, costs)
+        except (asyncio.TimeoutError, RedisError) as e:
+            metrics.incr("rate_limit_redis_errors")
+            if settings.rate_limit_fail_open:
+                return None
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Rate limiter is unavailable: {e!r}",
+                headers={"Retry-After": "1"},
+            )
+        return [replace(result, cost=cost) for result, cost in zip(results, costs)]
+
+    async def __call__(self, request: Request):
+        return await self.check(request)
+
+
+class UserRateLimitPolicy(RateLimitPolicy):
+    async def __call__(self, request: Request, user=Depends(get_current_principal)):
+        return await self.check(request, user_id=user.id)
+
+
+class RateLimitHeadersMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_headers(message: Message):
+            if message["type"] == "http.response.start":
+                headers = scope.get("state", {}).get("rate_limit_headers")
+                if headers:
+                    response_headers = MutableHeaders(scope=message)
+                    for name, value in headers.items():
+                        response_headers.setdefault(name, value)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+get_global_rate_limit = RateLimitPolicy(GLOBAL_LIMIT)
+get_auth_rate_limit = RateLimitPolicy(GLOBAL_LIMIT, AUTH_LIMIT)
+get_user_rate_limit = UserRateLimitPolicy(GLOBAL_LIMIT, USER_LIMIT)
@@ -0,0 +1,42 @@
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+
+class ModelResponse(JSONResponse):
+    """JSON rendered by pydantic-core from already validated models.
+
+    Routes return it instead of the model, and FastAPI sends a returned
+    Response as is: no second validation against `response_model` and no
+    jsonable_encoder walk over the data. `response_model` stays on the route
+    for the OpenAPI schema.
+    """
+
+    def __init__(self, content: Any, include: Optional[set] = None, **kwargs):
+        self.include = include
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content, include=self.include)
+
+
+def model_response(
+    content: Any,
+    response: Optional[Response] = None,
+    status_code: int = 200,
+    schema: Any = None,
+) -> Response:
+    """Wraps a service result, passing through Responses such as a 304.
+
+    Headers set on the injected `response`, e.g. ETags, are carried over.
+    `schema` narrows a richer model down to that schema's fields.
+    """
+    if isinstance(content, Response):
+        return content
+    include = set(schema.model_fields) if schema is not None else None
+    result = ModelResponse(content, include=include, status_code=status_code)
+    if response is not None:
+        result.headers.update(response.headers)
+    return result
@@ -0,0 +1,274 @@
+"""Streams a seed file into the database in batches.
+
+    python -m utils.seed_loader [path] [--recreate]
+
+The file is a JSON object with "users" and "tasks" arrays (test_data.json),
+or JSONL with one row per line tagged by a "table" key, either of them
+optionally gzipped. Users come before their tasks, and task `user_id`s refer
+to a user's "id" in the file or, without one, to its 1-based position.
+
+Rows are read a batch at a time, so memory stays flat however big the file
+is. On Postgres each batch goes in with COPY through asyncpg, elsewhere with
+one executemany INSERT. User ids are handed out here rather than by the
+database, which lets tasks be remapped while streaming; the sequences are
+moved past them at the end.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+from datetime import datetime, timezone
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.redis import redis_manager
+from core.setup import session_scope
+from models import parse_time_of_day, parse_utc_datetime
+from models.task_model import Task
+from models.user_model import User
+from schemas import PriorityEnum
+from services.task_stats import task_stats
+
+CHUNK_SIZE = 1 << 16  # characters read from the file at a time
+
+TABLES = {"users": User.__table__, "tasks": Task.__table__}
+COLUMNS = {
+    "users": ("id", "email", "username", "password", "created_at", "updated_at"),
+    "tasks": (
+        "title",
+        "description",
+        "time",
+        "priority",
+        "is_completed",
+        "created_at",
+        "updated_at",
+        "user_id",
+    ),
+}
+
+
+def open_seed(path: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def iter_jsonl(f: IO[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for line in f:
+        if line.strip():
+            record = json.loads(line)
+            yield record.pop("table"), record
+
+
+def iter_json(f: IO[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yields the items of the top level object's arrays one at a time.
+
+    Only the current chunk is held, each item is cut out of it with
+    JSONDecoder.raw_decode. Values that are not arrays are skipped.
+    """
+    decoder = json.JSONDecoder()
+    buf, pos = "", 0
+
+    def fill() -> bool:
+        nonlocal buf, pos
+        chunk = f.read(CHUNK_SIZE)
+        buf, pos = buf[pos:] + chunk, 0
+        return bool(chunk)
+
+    def peek(skip: str = "") -> str:
+        """Next character that is not whitespace or in `skip`, "" at the end."""
+        nonlocal pos
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] in skip):
+                pos += 1
+            if pos < len(buf) or not fill():
+                return buf[pos : pos + 1]
+
+    def value() -> Any:
+        nonlocal pos
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if not fill():
+                    raise
+                continue
+            # a number at the end of the chunk may go on in the next one
+            if end == len(buf) and fill():
+                continue
+            pos = end
+            return obj
+
+    if peek() != "{":
+        raise ValueError("Seed file must hold a JSON object")
+    pos += 1
+    while peek(",") not in ("}", ""):
+        key = value()
+        if peek(":") != "[":
+            value()
+            continue
+        pos += 1
+        while peek(",") != "]":
+            yield key, value()
+        pos += 1
+
+
+def iter_seed(f: IO[str], path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    if path.removesuffix(".gz").endswith(".jsonl"):
+        return iter_jsonl(f)
+    return iter_json(f)
+
+
+class SeedRows:
+    """Turns seed records into column tuples, remapping task owners as it goes."""
+
+    def __init__(self, first_user_id: int):
+        self.next_user_id = first_user_id
+        self.user_ids: Dict[Any, int] = {}
+        self.counts = {"users": 0, "tasks": 0, "skipped": 0}
+        self.now = datetime.now(timezone.utc)
+
+    def user(self, record: Dict[str, Any]) -> Tuple:
+        self.counts["users"] += 1
+        user_id = self.next_user_id
+        self.next_user_id += 1
+        self.user_ids[record.get("id", self.counts["users"])] = user_id
+
+        created_at = parse_utc_datetime(record.get("created_at")) or self.now
+        return (
+            user_id,
+            record["email"],
+            record["username"],
+            record["password"],
+            created_at,
+            parse_utc_datetime(record.get("updated_at")) or created_at,
+        )
+
+    def task(self, record: Dict[str, Any]) -> Optional[Tuple]:
+        user_id = self.user_ids.get(record["user_id"])
+        if user_id is None:
+            self.counts["skipped"] += 1
+            return None
+        self.counts["tasks"] += 1
+
+        created_at = parse_utc_datetime(record.get("created_at")) or self.now
+        return (
+            record["title"],
+            record["description"],
+            parse_time_of_day(record.get("time")),
+            record.get("priority", PriorityEnum.DEFAULT.value),
+            bool(record.get("is_completed", False)),
+            created_at,
+            parse_utc_datetime(record.get("updated_at")) or created_at,
+            user_id,
+        )
+
+    def batches(
+        self, records: Iterator[Tuple[str, Dict[str, Any]]], size: int
+    ) -> Iterator[Tuple[str, List[Tuple]]]:
+        """Runs of up to `size` rows of one table, in file order."""
+        table, rows = None, []
+        for position, (name, record) in enumerate(records, 1):
+            if name not in TABLES:
+                raise ValueError(f"Unknown seed table {name!r}")
+            if name != table or len(rows) >= size:
+                if rows:
+                    yield table, rows
+                table, rows = name, []
+            try:
+                row = self.user(record) if name == "users" else self.task(record)
+            except KeyError as e:
+                raise ValueError(f"Seed row {position} ({name}) has no {e}") from e
+            if row is not None:
+                rows.append(row)
+        if rows:
+            yield table, rows
+
+
+async def write_rows(session: AsyncSession, table: str, rows: List[Tuple]) -> None:
+    columns = COLUMNS[table]
+    if session.bind.dialect.name == "postgresql":
+        conn = await session.connection()
+        raw = await conn.get_raw_connection()
+        # the session already opened a transaction on this connection, the
+        # COPY joins it and commits or rolls back with the rest of the load
+        await raw.driver_connection.copy_records_to_table(
+            table, records=rows, columns=columns
+        )
+    else:
+        await session.execute(
+            insert(TABLES[table]), [dict(zip(columns, row)) for row in rows]
+        )
+
+
+async def reset_sequences(session: AsyncSession) -> None:
+    if session.bind.dialect.name != "postgresql":
+        return  # SQLite continues from max(rowid) by itself
+    for table in TABLES:
+        await session.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"coalesce(max(id), 0) + 1, false) FROM {table}"
+            )
+        )
+
+
+async def load_seed(
+    session: AsyncSession, path: str, batch_size: Optional[int] = None
+) -> Dict[str, int]:
+    """Appends the seed file's users and tasks, then rebuilds the task stats.
+
+    Parsing the next batch runs in a thread while the current one is written.
+    """
+    batch_size = batch_size or settings.seed_batch_size
+    first_user_id = (await session.scalar(select(func.max(User.id)))) or 0
+    rows = SeedRows(first_user_id + 1)
+
+    with open_seed(path) as f:
+        batches = rows.batches(iter_seed(f, path), batch_size)
+        pending = asyncio.create_task(asyncio.to_thread(next, batches, None))
+        try:
+            while batch := await pending:
+                pending = asyncio.create_task(asyncio.to_thread(next, batches, None))
+                await write_rows(session, *batch)
+        finally:
+            # the reader thread must be done with the file before it closes
+            await asyncio.gather(pending, return_exceptions=True)
+
+    await reset_sequences(session)
+    # COPY and table inserts skip the service writes that keep it current
+    await task_stats.rebuild(session)
+    await session.commit()
+    return rows.counts
+
+
+async def main(path: str, recreate: bool) -> None:
+    if recreate:
+        from utils.data_helper import recreate_tables
+
+        # recreating also tells the running workers to drop their caches
+        await redis_manager.connect()
+        try:
+            await recreate_tables()
+        finally:
+            await redis_manager.disconnect()
+    async with session_scope() as session:
+        counts = await load_seed(session, path)
+    print(
+        f"✅ Loaded {counts['users']} users and {counts['tasks']} tasks"
+        f" ({counts['skipped']} tasks without a known user skipped)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", nargs="?", default="test_data.json")
+    parser.add_argument(
+        "--recreate", action="store_true", help="drop and create all tables first"
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.path, args.recreate))